@@ -13,17 +13,15 @@ use_associations=${8:-true}
 umm_version=$9
 url_value=${10}
 
-# Replace version placeholder with actual version
-jq --arg a "$version" '.Version = $a' "$file" > "cmr/cmr.json"
+# Replace version placeholder with actual version, applied in memory by the updater
+overrides=(--set "/Version=${version}")
 
 if [[ $url_value ]]; then
-  jq --arg a "${url_value}" '.URL.URLValue = $a' cmr/cmr.json > cmr/cmr.json.tmp
-  mv cmr/cmr.json.tmp cmr/cmr.json
+  overrides+=(--set "/URL/URLValue=${url_value}")
 else
   # Replace Harmony URL placeholder with Harmony URL based on env
   if [[ $env == "sit" || $env == "uat" ]]; then
-    jq --arg a "https://harmony.uat.earthdata.nasa.gov" '.URL.URLValue = $a' cmr/cmr.json > cmr/cmr.json.tmp
-    mv cmr/cmr.json.tmp cmr/cmr.json
+    overrides+=(--set "/URL/URLValue=https://harmony.uat.earthdata.nasa.gov")
   fi
 fi
 
@@ -52,14 +50,14 @@ fi
 # Execute the command
 if [[ -n $launchpad_token ]]; then
   if [[ $use_associations == "true" ]]; then
-    $command -r -d -f "cmr/cmr.json" -a "cmr/${env}_associations.txt" -p "$provider" -e "$env" -t "$launchpad_token" -to "$timeout" -cu "$cmr_user" -cp "$cmr_pass" -uv "$umm_version"
+    $command -r -d -f "$file" "${overrides[@]}" -a "cmr/${env}_associations.txt" -p "$provider" -e "$env" -t "$launchpad_token" -to "$timeout" -cu "$cmr_user" -cp "$cmr_pass" -uv "$umm_version"
   else
-    $command -r -d -f "cmr/cmr.json" -p "$provider" -e "$env" -t "$launchpad_token" -to "$timeout" -cu "$cmr_user" -cp "$cmr_pass" -uv "$umm_version"
+    $command -r -d -f "$file" "${overrides[@]}" -p "$provider" -e "$env" -t "$launchpad_token" -to "$timeout" -cu "$cmr_user" -cp "$cmr_pass" -uv "$umm_version"
   fi
 else
   if [[ $use_associations == "true" ]]; then
-    $command -r -d -f "cmr/cmr.json" -a "cmr/${env}_associations.txt" -p "$provider" -e "$env" -cu "$cmr_user" -cp "$cmr_pass" -to "$timeout" -uv "$umm_version"
+    $command -r -d -f "$file" "${overrides[@]}" -a "cmr/${env}_associations.txt" -p "$provider" -e "$env" -cu "$cmr_user" -cp "$cmr_pass" -to "$timeout" -uv "$umm_version"
   else
-    $command -r -d -f "cmr/cmr.json" -p "$provider" -e "$env" -cu "$cmr_user" -cp "$cmr_pass" -to "$timeout" -uv "$umm_version"
+    $command -r -d -f "$file" "${overrides[@]}" -p "$provider" -e "$env" -cu "$cmr_user" -cp "$cmr_pass" -to "$timeout" -uv "$umm_version"
   fi
 fi
\ No newline at end of file
@@ -0,0 +1,507 @@
+"""
+==============
+associations.py
+==============
+
+Collection association helpers shared by the UMM-S and UMM-T
+updaters. `concept_type` is the CMR search path of the record the
+collections are associated with ('services' or 'tools').
+"""
+
+import logging
+import backoff
+from requests import exceptions
+
+from podaac.umm_common import codec
+from podaac.umm_common import deadline
+from podaac.umm_common import history
+from podaac.umm_common import tracing
+from podaac.umm_common.client import cmr_environment_url, get_client
+from podaac.umm_common.failures import FailureReport, classify, TRANSIENT
+
+LOGGER = logging.getLogger(__name__)
+
+
+def get_association(association):
+    """
+    Get list of association concept ids from association file
+    Parameters
+    ----------
+    association : string file with all associations, or a single
+                  collection concept id, or list of concept ids
+    Returns
+    -------
+    List string concept ids in association file
+    """
+
+    if isinstance(association, (list, tuple)):
+        return sorted(association)
+    concept_ids = []
+    if ".txt" in association:
+        with open(association) as afile:
+            assoc_concept_ids = afile.readlines()
+        for assoc_concept_id in assoc_concept_ids:
+            concept_ids.append(assoc_concept_id.strip('\n'))
+    elif association.strip():
+        # a single concept id, as create_association takes it
+        concept_ids.append(association.strip())
+    concept_ids.sort()
+    return concept_ids
+
+
+def meta_collections(meta):
+    """
+    Collection concept ids associated with a record, from the meta of a
+    umm_json search item
+    Parameters
+    ----------
+    meta : dict item meta; CMR lists the concept ids under
+           associations.collections and the details, as dicts, under
+           association-details.collections
+    Returns
+    -------
+    sorted list of collection concept ids
+    """
+
+    # CMR leaves out the associations block when there are none
+    collections = (meta.get('associations') or {}).get('collections') or \
+        (meta.get('association-details') or {}).get('collections') or []
+    return sorted(collection['concept-id'] if isinstance(collection, dict) else collection
+                  for collection in collections)
+
+
+def current_association(concept_id, url_prefix, header, concept_type, timeout=30, client=None):
+    """
+    Get list of association concept ids currently in CMR for a record
+    Parameters
+    ----------
+    concept_id : string concept id of service or tool
+    url_prefix : string url prefix
+    concept_type : string 'services' or 'tools'
+    Returns
+    -------
+    List of string with concept id or None
+    """
+
+    url = "{}/search/collections.umm_json?{}_concept_id={}&page_size=2000".format(
+        url_prefix, concept_type[:-1], concept_id)
+    resp = get_client(client).get(url, headers=header, timeout=timeout)
+    if resp.status_code == 200:
+        resp_json = codec.response_json(resp)
+        concept_ids = []
+        for item in resp_json.get('items'):
+            concept_ids.append(item['meta']['concept-id'])
+        concept_ids.sort()
+        return concept_ids
+    return None
+
+
+def _association_request(method, url_prefix, c_id, ac_id, header, concept_type, timeout, client):
+    url = url_prefix + f"/search/{concept_type}/{c_id}/associations"
+    assoc_concept_id_payload = f'[{{"concept_id": "{ac_id}"}}]'
+    assoc_concept_id_payload = assoc_concept_id_payload.replace("\n", "")
+    return get_client(client).request(method, url, json=codec.loads(assoc_concept_id_payload),
+                                      headers=header, timeout=timeout)
+
+
+def add_association(url_prefix, c_id, ac_id, header, concept_type, timeout=30, client=None):
+    """
+    Add association between a record and a collection
+    Parameters
+    ----------
+    url_prefix : string url prefix
+    c_id : string concept id of service or tool
+    ac_id : string association id
+    header : string of head for request
+    concept_type : string 'services' or 'tools'
+    Returns
+    -------
+    Request response
+    """
+    return _association_request('POST', url_prefix, c_id, ac_id, header, concept_type, timeout, client)
+
+
+def remove_association(url_prefix, c_id, ac_id, header, concept_type, timeout=30, client=None):
+    """
+    Remove association between a record and a collection
+    Parameters
+    ----------
+    url_prefix : string url prefix
+    c_id : string concept id of service or tool
+    ac_id : string association id
+    header : string of head for request
+    concept_type : string 'services' or 'tools'
+    Returns
+    -------
+    Request response
+    """
+    return _association_request('DELETE', url_prefix, c_id, ac_id, header, concept_type, timeout, client)
+
+
+def association_batch(method, url_prefix, c_id, ac_ids, header, concept_type, timeout=30, client=None):
+    """
+    Add (POST) or remove (DELETE) the associations between a record and
+    several collections in one request
+    Parameters
+    ----------
+    method : string 'POST' or 'DELETE'
+    url_prefix : string url prefix
+    c_id : string concept id of service or tool
+    ac_ids : list of collection concept ids
+    header : dict of head for request
+    concept_type : string 'services' or 'tools'
+    Returns
+    -------
+    (status, text); status is None when the request itself failed
+    """
+    url = url_prefix + f"/search/{concept_type}/{c_id}/associations"
+    payload = [{'concept_id': ac_id.strip()} for ac_id in ac_ids]
+    with tracing.span('association_batch', 'association', method=method, concept_id=c_id, size=len(payload)):
+        try:
+            resp = get_client(client).request(method, url, json=payload, headers=header, timeout=timeout)
+        except exceptions.RequestException as err:
+            return None, str(err)
+    return resp.status_code, resp.text
+
+
+def remove_association_batch(url_prefix, c_id, ac_ids, header, concept_type, timeout=30, client=None):
+    """
+    Remove the associations between a record and several collections
+    in one request, see association_batch
+    """
+    return association_batch('DELETE', url_prefix, c_id, ac_ids, header, concept_type, timeout=timeout,
+                             client=client)
+
+
+def _attempt(operation, url_prefix, c_id, ac_id, header, concept_type, timeout, client):
+    """
+    Run one 'add' or 'remove' operation, returning (status, text);
+    status is None when the request itself failed. DeadlineExceeded is
+    not a failure of the operation and propagates, so an expired run
+    leaves its journaled plan unfinished and resumable
+    """
+    method = 'POST' if operation == 'add' else 'DELETE'
+    try:
+        resp = _association_request(method, url_prefix, c_id, ac_id, header, concept_type, timeout, client)
+    except exceptions.RequestException as err:
+        return None, str(err)
+    return resp.status_code, resp.text
+
+
+def sync_association(cmr_env, concept_id, current_token, association, concept_type,
+                     timeout=30, remove_collection: bool = True, client=None, journal=None, resume=False,
+                     failures=None):
+    """
+    Synchronize association file with cmr associations
+    Parameters
+    ----------
+    cmr_env : string environment of cmr
+    concept_id : string concept id of service or tool
+    current_token : string cmr token
+    association : string file with all associations
+    concept_type : string 'services' or 'tools'
+    remove_collection : bool to remove associations from cmr or not during sync
+    journal : AssociationJournal recording completed operations, optional
+    resume : bool trust an unfinished journaled plan instead of querying CMR
+    failures : FailureReport collecting failed operations, optional
+    Returns
+    -------
+    None
+    """
+
+    LOGGER.info("Synchronize associations...")
+    state = fetch_association_state(cmr_env, concept_id, current_token, association, concept_type,
+                                    timeout=timeout, client=client, journal=journal, resume=resume)
+    plan = plan_association_changes(cmr_env, concept_id, state, remove_collection=remove_collection,
+                                    journal=journal)
+    if plan is None:
+        return
+    header = {
+        'Authorization': str(current_token),
+        'Content-type': "application/json",
+    }
+    apply_association_changes(cmr_env, concept_id, plan[0], plan[1], header, concept_type,
+                              timeout=timeout, remove_collection=remove_collection, client=client,
+                              journal=journal, failures=failures)
+
+
+def fetch_association_state(cmr_env, concept_id, current_token, association, concept_type, timeout=30,
+                            client=None, journal=None, resume=False):
+    """
+    Read the desired associations and either the unfinished journaled
+    plan (with resume) or the associations currently in CMR
+    Parameters
+    ----------
+    cmr_env : string environment of cmr
+    concept_id : string concept id of service or tool
+    current_token : string cmr token
+    association : string file with all associations
+    concept_type : string 'services' or 'tools'
+    journal : AssociationJournal, optional
+    resume : bool trust an unfinished journaled plan instead of querying CMR
+    Returns
+    -------
+    dict with 'desired', 'current' and 'pending'
+    """
+
+    state = {'desired': get_association(association), 'current': None, 'pending': None}
+    if journal is not None and resume:
+        state['pending'] = journal.pending(cmr_env, concept_id, state['desired'])
+    if state['pending'] is None:
+        header = {
+            'Authorization': str(current_token),
+        }
+        state['current'] = current_association(concept_id, cmr_environment_url(cmr_env), header, concept_type,
+                                               timeout=timeout, client=client)
+    return state
+
+
+def plan_association_changes(cmr_env, concept_id, state, remove_collection: bool = True, journal=None):
+    """
+    Adds and removes needed to reach the desired associations
+    Parameters
+    ----------
+    cmr_env : string environment of cmr
+    concept_id : string concept id of service or tool
+    state : dict from fetch_association_state
+    remove_collection : bool to remove associations from cmr or not during sync
+    journal : AssociationJournal the plan is recorded in, optional
+    Returns
+    -------
+    (add, remove) lists or None when there is nothing to do
+    """
+
+    if state['pending'] is not None:
+        return state['pending']
+    current, new = state['current'], state['desired']
+    if current is None:
+        LOGGER.info("Unable to get associations for concept_id: %s", concept_id)
+        return None
+    if current == new:
+        LOGGER.info("All association is the same")
+        return None
+    add = sorted(set(new) - set(current))
+    remove = sorted(set(current) - set(new)) if remove_collection else []
+    if journal is not None:
+        journal.plan(cmr_env, concept_id, new, add, remove)
+    return add, remove
+
+
+def apply_association_changes(cmr_env, concept_id, add, remove, header, concept_type, timeout=30,
+                              remove_collection: bool = True, client=None, journal=None, failures=None):
+    """
+    Perform already computed association adds and removes
+    Parameters
+    ----------
+    cmr_env : string environment of cmr
+    concept_id : string concept id of service or tool
+    add : list of collection concept ids to associate
+    remove : list of collection concept ids to dissociate
+    header : dict with Authorization and Content-type
+    concept_type : string 'services' or 'tools'
+    remove_collection : bool to remove associations from cmr or not
+    journal : AssociationJournal recording completed operations, optional
+    failures : FailureReport collecting failed operations, optional
+    Returns
+    -------
+    (added, removed) lists of collection concept ids
+    """
+
+    added, removed = [], []
+    url_prefix = cmr_environment_url(cmr_env)
+    for assoc_concept_id in add:
+        status, text = _attempt('add', url_prefix, concept_id, assoc_concept_id, header, concept_type,
+                                timeout, client)
+        LOGGER.info("Add Association %s: response status: %s",
+                    assoc_concept_id, status)
+        LOGGER.info("Response text from add_associations: %s", text)
+        if status != 200:
+            LOGGER.info("Failed add association: concept_id being associated "
+                        "may not be valid: %s", assoc_concept_id)
+            if failures is not None:
+                failures.add(cmr_env, concept_type, concept_id, 'add', assoc_concept_id, status, text)
+        else:
+            added.append(assoc_concept_id)
+            if journal is not None:
+                journal.record(cmr_env, concept_id, 'add', assoc_concept_id)
+
+    LOGGER.info("Allow association removal: %s", remove_collection)
+    if remove_collection:
+        for assoc_concept_id in remove:
+            status, text = _attempt('remove', url_prefix, concept_id, assoc_concept_id, header, concept_type,
+                                    timeout, client)
+            LOGGER.info("Remove Association %s: response status: %s",
+                        assoc_concept_id, status)
+            LOGGER.info("Response text from remove_associations: %s", text)
+            if status != 200:
+                LOGGER.info("Failed remove association: concept_id being associated "
+                            "may not be valid: %s", assoc_concept_id)
+                if failures is not None:
+                    failures.add(cmr_env, concept_type, concept_id, 'remove', assoc_concept_id, status, text)
+            else:
+                removed.append(assoc_concept_id)
+                if journal is not None:
+                    journal.record(cmr_env, concept_id, 'remove', assoc_concept_id)
+
+    if journal is not None:
+        journal.complete(cmr_env, concept_id)
+    return added, removed
+
+
+def create_association(cmr_env, concept_id, current_token, association, concept_type, timeout=30, client=None,
+                       failures=None):
+    """
+    Create associations between a new record and the collections
+    in the association file (or a single collection concept id)
+    Parameters
+    ----------
+    cmr_env : string
+    concept_id : string
+    current_token : string
+    association : string, or list of collection concept ids
+    concept_type : string 'services' or 'tools'
+    failures : FailureReport collecting failed operations, optional
+    Returns
+    -------
+    list of associated collection concept ids
+    """
+
+    header = {
+        'Content-type': "application/json",
+        'Authorization': str(current_token),
+    }
+
+    url_prefix = cmr_environment_url(cmr_env)
+    added = []
+
+    if isinstance(association, (list, tuple)) or ".txt" in association:
+        if isinstance(association, (list, tuple)):
+            assoc_concept_ids = list(association)
+        else:
+            with open(association) as afile:
+                assoc_concept_ids = afile.readlines()
+        for i, assoc_concept_id in enumerate(assoc_concept_ids, start=1):
+            status, text = _attempt('add', url_prefix, concept_id, assoc_concept_id, header, concept_type,
+                                    timeout, client)
+            LOGGER.info("Association %s: %s, response status: %s",
+                        i, assoc_concept_id, status)
+            LOGGER.debug("Response text from build_associations: %s", text)
+            if status != 200:
+                LOGGER.info("Failed association: concept_id being associated "
+                            "may not be valid: %s", assoc_concept_id)
+                if failures is not None:
+                    failures.add(cmr_env, concept_type, concept_id, 'add', assoc_concept_id, status, text)
+            else:
+                added.append(assoc_concept_id.strip())
+    else:
+        status, text = _attempt('add', url_prefix, concept_id, association, header, concept_type,
+                                timeout, client)
+        LOGGER.info("Association response status: %s", status)
+        LOGGER.debug("Response text from build_associations: %s", text)
+        if status != 200:
+            if failures is not None:
+                failures.add(cmr_env, concept_type, concept_id, 'add', association, status, text)
+        else:
+            added.append(association)
+    LOGGER.info("Associations complete")
+    return added
+
+
+@backoff.on_predicate(backoff.expo, lambda result: result[0] != 200 and classify(*result) == TRANSIENT,
+                      max_tries=4, max_time=deadline.backoff_max_time, on_giveup=deadline.backoff_giveup,
+                      on_backoff=(history.count_retry, tracing.retry))
+@tracing.traced(category='association')
+def _retry_attempt(failure, header, timeout, client):
+    url_prefix = cmr_environment_url(failure['env'])
+    return _attempt(failure['operation'], url_prefix, failure['concept_id'], failure['assoc_id'],
+                    header, failure['concept_type'], timeout, client)
+
+
+def retry_failures(failures, current_token, timeout=30, client=None, transient_only=True):
+    """
+    Retry failed association operations with exponential backoff
+    Parameters
+    ----------
+    failures : FailureReport
+    current_token : string cmr token
+    transient_only : bool skip failures classified as permanent
+    Returns
+    -------
+    FailureReport of operations that still failed (or were skipped)
+    """
+
+    header = {
+        'Content-type': "application/json",
+        'Authorization': str(current_token),
+    }
+    breaker = get_client(client).breaker
+    remaining = FailureReport()
+    for failure in failures:
+        if transient_only and failure['kind'] != TRANSIENT:
+            remaining.add(**_report_fields(failure))
+            continue
+        if breaker is not None and breaker.is_open():
+            # CMR is still failing, keep the operation for a later --retry_failures run
+            remaining.add(**_report_fields(failure))
+            continue
+        status, text = _retry_attempt(failure, header, timeout, client)
+        LOGGER.info("Retry %s association %s for %s: response status: %s",
+                    failure['operation'], failure['assoc_id'], failure['concept_id'], status)
+        if status != 200:
+            remaining.add(**_report_fields(failure, status=status, body=text))
+    return remaining
+
+
+def _report_fields(failure, **updates):
+    fields = {key: failure[key] for key in
+              ('concept_type', 'concept_id', 'operation', 'assoc_id', 'status', 'body')}
+    fields['cmr_env'] = failure['env']
+    fields.update(updates)
+    return fields
+
+
+def final_retry_pass(failures, current_token, report_path=None, timeout=30, client=None):
+    """
+    Retry the transient failures of a run one last time and write
+    the failure report if requested
+    Parameters
+    ----------
+    failures : FailureReport
+    current_token : string cmr token
+    report_path : string file the remaining failures are written to
+    Returns
+    -------
+    FailureReport of operations still failing
+    """
+
+    run_deadline = deadline.current()
+    if len(failures) and run_deadline is not None and run_deadline.expired():
+        LOGGER.warning("Run deadline exceeded, skipping association retry pass")
+    elif len(failures):
+        LOGGER.info("Retrying failed association operations: %s", failures.summary())
+        failures = retry_failures(failures, current_token, timeout=timeout, client=client)
+        if len(failures):
+            LOGGER.warning("Association operations still failing: %s", failures.summary())
+    if report_path:
+        failures.write(report_path)
+    return failures
+
+
+def retry_report_file(path, current_token, report_path=None, timeout=30, client=None):
+    """
+    Retry every operation of a failure report written by a previous run
+    Parameters
+    ----------
+    path : string failure report to consume
+    current_token : string cmr token
+    report_path : string where remaining failures are written, defaults to path
+    Returns
+    -------
+    FailureReport of operations still failing
+    """
+
+    failures = FailureReport.load(path)
+    LOGGER.info("Retrying %s association operations from %s", len(failures), path)
+    remaining = retry_failures(failures, current_token, timeout=timeout, client=client, transient_only=False)
+    remaining.write(report_path or path)
+    return remaining
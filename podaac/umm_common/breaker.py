@@ -0,0 +1,115 @@
+"""
+==============
+breaker.py
+==============
+
+Circuit breaker for the shared CMR client.
+
+The outcome of the last `window` requests is kept; once at least
+`min_requests` were seen and the share of failures (no response,
+throttling or 5xx, or slower than `slow_call` seconds) reaches
+`error_rate` the circuit opens and requests fail immediately with
+CircuitOpen. After `cooldown` seconds a single probe request is let
+through (half-open): success closes the circuit, failure opens it again.
+"""
+
+import collections
+import logging
+import threading
+import time
+
+from requests import exceptions
+
+from podaac.umm_common.failures import TRANSIENT_STATUS
+
+LOGGER = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpen(exceptions.RequestException):
+    """Raised instead of sending a request while the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Error rate and latency circuit breaker
+    """
+
+    def __init__(self, error_rate=0.5, slow_call=None, window=20, min_requests=5, cooldown=30.0):
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened = None
+        self.counters = {'trips': 0, 'short_circuited': 0}
+        self._outcomes = collections.deque(maxlen=window)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before(self, url):
+        """
+        Admit a request or raise CircuitOpen
+        Parameters
+        ----------
+        url : string requested url, used in the error message
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened >= self.cooldown:
+                LOGGER.info("Circuit half-open, probing CMR")
+                self.state = HALF_OPEN
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self._probing):
+                self._probing = self.state == HALF_OPEN
+                return
+            self.counters['short_circuited'] += 1
+        raise CircuitOpen(f"circuit open, CMR unavailable: {url} not requested")
+
+    def record(self, status, elapsed):
+        """
+        Record the outcome of an admitted request
+        Parameters
+        ----------
+        status : int HTTP status or None when no response was received
+        elapsed : float seconds the request took
+        """
+        failed = status is None or status in TRANSIENT_STATUS
+        failed = failed or (self.slow_call is not None and elapsed > self.slow_call)
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open("probe failed")
+                else:
+                    LOGGER.info("Circuit closed, CMR recovered")
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if self.state == CLOSED and len(self._outcomes) >= self.min_requests:
+                rate = sum(self._outcomes) / len(self._outcomes)
+                if rate >= self.error_rate:
+                    self._open(f"{rate:.0%} of the last {len(self._outcomes)} requests failed")
+
+    def _open(self, reason):
+        self.state = OPEN
+        self.opened = time.monotonic()
+        self.counters['trips'] += 1
+        LOGGER.warning("Circuit opened (%s), failing CMR requests for %ss", reason, self.cooldown)
+
+    def is_open(self):
+        """True while requests are being short-circuited"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened < self.cooldown
+
+    def metrics(self):
+        """
+        Snapshot of breaker counters
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            return dict(self.counters, state=self.state)
@@ -0,0 +1,87 @@
+"""
+==============
+bundle.py
+==============
+
+Build a single file zipapp of the updaters.
+
+The archive holds the podaac packages (and optionally the dependencies
+installed in a directory with `pip install --target`) and starts the
+updater named by its first argument or by the name it is invoked as,
+so a runner can skip installing the package before every run:
+
+    pip install --target build/deps requests backoff
+    python -m podaac.umm_common.bundle -o cmr-umm-updater.pyz --deps build/deps
+    python cmr-umm-updater.pyz umms_updater -f cmr/umm-s.json -p POCLOUD -e uat -t "$TOKEN"
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import zipapp
+
+ENTRY_POINTS = {
+    'umms_updater': 'podaac.umms_updater.umms_updater',
+    'ummt_updater': 'podaac.ummt_updater.ummt_updater',
+}
+
+MAIN = '''\
+import importlib
+import os
+import sys
+
+ENTRY_POINTS = %r
+
+name = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+if name not in ENTRY_POINTS and len(sys.argv) > 1 and sys.argv[1] in ENTRY_POINTS:
+    name = sys.argv.pop(1)
+if name not in ENTRY_POINTS:
+    sys.exit("usage: %%s {%%s} [arguments]" %% (sys.argv[0], ",".join(ENTRY_POINTS)))
+importlib.import_module(ENTRY_POINTS[name]).run()
+'''
+
+
+def _ignore(_directory, names):
+    return [name for name in names if name == '__pycache__' or name.endswith('.pyc')]
+
+
+def build(output, deps=None, interpreter='/usr/bin/env python3', compressed=True):
+    """
+    Write the zipapp
+    Parameters
+    ----------
+    output : string archive path
+    deps : string directory of installed dependencies to include, optional
+    interpreter : string shebang interpreter
+    compressed : bool deflate the archive members
+    """
+
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with tempfile.TemporaryDirectory() as staging:
+        if deps:
+            shutil.copytree(deps, staging, dirs_exist_ok=True, ignore=_ignore)
+        for package in ('umm_common', 'umms_updater', 'ummt_updater'):
+            shutil.copytree(os.path.join(package_root, 'podaac', package),
+                            os.path.join(staging, 'podaac', package), ignore=_ignore)
+        with open(os.path.join(staging, '__main__.py'), 'w') as main_file:
+            main_file.write(MAIN % ENTRY_POINTS)
+        zipapp.create_archive(staging, output, interpreter=interpreter, compressed=compressed)
+
+
+def main():
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description='Build a zipapp running umms_updater or ummt_updater')
+    parser.add_argument('-o', '--output', default='cmr-umm-updater.pyz', help='Archive to write')
+    parser.add_argument('--deps', default=None,
+                        help='Directory of dependencies installed with pip install --target to include')
+    parser.add_argument('--python', default='/usr/bin/env python3', help='Interpreter of the shebang line')
+    args = parser.parse_args()
+    build(args.output, deps=args.deps, interpreter=args.python)
+    print(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+==============
+cassette.py
+==============
+
+Record and replay of the CMR interactions of a run.
+
+A CassetteAdapter is mounted on the client session. When recording it
+sends the requests to CMR and keeps every request, response and its
+latency; the cassette is written when the client is closed. When
+replaying it answers from the cassette without network, in the order
+the requests were recorded for each method and URL, after sleeping the
+recorded latency times a scale (1 replays the original timing, 0 none).
+
+Credentials in token requests and the returned token are redacted
+before a cassette is written.
+
+    umms_updater ... --record_cassette cassettes/update.json
+    umms_updater ... --replay_cassette cassettes/update.json --replay_latency 0.1
+"""
+
+import http
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from podaac.umm_common import codec
+
+LOGGER = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+REDACTED = 'REDACTED'
+REDACTED_KEYS = ('username', 'password', 'id')
+DROPPED_HEADERS = ('set-cookie', 'content-encoding', 'transfer-encoding', 'content-length')
+
+
+class CassetteError(Exception):
+    """A request has no recorded interaction left to replay"""
+
+
+def _redact(document, keys=REDACTED_KEYS):
+    if isinstance(document, dict):
+        return {key: REDACTED if key in keys and isinstance(value, str) else _redact(value, keys)
+                for key, value in document.items()}
+    if isinstance(document, list):
+        return [_redact(value, keys) for value in document]
+    return document
+
+
+def _body(body, url):
+    """Request or response body as stored in the cassette, credentials redacted for token requests"""
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    if '/tokens' in url:
+        try:
+            return codec.dumps(_redact(codec.loads(body)))
+        except ValueError:
+            return REDACTED
+    return body
+
+
+class CassetteAdapter(HTTPAdapter):
+    """
+    Transport adapter recording or replaying HTTP interactions
+    """
+
+    def __init__(self, path, mode='replay', latency_scale=1.0):
+        """
+        Parameters
+        ----------
+        path : string cassette file
+        mode : string 'record' or 'replay'
+        latency_scale : float factor applied to recorded latencies on replay
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f'Cassette mode must be record or replay, not {mode}')
+        super().__init__()
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.interactions = []
+        self._queues = defaultdict(deque)
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            self.load()
+
+    def load(self):
+        """Read the cassette to replay"""
+        with open(self.path) as cfile:
+            cassette = codec.load(cfile)
+        for interaction in cassette['interactions']:
+            request = interaction['request']
+            self._queues[(request['method'], request['url'])].append(interaction)
+        LOGGER.info("Replaying %d interactions from %s", len(cassette['interactions']), self.path)
+
+    def save(self):
+        """Write the recorded interactions"""
+        with self._lock:
+            interactions = list(self.interactions)
+        with open(self.path, 'w') as cfile:
+            codec.dump({'version': CASSETTE_VERSION, 'interactions': interactions}, cfile, pretty=True)
+        LOGGER.info("Recorded %d interactions to %s", len(interactions), self.path)
+
+    def remaining(self):
+        """
+        Recorded interactions not replayed yet
+        Returns
+        -------
+        list of interactions
+        """
+        with self._lock:
+            return [interaction for queue in self._queues.values() for interaction in queue]
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        if self.mode == 'replay':
+            return self._replay(request)
+
+        start = time.perf_counter()
+        resp = super().send(request, **kwargs)
+        elapsed = time.perf_counter() - start
+        interaction = {
+            'request': {'method': request.method, 'url': request.url, 'body': _body(request.body, request.url)},
+            'response': {
+                'status': resp.status_code,
+                'headers': {key: value for key, value in resp.headers.items()
+                            if key.lower() not in DROPPED_HEADERS},
+                'body': _body(resp.content, request.url),
+            },
+            'elapsed': round(elapsed, 4),
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+        return resp
+
+    def _replay(self, request):
+        with self._lock:
+            queue = self._queues.get((request.method, request.url))
+            if not queue:
+                raise CassetteError(f'No recorded interaction left for {request.method} {request.url}')
+            interaction = queue.popleft()
+            self.interactions.append(interaction)
+        if self.latency_scale:
+            time.sleep(interaction['elapsed'] * self.latency_scale)
+
+        recorded = interaction['response']
+        resp = requests.Response()
+        resp.status_code = recorded['status']
+        resp.headers.update(recorded['headers'])
+        resp._content = (recorded['body'] or '').encode('utf-8')  # pylint: disable=protected-access
+        resp.encoding = 'utf-8'
+        resp.url = request.url
+        resp.request = request
+        try:
+            resp.reason = http.HTTPStatus(resp.status_code).phrase
+        except ValueError:
+            resp.reason = ''
+        return resp
+
+    def close(self):
+        if self.mode == 'record':
+            self.save()
+        super().close()
+
+
+def mount(session, path, mode, latency_scale=1.0):
+    """
+    Mount a cassette on the https requests of a session
+    Returns
+    -------
+    CassetteAdapter
+    """
+    adapter = CassetteAdapter(path, mode=mode, latency_scale=latency_scale)
+    session.mount('https://', adapter)
+    return adapter
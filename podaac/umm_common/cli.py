@@ -0,0 +1,571 @@
+"""
+==============
+cli.py
+==============
+
+Command line options shared by umms_updater and ummt_updater.
+
+Kept free of requests and the engine so that parsing (and `-h`) stays
+fast; see tests/test_startup.py.
+"""
+
+import argparse
+
+from podaac.umm_common import overrides
+from podaac.umm_common import scheduler
+
+
+def add_watch_arguments(parser, modes=None):
+    """
+    Add watch/daemon mode options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    modes : mutually exclusive group the run mode option is added to, optional
+    """
+
+    group = parser.add_argument_group('watch mode')
+    mode_group = modes if modes is not None else group
+    mode_group.add_argument('-w', '--watch',
+                            help='Directory of UMM JSON and <env>_associations.txt '
+                                 'files to watch, syncing records as they change.',
+                            required=False,
+                            default=None,
+                            metavar='cmr/')
+    group.add_argument('--debounce',
+                       help='Seconds a change must settle before syncing',
+                       required=False, type=float,
+                       default=2.0)
+    group.add_argument('--watch_interval',
+                       help='Seconds between directory polls',
+                       required=False, type=float,
+                       default=1.0)
+    group.add_argument('--health_port',
+                       help='Serve /health and /metrics on this port, 0 disables',
+                       required=False, type=int,
+                       default=0)
+
+
+def add_journal_arguments(parser):
+    """
+    Add association journal options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    """
+
+    group = parser.add_argument_group('association journal')
+    group.add_argument('-j', '--journal',
+                       help='Journal file recording completed association '
+                            'operations so an interrupted sync can resume.',
+                       required=False,
+                       default=None,
+                       metavar='associations_journal.jsonl')
+    group.add_argument('--resume', action='store_true',
+                       help='Resume an unfinished journaled sync instead of '
+                            're-querying current CMR associations',
+                       required=False)
+
+
+def add_resolver_arguments(parser):
+    """
+    Add association name resolution options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    """
+
+    group = parser.add_argument_group('association names')
+    group.add_argument('--resolver_cache',
+                       help='Cache file of collection short_name[/version] and entry_title: association '
+                            'entries resolved to concept ids, default ~/.cache/cmr-umm-updater/collections.json',
+                       required=False,
+                       default=None,
+                       metavar='collections.json')
+    group.add_argument('--resolver_ttl',
+                       help='Seconds a resolved association entry is reused from the cache, 0 to always search',
+                       required=False, type=float,
+                       default=86400.0)
+
+
+def validate_arguments(parser, args):
+    """
+    Check combinations of the shared options
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    args : argparse.Namespace
+    """
+
+    if args.resume and not args.journal:
+        parser.error('--resume requires a journal file, add -j')
+    # --decommission_file extends --decommission, so it excludes the same run modes
+    if args.decommission_file and any((args.watch, args.retry_failures, args.sweep, args.rollback, args.compare)):
+        parser.error('--decommission_file cannot be combined with another run mode')
+    for expression in args.set:
+        try:
+            overrides.parse_set(expression)
+        except ValueError as err:
+            parser.error(f'--set {expression}: {err}')
+    try:
+        scheduler.parse_budgets(args.budget)
+    except ValueError as err:
+        parser.error(f'--budget: {err}')
+
+
+def add_failure_arguments(parser, modes=None):
+    """
+    Add association failure report options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    modes : mutually exclusive group the run mode option is added to, optional
+    """
+
+    group = parser.add_argument_group('association failures')
+    mode_group = modes if modes is not None else group
+    group.add_argument('--failure_report',
+                       help='Write association operations still failing after '
+                            'the final retry pass to this JSON file.',
+                       required=False,
+                       default=None,
+                       metavar='failures.json')
+    mode_group.add_argument('--retry_failures',
+                            help='Only retry the operations listed in a failure '
+                                 'report from a previous run.',
+                            required=False,
+                            default=None,
+                            metavar='failures.json')
+
+
+def add_sweep_arguments(parser, modes=None):
+    """
+    Add provider sweep options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    modes : mutually exclusive group the run mode option is added to, optional
+    """
+
+    group = parser.add_argument_group('provider sweep')
+    mode_group = modes if modes is not None else group
+    mode_group.add_argument('--sweep',
+                            help='Directory of UMM JSON records to reconcile against '
+                                 'every record of the provider in one pass.',
+                            required=False,
+                            default=None,
+                            metavar='cmr/')
+    group.add_argument('--apply', action='store_true',
+                       help='Apply the drift found by --sweep, or delete the records selected by '
+                            '--decommission, instead of only reporting it',
+                       required=False)
+    group.add_argument('--sweep_report',
+                       help='Write the sweep drift report to this JSON file',
+                       required=False,
+                       default=None,
+                       metavar='sweep.json')
+
+
+def add_decommission_arguments(parser, modes=None):
+    """
+    Add decommission options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    modes : mutually exclusive group the run mode option is added to, optional
+    """
+
+    group = parser.add_argument_group('decommission')
+    mode_group = modes if modes is not None else group
+    mode_group.add_argument('--decommission',
+                            help='Native id, or pattern such as POCLOUD_old_*, of provider records to retire: '
+                                 'their associations are removed and the records deleted (with --apply). '
+                                 'Can be repeated.',
+                            required=False, action='append', metavar='NATIVE_ID',
+                            default=None)
+    group.add_argument('--decommission_file',
+                       help='File of native ids or patterns to retire, one per line',
+                       required=False,
+                       default=None,
+                       metavar='decommission.txt')
+    group.add_argument('--decommission_report',
+                       help='Write the decommission report to this JSON file',
+                       required=False,
+                       default=None,
+                       metavar='decommission.json')
+    group.add_argument('--decommission_workers',
+                       help='Records decommissioned concurrently',
+                       required=False, type=int,
+                       default=4)
+    group.add_argument('--rate_limit',
+                       help='Most decommission requests started per second, 0 for no limit',
+                       required=False, type=float,
+                       default=5.0)
+
+
+def add_rollback_arguments(parser, modes=None):
+    """
+    Add snapshot and rollback options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    modes : mutually exclusive group the run mode option is added to, optional
+    """
+
+    group = parser.add_argument_group('snapshots and rollback')
+    mode_group = modes if modes is not None else group
+    group.add_argument('--snapshot_dir',
+                       help='Before an update, save the CMR profile and associations being replaced '
+                            'to <native_id>.<revision>.json in this directory',
+                       required=False,
+                       default=None,
+                       metavar='snapshots/')
+    mode_group.add_argument('--rollback', action='store_true',
+                            help='Re-ingest an earlier revision of the record of -f (or --native_id), from '
+                                 '--snapshot_dir or CMR, restoring snapshot associations',
+                            required=False)
+    group.add_argument('--to_revision',
+                       help='Revision --rollback restores, by default the one before the current',
+                       required=False, type=int,
+                       default=None)
+
+
+def add_compare_arguments(parser, modes=None):
+    """
+    Add environment comparison options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    modes : mutually exclusive group the run mode option is added to, optional
+    """
+
+    group = parser.add_argument_group('environment comparison')
+    mode_group = modes if modes is not None else group
+    mode_group.add_argument('--compare',
+                            help='Compare the record of -f (or --native_id) in -e with this environment, '
+                                 'read only: profile diff and collection associations matched by '
+                                 'ShortName and Version. No credentials needed.',
+                            required=False,
+                            default=None,
+                            metavar='ops')
+    group.add_argument('--native_id',
+                       help='Native id of the record to compare or roll back, instead of the one derived from -f',
+                       required=False,
+                       default=None)
+    group.add_argument('--compare_report',
+                       help='Write the comparison report to this JSON file',
+                       required=False,
+                       default=None,
+                       metavar='compare.json')
+
+
+def add_run_arguments(parser):
+    """
+    Add run control options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    """
+
+    group = parser.add_argument_group('run control')
+    group.add_argument('--deadline',
+                       help='Overall run budget in seconds shared by every request, '
+                            'retry and wait; per request timeouts shrink as it drains. '
+                            'In watch mode it applies to each record sync.',
+                       required=False, type=float,
+                       default=None)
+    group.add_argument('--profile',
+                       help='Profile the run and write PREFIX.prof (cProfile stats) and PREFIX.txt '
+                            '(time in network, JSON, sleeps by caller and top functions)',
+                       required=False, metavar='PREFIX',
+                       default=None)
+    group.add_argument('--history',
+                       help='Append a summary of the run (duration, phase timings, request, retry and '
+                            'association counts) to this JSONL file; see '
+                            'python -m podaac.umm_common.history report',
+                       required=False, metavar='FILE',
+                       default=None)
+    group.add_argument('--trace',
+                       help='Write spans of the run (phases, retries, association batches, HTTP requests) '
+                            'to this file in the Chrome trace format, for chrome://tracing or Perfetto',
+                       required=False, metavar='FILE',
+                       default=None)
+
+
+def add_breaker_arguments(parser):
+    """
+    Add circuit breaker options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    """
+
+    group = parser.add_argument_group('circuit breaker')
+    group.add_argument('--circuit_breaker',
+                       help='Stop sending requests while CMR is failing; pending association '
+                            'operations go to the failure report instead of waiting on timeouts',
+                       required=False, action='store_true',
+                       default=False)
+    group.add_argument('--breaker_error_rate',
+                       help='Share of failed recent requests that opens the circuit, default 0.5',
+                       required=False, type=float,
+                       default=0.5)
+    group.add_argument('--breaker_latency',
+                       help='Requests slower than this many seconds count as failures',
+                       required=False, type=float,
+                       default=None)
+    group.add_argument('--breaker_min_requests',
+                       help='Requests seen before the circuit may open, default 5',
+                       required=False, type=int,
+                       default=5)
+    group.add_argument('--breaker_cooldown',
+                       help='Seconds the circuit stays open before a probe request, default 30',
+                       required=False, type=float,
+                       default=30.0)
+
+
+def add_latency_arguments(parser):
+    """
+    Add adaptive timeout and hedging options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    """
+
+    group = parser.add_argument_group('latency')
+    group.add_argument('--adaptive_timeout',
+                       help='Derive per endpoint timeouts of GET requests from observed response times, '
+                            'never above --timeout; an endpoint needs 20 recorded requests first, so '
+                            'this mostly helps long runs (watch, sweep, batches)',
+                       required=False, action='store_true',
+                       default=False)
+    group.add_argument('--hedge',
+                       help='Send a second copy of a search request still unanswered after the '
+                            'observed p95 and use whichever answers first',
+                       required=False, action='store_true',
+                       default=False)
+
+
+def add_transport_arguments(parser):
+    """
+    Add HTTP transport options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    """
+
+    group = parser.add_argument_group('transport')
+    group.add_argument('--http2',
+                       help='Send requests over HTTP/2 so concurrent searches and association calls '
+                            'multiplex over a few connections (needs httpx[http2])',
+                       required=False, action='store_true',
+                       default=False)
+    group.add_argument('--http2_connections',
+                       help='HTTP/2 connections per host',
+                       required=False, type=int,
+                       default=4)
+
+
+def add_scheduler_arguments(parser):
+    """
+    Add request scheduler options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    """
+
+    group = parser.add_argument_group('scheduler')
+    group.add_argument('--schedule',
+                       help='Queue requests by class (token, ingest, search, association) with a '
+                            'concurrency budget each, record writes and searches going before '
+                            'association writes',
+                       required=False, action='store_true',
+                       default=False)
+    group.add_argument('--budget',
+                       help='Concurrency budget of a request class as CLASS=N, repeatable; '
+                            'defaults token=2 ingest=4 search=8 association=6',
+                       required=False, action='append', metavar='CLASS=N',
+                       default=None)
+    group.add_argument('--max_concurrency',
+                       help='Requests in flight across all classes, default 12',
+                       required=False, type=int,
+                       default=12)
+
+
+def add_override_arguments(parser):
+    """
+    Add record override options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    """
+
+    group = parser.add_argument_group('overrides')
+    group.add_argument('--set',
+                       help='Override a field of the record before it is published: /pointer=value '
+                            'sets a string, /pointer:=json a JSON value. Can be repeated.',
+                       required=False, action='append', metavar='POINTER=VALUE',
+                       default=[])
+    group.add_argument('--override_file',
+                       help='JSON object of pointer: value overrides, by default '
+                            '<record>_<env>_overrides.json or <env>_overrides.json next to the record',
+                       required=False,
+                       default=None)
+
+
+def add_cassette_arguments(parser):
+    """
+    Add HTTP record and replay options to parser
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+    """
+
+    group = parser.add_argument_group('record and replay')
+    exclusive = group.add_mutually_exclusive_group()
+    exclusive.add_argument('--record_cassette',
+                           help='Write every CMR request, response and latency of the run to this file, '
+                                'credentials redacted',
+                           required=False, metavar='cassette.json',
+                           default=None)
+    exclusive.add_argument('--replay_cassette',
+                           help='Answer requests from a recorded cassette instead of CMR',
+                           required=False, metavar='cassette.json',
+                           default=None)
+    group.add_argument('--replay_latency',
+                       help='Factor applied to the recorded latencies on replay, 0 for none',
+                       required=False, type=float,
+                       default=1.0)
+
+
+def build_parser(concept):
+    """
+    Argument parser of an entry point
+    Parameters
+    ----------
+    concept : ConceptType published by the entry point
+    Returns
+    -------
+    argparse.ArgumentParser
+    """
+
+    label = concept.label
+    parser = argparse.ArgumentParser(
+        description='Update CMR with latest profile',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+
+    parser.add_argument('-f', '--jfilename',
+                        help=f'{label} file: '
+                             f'JSON file containing {label} profile'
+                             'schema to be submitted to CMR for'
+                             ' creation or update.',
+                        required=False,
+                        metavar='filename.json')
+
+    parser.add_argument('-p', '--provider',
+                        help='A provider ID identifies a provider and is'
+                             'composed of a combination of upper case'
+                             ' letters, digits, and underscores.'
+                             'The maximum length is 10 characters.'
+                             f'Concept ID is provided if {label} record already'
+                             'exists and needs to be updated.',
+                        required=True,
+                        default='POCLOUD',
+                        metavar='POCLOUD')
+
+    parser.add_argument('-e', '--env',
+                        help='CMR environment used to request token '
+                             'and pull results from.',
+                        required=True,
+                        metavar='uat or ops')
+
+    parser.add_argument('-cu', '--cmr_user',
+                        help='CMR Username to be used to request token.',
+                        required=False,
+                        metavar='ssm.get_parameter, '
+                                'parameter["Parameter"]["urs_user"]')
+
+    parser.add_argument('-cp', '--cmr_pass',
+                        help='CMR Username to be used to request token.',
+                        required=False,
+                        metavar='ssm.get_parameter, '
+                                'parameter["Parameter"]["urs_password"]')
+
+    parser.add_argument('-t', '--token',
+                        help='CMR UMM token string.',
+                        default=None,
+                        required=False,
+                        metavar='Launchpad token or EDL token')
+
+    parser.add_argument('-d', '--debug', action='store_true',
+                        help='Set logging to debug',
+                        required=False)
+
+    parser.add_argument('-a', '--assoc',
+                        help='Association concept ID or file containing'
+                             ' many concept IDs to be associated'
+                             f' with {label} provided.',
+                        required=False,
+                        default=None,
+                        metavar='associations.txt')
+
+    parser.add_argument('-to', '--timeout',
+                        help='Set timeout on requests',
+                        required=False, type=int,
+                        default=30)
+
+    parser.add_argument('-r', '--disable_removal', action='store_false',
+                        help='Disable CMR association removal during sync event',
+                        required=False)
+
+    parser.add_argument('-uv', '--umm_version',
+                        help='umm version were trying to update',
+                        required=False,
+                        default=concept.default_version)
+
+    # a run does one of these, or else updates the record of -f
+    modes = parser.add_argument_group('run modes').add_mutually_exclusive_group()
+    add_watch_arguments(parser, modes)
+    add_journal_arguments(parser)
+    add_resolver_arguments(parser)
+    add_failure_arguments(parser, modes)
+    add_sweep_arguments(parser, modes)
+    add_decommission_arguments(parser, modes)
+    add_rollback_arguments(parser, modes)
+    add_compare_arguments(parser, modes)
+    add_run_arguments(parser)
+    add_breaker_arguments(parser)
+    add_latency_arguments(parser)
+    add_transport_arguments(parser)
+    add_scheduler_arguments(parser)
+    add_override_arguments(parser)
+    add_cassette_arguments(parser)
+    return parser
+
+
+def parse_args(concept, argv=None):
+    """
+    Parses the program arguments
+    Returns
+    -------
+    args
+    """
+
+    parser = build_parser(concept)
+    args = parser.parse_args(argv)
+    if args.compare:
+        # comparison only reads public search results
+        if not args.jfilename and not args.native_id:
+            parser.error(f'No {concept.label} to compare, add -f or --native_id')
+        if args.compare.lower() == args.env.lower():
+            parser.error('--compare needs an environment other than -e')
+    elif not args.token and not (args.cmr_pass and args.cmr_user):
+        parser.error('No credentials provided, add -t or -cu and -cp')
+    elif args.rollback and not args.jfilename and not args.native_id:
+        parser.error(f'No {concept.label} to roll back, add -f or --native_id')
+    elif not (args.jfilename or args.watch or args.retry_failures or args.sweep or args.decommission
+              or args.decommission_file or args.rollback):
+        parser.error(f'No {concept.label} file provided, add -f, -w, --sweep or --decommission')
+    validate_arguments(parser, args)
+    return args
@@ -0,0 +1,286 @@
+"""
+==============
+client.py
+==============
+
+Shared CMR HTTP client used by the UMM-S and UMM-T updaters.
+
+Keeps a pooled requests session, the tokens requested per environment
+and a concept_id cache so repeated calls (batch or watch mode) do not
+pay connection setup and lookups again. A token CMR rejects (401, e.g.
+expired in a long watch run) is dropped so the next run requests a new one.
+"""
+
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+import requests
+
+from podaac.umm_common import codec
+from podaac.umm_common import deadline
+from podaac.umm_common import tracing
+from podaac.umm_common.breaker import CircuitBreaker
+from podaac.umm_common.latency import LatencyTracker, endpoint_key
+
+LOGGER = logging.getLogger(__name__)
+
+
+def cmr_environment_url(env):
+    """
+    Determine ops or uat url prefix based on env string
+    Parameters
+    ----------
+    env : string
+
+    Returns
+    -------
+    url_prefix : string
+    """
+    # CMR OPS (Operations, also known as Production or PROD)
+    if env.lower() == 'ops':
+        url_prefix = "https://cmr.earthdata.nasa.gov"
+    # CMR UAT (User Acceptance Testing)
+    elif env.lower() == 'uat':
+        url_prefix = "https://cmr.uat.earthdata.nasa.gov"
+    else:
+        raise Exception('CMR environment selection not recognized;'
+                        ' Select uat or ops.')
+    return url_prefix
+
+
+class CmrClient:  # pylint: disable=too-many-instance-attributes
+    """
+    Pooled HTTP client shared by every CMR call of a run
+    """
+
+    def __init__(self, timeout=30, breaker=None, latency=None, hedge=False, scheduler=None):
+        # pylint: disable=too-many-arguments
+        self.timeout = timeout
+        self.breaker = breaker
+        self.latency = latency
+        self.hedge = hedge
+        self.scheduler = scheduler
+        self.session = requests.Session()
+        self.tokens = {}
+        self.concept_ids = {}
+        self.stats = {'requests': 0, 'errors': 0, 'hedges_sent': 0, 'hedges_won': 0}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the pooled session
+        Parameters
+        ----------
+        method : string HTTP method
+        url : string
+        Returns
+        -------
+        Request response
+        """
+
+        kwargs['timeout'] = deadline.request_timeout(kwargs.get('timeout', self.timeout))
+        endpoint = endpoint_key(method, url)
+        if self.latency is not None and method == 'GET':
+            # writes keep the configured timeout: a slow ingest cut short may still be applied by CMR
+            kwargs['timeout'] = self.latency.timeout(endpoint, kwargs['timeout'])
+            if self.hedge:
+                delay = self.latency.percentile(endpoint, 95)
+                if delay is not None:
+                    return self._hedged(method, url, endpoint, delay, kwargs)
+        return self._send(method, url, endpoint, kwargs)
+
+    def _send(self, method, url, endpoint, kwargs):
+        status = None
+        # the breaker is consulted once a slot is held, so a request given up while
+        # queued neither takes the half-open probe nor counts as sent; time queued
+        # by the scheduler is not response time
+        with self.scheduler.slot(method, url) if self.scheduler is not None else nullcontext():
+            if self.breaker is not None:
+                self.breaker.before(url)
+            with self._lock:
+                self.stats['requests'] += 1
+            start = time.monotonic()
+            try:
+                with tracing.span(endpoint, 'http', url=url) as request_span:
+                    resp = self.session.request(method, url, **kwargs)
+                    status = resp.status_code
+                    request_span.set(status=status)
+                if status == 401:
+                    self.forget_token((kwargs.get('headers') or {}).get('Authorization'))
+                return resp
+            except requests.exceptions.RequestException:
+                with self._lock:
+                    self.stats['errors'] += 1
+                raise
+            finally:
+                elapsed = time.monotonic() - start
+                if self.breaker is not None:
+                    self.breaker.record(status, elapsed)
+                if self.latency is not None and status is not None:
+                    self.latency.record(endpoint, elapsed)
+
+    def _hedged(self, method, url, endpoint, delay, kwargs):
+        """
+        Send an idempotent request, firing a second identical request
+        if the first has not answered after delay seconds, and return
+        whichever response arrives first
+        """
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='cmr-hedge')
+        primary = self._executor.submit(self._send, method, url, endpoint, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        LOGGER.debug("Hedging %s %s after %.3fs", method, url, delay)
+        hedge = self._executor.submit(self._send, method, url, endpoint, kwargs)
+        with self._lock:
+            self.stats['hedges_sent'] += 1
+        error = None
+        for future in as_completed([primary, hedge]):
+            try:
+                resp = future.result()
+            except requests.exceptions.RequestException as err:
+                error = err
+                continue
+            if future is hedge:
+                with self._lock:
+                    self.stats['hedges_won'] += 1
+            return resp
+        raise error
+
+    def get(self, url, **kwargs):
+        """GET url through the pooled session"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """POST url through the pooled session"""
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        """PUT url through the pooled session"""
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        """DELETE url through the pooled session"""
+        return self.request('DELETE', url, **kwargs)
+
+    def forget_token(self, token):
+        """
+        Drop a cached token CMR no longer accepts
+        Returns
+        -------
+        bool True when token was cached
+        """
+        with self._lock:
+            expired = [cmr_env for cmr_env, cached in self.tokens.items() if token is not None and cached == token]
+            for cmr_env in expired:
+                LOGGER.warning("CMR rejected the %s token, a new one will be requested", cmr_env)
+                del self.tokens[cmr_env]
+        return bool(expired)
+
+    def cached_concept_id(self, cmr_env, concept_type, provider, native_id):
+        """
+        Return concept_id cached for a native_id or None
+        """
+        return self.concept_ids.get((cmr_env, concept_type, provider, native_id))
+
+    def cache_concept_id(self, cmr_env, concept_type, provider, native_id, concept_id):
+        """
+        Remember concept_id of a native_id, None values are not cached
+        """
+        if concept_id is not None:
+            self.concept_ids[(cmr_env, concept_type, provider, native_id)] = concept_id
+
+    def metrics(self):
+        """
+        Snapshot of client counters
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats['cached_concept_ids'] = len(self.concept_ids)
+        if self.breaker is not None:
+            stats['breaker'] = self.breaker.metrics()
+        if self.latency is not None:
+            stats['latency'] = self.latency.metrics()
+        if self.scheduler is not None:
+            stats['scheduler'] = self.scheduler.metrics()
+        return stats
+
+    def close(self):
+        """Close pooled connections, logging the request scheduler queues"""
+        if self.scheduler is not None:
+            LOGGER.info("Request scheduler: %s", codec.dumps(self.scheduler.metrics()['classes']))
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+def client_from_args(args):
+    """
+    Build the client of a run from the updater arguments
+    Parameters
+    ----------
+    args : argparse.Namespace updater arguments
+    Returns
+    -------
+    CmrClient
+    """
+
+    breaker = None
+    if args.circuit_breaker:
+        breaker = CircuitBreaker(error_rate=args.breaker_error_rate, slow_call=args.breaker_latency,
+                                 min_requests=args.breaker_min_requests, cooldown=args.breaker_cooldown)
+    latency = None
+    if args.adaptive_timeout or args.hedge:
+        latency = LatencyTracker(multiplier=3.0 if args.adaptive_timeout else None)
+    scheduler = None
+    if args.schedule:
+        from podaac.umm_common import scheduler as request_scheduler  # pylint: disable=import-outside-toplevel
+        scheduler = request_scheduler.RequestScheduler(budgets=request_scheduler.parse_budgets(args.budget),
+                                                       total=args.max_concurrency)
+    client = CmrClient(timeout=args.timeout, breaker=breaker, latency=latency, hedge=args.hedge,
+                       scheduler=scheduler)
+    if args.http2:
+        from podaac.umm_common import http2  # pylint: disable=import-outside-toplevel
+        http2.mount(client.session, max_connections=args.http2_connections)
+    # a cassette replaces the transport
+    if args.record_cassette or args.replay_cassette:
+        from podaac.umm_common import cassette  # pylint: disable=import-outside-toplevel
+        if args.record_cassette:
+            cassette.mount(client.session, args.record_cassette, 'record')
+        else:
+            cassette.mount(client.session, args.replay_cassette, 'replay', latency_scale=args.replay_latency)
+    return client
+
+
+_DEFAULT_CLIENT = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_client(client=None):
+    """
+    Return client if given, otherwise the process wide default client
+    Parameters
+    ----------
+    client : CmrClient or None
+    Returns
+    -------
+    CmrClient
+    """
+
+    global _DEFAULT_CLIENT  # pylint: disable=global-statement
+    if client is not None:
+        return client
+    with _DEFAULT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = CmrClient()
+    return _DEFAULT_CLIENT
@@ -0,0 +1,105 @@
+"""
+==============
+codec.py
+==============
+
+JSON codec shared by every module.
+
+Responses are parsed straight from their bytes instead of decoding
+them to text first, and orjson is used when it is installed: it
+parses about as fast as the standard library but serializes profiles
+(pretty printed with sorted keys for the logs) an order of magnitude
+faster. Set UMM_JSON_CODEC=json to force the standard
+library.
+
+Both backends read and write the same JSON; pretty output is indented
+by 4 with the standard library and by 2 with orjson, the only
+indentation it supports.
+"""
+
+# orjson is a compiled extension pylint cannot inspect
+# pylint: disable=no-member
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # pylint: disable=invalid-name
+
+if os.environ.get('UMM_JSON_CODEC', '').lower() == 'json':
+    orjson = None  # pylint: disable=invalid-name
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data):
+    """
+    Parse JSON
+    Parameters
+    ----------
+    data : bytes, bytearray or string
+    Returns
+    -------
+    parsed object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, pretty=False, sort_keys=False):
+    """
+    Serialize obj to a JSON string
+    Parameters
+    ----------
+    pretty : bool indent the output for people to read
+    sort_keys : bool sort the keys of every object
+    Returns
+    -------
+    string
+    """
+    if orjson is None:
+        return json.dumps(obj, indent=4 if pretty else None, sort_keys=sort_keys, ensure_ascii=False)
+    return dump_bytes(obj, pretty=pretty, sort_keys=sort_keys).decode()
+
+
+def dump_bytes(obj, pretty=False, sort_keys=False):
+    """
+    Serialize obj to UTF-8 JSON, e.g. a request body
+    Returns
+    -------
+    bytes
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # types orjson refuses (e.g. integers beyond 64 bit), let the standard library try
+            pass
+    return json.dumps(obj, indent=4 if pretty else None, sort_keys=sort_keys, ensure_ascii=False).encode()
+
+
+def load(fileobj):
+    """Parse a JSON file opened in text or binary mode"""
+    return loads(fileobj.read())
+
+
+def dump(obj, fileobj, pretty=False, sort_keys=False):
+    """Write obj as JSON to a file opened in text mode"""
+    fileobj.write(dumps(obj, pretty=pretty, sort_keys=sort_keys))
+
+
+def response_json(resp):
+    """
+    Parsed body of a requests response, from its bytes
+    Raises
+    ------
+    ValueError when the body is not JSON
+    """
+    return loads(resp.content)
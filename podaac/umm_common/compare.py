@@ -0,0 +1,160 @@
+"""
+==============
+compare.py
+==============
+
+Read-only comparison of one record between two CMR environments,
+typically UAT before promoting to OPS.
+
+Both environments are fetched at the same time: the record with its
+revision, then its associated collections in paginated searches. The
+profiles are diffed path by path, and because collection concept ids
+differ between environments the associations are matched by
+collection ShortName and Version.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from podaac.umm_common import codec
+from podaac.umm_common.client import cmr_environment_url
+from podaac.umm_common.diff import changed_paths
+from podaac.umm_common.search import search_items
+
+LOGGER = logging.getLogger(__name__)
+
+
+def fetch_record(concept, cmr_env, provider, native_id, timeout=30, client=None):
+    """
+    A record and its associated collections in one environment
+    Parameters
+    ----------
+    concept : ConceptType
+    cmr_env : string
+    provider : string
+    native_id : string
+    Returns
+    -------
+    dict {env, concept_id, revision_id, umm, collections} or None when
+    the environment has no such record; collections maps
+    (ShortName, Version) to the collection concept id
+    """
+
+    url_prefix = cmr_environment_url(cmr_env)
+    url = concept.search_url(url_prefix, 'umm_json') + f"?provider={provider}&native_id={native_id}"
+    items = list(search_items(url, timeout=timeout, client=client))
+    if not items:
+        LOGGER.info("No %s %s in %s", concept.label, native_id, cmr_env)
+        return None
+    meta = items[0]['meta']
+    concept_id = meta['concept-id']
+
+    # the json feed carries short_name and version_id without the full collection metadata
+    url = f"{url_prefix}/search/collections.json?{concept.name}_concept_id={concept_id}"
+    collections = {}
+    for entry in search_items(url, timeout=timeout, client=client):
+        collections[(entry.get('short_name'), entry.get('version_id'))] = entry['id']
+    LOGGER.info("%s %s in %s: %s revision %s, %s associated collections", concept.label, native_id, cmr_env,
+                concept_id, meta.get('revision-id'), len(collections))
+    return {
+        'env': cmr_env,
+        'concept_id': concept_id,
+        'revision_id': meta.get('revision-id'),
+        'umm': items[0]['umm'],
+        'collections': collections,
+    }
+
+
+def map_collections(source, target):
+    """
+    Match the collections associated in two environments
+    Parameters
+    ----------
+    source : dict (ShortName, Version) -> concept id
+    target : dict (ShortName, Version) -> concept id
+    Returns
+    -------
+    (matched, source_only, target_only) lists of
+    {short_name, version, source, target} dicts
+    """
+
+    def entry(key):
+        return {'short_name': key[0], 'version': key[1],
+                'source': source.get(key), 'target': target.get(key)}
+
+    keys = sorted(set(source) | set(target), key=lambda key: (str(key[0]), str(key[1])))
+    matched = [entry(key) for key in keys if key in source and key in target]
+    source_only = [entry(key) for key in keys if key not in target]
+    target_only = [entry(key) for key in keys if key not in source]
+    return matched, source_only, target_only
+
+
+def compare_environments(concept, provider, native_id, source_env, target_env, timeout=30, client=None):
+    """
+    Compare a record between two environments
+    Parameters
+    ----------
+    concept : ConceptType
+    provider : string
+    native_id : string
+    source_env : string environment promoted from, e.g. 'uat'
+    target_env : string environment promoted to, e.g. 'ops'
+    Returns
+    -------
+    dict comparison report
+    """
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(fetch_record, concept, env, provider, native_id, timeout=timeout, client=client)
+                   for env in (source_env, target_env)]
+        source, target = [future.result() for future in futures]
+
+    report = {
+        'native_id': native_id,
+        'concept_type': concept.path,
+        'source': source_env,
+        'target': target_env,
+    }
+    for name, record in (('source', source), ('target', target)):
+        report[f'{name}_record'] = None if record is None else {
+            'concept_id': record['concept_id'], 'revision_id': record['revision_id']}
+    if source is None or target is None:
+        report['changed_paths'] = None
+        report['collections'] = None
+        return report
+
+    matched, source_only, target_only = map_collections(source['collections'], target['collections'])
+    report['changed_paths'] = changed_paths(target['umm'], source['umm'])
+    report['collections'] = {
+        'matched': matched,
+        'source_only': source_only,
+        'target_only': target_only,
+    }
+    return report
+
+
+def run_compare(args, concept, native_id, client=None):
+    """
+    Compare native_id between args.env and args.compare, log and
+    optionally write the report to args.compare_report
+    Returns
+    -------
+    dict comparison report
+    """
+
+    report = compare_environments(concept, args.provider, native_id, args.env, args.compare,
+                                  timeout=args.timeout, client=client)
+    if report['changed_paths'] is None:
+        missing = [env for env, key in ((args.env, 'source_record'), (args.compare, 'target_record'))
+                   if report[key] is None]
+        LOGGER.info("%s %s missing in %s", concept.label, native_id, ', '.join(missing))
+    else:
+        collections = report['collections']
+        LOGGER.info("%s %s %s -> %s: %s changed paths %s, %s collections matched, %s only in %s, %s only in %s",
+                    concept.label, native_id, args.env, args.compare, len(report['changed_paths']),
+                    report['changed_paths'], len(collections['matched']), len(collections['source_only']),
+                    args.env, len(collections['target_only']), args.compare)
+    if args.compare_report:
+        with open(args.compare_report, 'w') as rfile:
+            codec.dump(report, rfile, pretty=True)
+    return report
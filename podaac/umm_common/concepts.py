@@ -0,0 +1,77 @@
+"""
+==============
+concepts.py
+==============
+
+Concept type descriptors driving the shared update engine.
+
+A ConceptType carries everything that differs between UMM-S, UMM-T and
+UMM-Var records: the CMR path used for search, ingest and associations,
+the default UMM schema version and the MetadataSpecification name used
+to recognise a record of that type in a mixed batch. CMR ingests UMM-Var
+records only under the collection they belong to, which also makes the
+association.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ConceptType:
+    """
+    CMR concept type of the records being published
+    """
+    name: str
+    label: str
+    path: str
+    default_version: str
+    # created and updated through .../collections/<collection>/<path>/<native_id>
+    collection_scoped: bool = False
+
+    def search_url(self, url_prefix, fmt):
+        """Search endpoint, fmt is 'json' or 'umm_json'"""
+        return f"{url_prefix}/search/{self.path}.{fmt}"
+
+    def ingest_url(self, url_prefix, provider, native_id, collection=None):
+        """Ingest endpoint of one record, under collection for a collection scoped ingest"""
+        if collection is not None:
+            return f"{url_prefix}/ingest/providers/{provider}/collections/{collection}/{self.path}/{native_id}"
+        return f"{url_prefix}/ingest/providers/{provider}/{self.path}/{native_id}"
+
+    def association_url(self, url_prefix, concept_id):
+        """Collection association endpoint of one record"""
+        return f"{url_prefix}/search/{self.path}/{concept_id}/associations"
+
+
+SERVICE = ConceptType(name='service', label='UMM-S', path='services', default_version='1.3.4')
+TOOL = ConceptType(name='tool', label='UMM-T', path='tools', default_version='1.0')
+VARIABLE = ConceptType(name='variable', label='UMM-Var', path='variables', default_version='1.9.0',
+                       collection_scoped=True)
+
+CONCEPT_TYPES = {concept.label: concept for concept in (SERVICE, TOOL, VARIABLE)}
+
+
+def record_concept(umm, default=None):
+    """
+    Concept type of a UMM record from its MetadataSpecification
+    Parameters
+    ----------
+    umm : dict UMM record
+    default : ConceptType used when the record does not name its type
+    Returns
+    -------
+    ConceptType
+    """
+
+    spec = umm.get('MetadataSpecification') or {}
+    concept = CONCEPT_TYPES.get(spec.get('Name'), default)
+    if concept is None:
+        raise ValueError('Cannot tell the concept type of the record, it has no '
+                         'MetadataSpecification.Name of ' + ', '.join(CONCEPT_TYPES))
+    return concept
+
+
+def record_version(umm, concept):
+    """UMM schema version named by the record's MetadataSpecification, else the concept default"""
+    spec = umm.get('MetadataSpecification') or {}
+    return spec.get('Version') or concept.default_version
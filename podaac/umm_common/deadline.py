@@ -0,0 +1,118 @@
+"""
+==============
+deadline.py
+==============
+
+Global run deadline (`--deadline`).
+
+Every HTTP call, backoff loop and readiness wait consults the current
+deadline: request timeouts shrink to the remaining budget, backoff
+loops stop retrying when it is spent and DeadlineExceeded is raised
+once it has expired.
+"""
+
+import logging
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the run deadline has expired"""
+
+
+class Deadline:
+    """
+    Wall clock budget of a run
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        """Seconds left, never negative"""
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self):
+        """True once the budget is spent"""
+        return self.remaining() <= 0
+
+    def check(self):
+        """Raise DeadlineExceeded if the budget is spent"""
+        if self.expired():
+            raise DeadlineExceeded(f'run deadline of {self.seconds}s exceeded')
+
+    def timeout(self, default):
+        """
+        Per call timeout: default, shrunk to the remaining budget
+        Parameters
+        ----------
+        default : number or None
+        Returns
+        -------
+        number
+        """
+        self.check()
+        remaining = self.remaining()
+        if default is None:
+            return remaining
+        return min(default, remaining)
+
+    def sleep(self, seconds):
+        """Sleep, raising DeadlineExceeded if the budget runs out first"""
+        remaining = self.remaining()
+        if seconds >= remaining:
+            time.sleep(remaining)
+            raise DeadlineExceeded(f'run deadline of {self.seconds}s exceeded while waiting')
+        time.sleep(seconds)
+
+
+_CURRENT = None
+
+
+def start(seconds):
+    """
+    Start the run deadline, None or 0 disables it
+    Returns
+    -------
+    Deadline or None
+    """
+    global _CURRENT  # pylint: disable=global-statement
+    _CURRENT = Deadline(seconds) if seconds else None
+    if _CURRENT is not None:
+        LOGGER.info("Run deadline: %ss", seconds)
+    return _CURRENT
+
+
+def current():
+    """The active Deadline or None"""
+    return _CURRENT
+
+
+def request_timeout(default):
+    """Timeout for one request under the active deadline"""
+    if _CURRENT is None:
+        return default
+    return _CURRENT.timeout(default)
+
+
+def sleep(seconds):
+    """time.sleep bounded by the active deadline"""
+    if _CURRENT is None:
+        time.sleep(seconds)
+    else:
+        _CURRENT.sleep(seconds)
+
+
+def backoff_max_time():
+    """max_time for backoff decorators: the remaining budget or no limit"""
+    if _CURRENT is None:
+        return None
+    return _CURRENT.remaining()
+
+
+def backoff_giveup(details):
+    """on_giveup handler turning a backoff loop cut short by the deadline into DeadlineExceeded"""
+    if _CURRENT is not None and _CURRENT.expired():
+        raise DeadlineExceeded(f"run deadline of {_CURRENT.seconds}s exceeded in {details['target'].__name__}")
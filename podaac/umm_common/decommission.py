@@ -0,0 +1,259 @@
+"""
+==============
+decommission.py
+==============
+
+Retire a batch of records: the native_ids are given as a list or as
+patterns matched against every record of the provider (one paginated
+search). For each matched record the collection associations are
+removed in batches, then the record is deleted; records are processed
+concurrently with every request going through a shared rate limit.
+
+Nothing is changed unless args.apply is set, the report then lists
+what would be removed. A record whose dissociations failed is kept;
+after the final retry pass of the failed dissociations it is deleted
+if they all succeeded, and reported as not decommissioned otherwise.
+"""
+
+import fnmatch
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from requests import exceptions
+
+from podaac.umm_common import associations
+from podaac.umm_common import codec
+from podaac.umm_common import deadline
+from podaac.umm_common.client import cmr_environment_url
+from podaac.umm_common.sweep import remote_records
+
+LOGGER = logging.getLogger(__name__)
+
+# collections dissociated per request
+ASSOCIATION_BATCH = 100
+DISSOCIATION_FAILED = 'association removal failed'
+
+
+class RateLimiter:  # pylint: disable=too-few-public-methods
+    """
+    Spaces calls so no more than rate start per second, across threads
+    """
+
+    def __init__(self, rate):
+        """
+        Parameters
+        ----------
+        rate : float calls per second, None or 0 for no limit
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next call may start"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            deadline.sleep(start - now)
+
+
+def read_native_ids(path):
+    """
+    Native ids or patterns listed one per line in a file, blank lines and # comments skipped
+    Returns
+    -------
+    list of strings
+    """
+    with open(path) as nfile:
+        lines = [line.split('#', 1)[0].strip() for line in nfile]
+    return [line for line in lines if line]
+
+
+def select_records(remote, patterns):
+    """
+    Records whose native_id matches one of the patterns
+    Parameters
+    ----------
+    remote : dict native_id -> record, see sweep.remote_records
+    patterns : list of native ids or fnmatch patterns
+    Returns
+    -------
+    (selected native ids, patterns matching no record)
+    """
+    selected = set()
+    unmatched = []
+    for pattern in patterns:
+        matches = fnmatch.filter(remote, pattern)
+        if not matches:
+            unmatched.append(pattern)
+        selected.update(matches)
+    return sorted(selected), unmatched
+
+
+def decommission_record(entry, cmr_env, provider, concept, delete_record, current_token, limiter,
+                        timeout=30, client=None, failures=None):
+    """
+    Dissociate all collections of one record in batches, then delete it;
+    entry is updated with the outcome
+    Parameters
+    ----------
+    entry : dict report entry with native_id, concept_id and associations
+    concept : ConceptType
+    delete_record : callable(cmr_env, provider, native_id, header, timeout, client)
+    limiter : RateLimiter shared by the run
+    failures : FailureReport collecting failed dissociations, optional
+    """
+
+    header = {
+        'Content-type': "application/json",
+        'Authorization': str(current_token),
+    }
+    url_prefix = cmr_environment_url(cmr_env)
+    collections = entry['associations']
+    for start in range(0, len(collections), ASSOCIATION_BATCH):
+        batch = collections[start:start + ASSOCIATION_BATCH]
+        limiter.wait()
+        status, text = associations.remove_association_batch(url_prefix, entry['concept_id'], batch, header,
+                                                             concept.path, timeout=timeout, client=client)
+        LOGGER.info("Remove %s associations of %s: response status: %s",
+                    len(batch), entry['native_id'], status)
+        if status != 200:
+            LOGGER.debug("Response text from remove associations: %s", text)
+            for assoc_concept_id in batch:
+                if failures is not None:
+                    failures.add(cmr_env, concept.path, entry['concept_id'], 'remove', assoc_concept_id,
+                                 status, text)
+            entry['error'] = f'{DISSOCIATION_FAILED} with status {status}'
+        else:
+            entry['removed'].extend(batch)
+
+    if entry['error']:
+        # leave the record in place so the remaining associations can be retried
+        return
+    delete_entry(entry, cmr_env, provider, delete_record, current_token, limiter, timeout=timeout, client=client)
+
+
+def delete_entry(entry, cmr_env, provider, delete_record, current_token, limiter, timeout=30, client=None):
+    """
+    Delete the record of a report entry whose associations are removed
+    Parameters
+    ----------
+    entry : dict report entry, updated with the outcome
+    delete_record : callable(cmr_env, provider, native_id, header, timeout, client)
+    limiter : RateLimiter shared by the run
+    """
+
+    limiter.wait()
+    try:
+        delete_record(cmr_env, provider, entry['native_id'], {'Authorization': str(current_token)},
+                      timeout=timeout, client=client)
+        entry['deleted'] = True
+    except (SystemExit, exceptions.RequestException, deadline.DeadlineExceeded) as err:
+        # delete_record reports HTTP errors as SystemExit
+        entry['error'] = f'delete failed: {err}'
+
+
+def finish_dissociations(entries, args, delete_record, current_token, limiter, client=None, failures=None):
+    """
+    Retry the failed dissociations once more (see
+    associations.final_retry_pass), then delete the records whose
+    dissociations all succeeded and mark the others as not decommissioned
+    Parameters
+    ----------
+    entries : list of report entries, updated in place
+    args : argparse.Namespace updater arguments
+    failures : FailureReport of the failed dissociations
+    """
+
+    remaining = associations.final_retry_pass(failures, current_token, args.failure_report,
+                                              timeout=args.timeout, client=client)
+    still_failing = {failure['concept_id'] for failure in remaining}
+    for entry in entries:
+        if entry['deleted'] or not (entry['error'] or '').startswith(DISSOCIATION_FAILED):
+            continue
+        if entry['concept_id'] in still_failing:
+            entry['error'] = f'not decommissioned: {DISSOCIATION_FAILED} after the retry pass'
+            continue
+        LOGGER.info("Associations of %s removed on retry, deleting it", entry['native_id'])
+        entry['removed'] = list(entry['associations'])
+        entry['error'] = None
+        delete_entry(entry, args.env, args.provider, delete_record, current_token, limiter,
+                     timeout=args.timeout, client=client)
+
+
+def run_decommission(args, concept, delete_record, current_token=None, client=None, failures=None):
+    """
+    Decommission the records of args.provider selected by
+    args.decommission patterns and the args.decommission_file list
+    Parameters
+    ----------
+    args : argparse.Namespace updater arguments
+    concept : ConceptType
+    delete_record : callable(cmr_env, provider, native_id, header, timeout, client)
+    current_token : string cmr token, needed with args.apply
+    failures : FailureReport collecting failed dissociations, retried
+               once more before the report is written
+    Returns
+    -------
+    dict decommission report
+    """
+
+    patterns = list(args.decommission or [])
+    if args.decommission_file:
+        patterns.extend(read_native_ids(args.decommission_file))
+    remote = remote_records(args.env, args.provider, concept.path, timeout=args.timeout, client=client)
+    selected, unmatched = select_records(remote, patterns)
+    if unmatched:
+        LOGGER.warning("No %s of %s matches %s", concept.path, args.provider, unmatched)
+
+    entries = [{
+        'native_id': native_id,
+        'concept_id': remote[native_id]['concept_id'],
+        'associations': remote[native_id]['associations'],
+        'removed': [],
+        'deleted': False,
+        'error': None,
+    } for native_id in selected]
+    for entry in entries:
+        LOGGER.info("%s %s (%s) with %s associations", 'Decommissioning' if args.apply else 'Would decommission',
+                    entry['native_id'], entry['concept_id'], len(entry['associations']))
+
+    if args.apply and entries:
+        limiter = RateLimiter(args.rate_limit)
+        with ThreadPoolExecutor(max_workers=args.decommission_workers) as executor:
+            futures = [executor.submit(decommission_record, entry, args.env, args.provider, concept, delete_record,
+                                       current_token, limiter, timeout=args.timeout, client=client,
+                                       failures=failures)
+                       for entry in entries]
+            for future in futures:
+                future.result()
+        if failures is not None:
+            finish_dissociations(entries, args, delete_record, current_token, limiter, client=client,
+                                 failures=failures)
+
+    report = {
+        'env': args.env,
+        'provider': args.provider,
+        'concept_type': concept.path,
+        'applied': args.apply,
+        'records': entries,
+        'unmatched': unmatched,
+        'summary': {
+            'matched': len(entries),
+            'deleted': sum(1 for entry in entries if entry['deleted']),
+            'failed': sum(1 for entry in entries if entry['error']),
+            'associations': sum(len(entry['associations']) for entry in entries),
+            'associations_removed': sum(len(entry['removed']) for entry in entries),
+        },
+    }
+    LOGGER.info("Decommission summary: %s", report['summary'])
+    if args.decommission_report:
+        with open(args.decommission_report, 'w') as rfile:
+            codec.dump(report, rfile, pretty=True)
+    return report
@@ -0,0 +1,42 @@
+"""
+==============
+diff.py
+==============
+
+Structured comparison of UMM documents
+"""
+
+
+def _escape(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def changed_paths(old, new, path=''):
+    """
+    JSON pointer paths whose values differ between two documents
+    Parameters
+    ----------
+    old : json object
+    new : json object
+    Returns
+    -------
+    sorted list of string paths, empty when the documents are equal
+    """
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        paths = []
+        for key in sorted(set(old) | set(new), key=str):
+            sub_path = f"{path}/{_escape(key)}"
+            if key not in old or key not in new:
+                paths.append(sub_path)
+            else:
+                paths.extend(changed_paths(old[key], new[key], sub_path))
+        return paths
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        paths = []
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            paths.extend(changed_paths(old_item, new_item, f"{path}/{index}"))
+        return paths
+    if old == new:
+        return []
+    return [path or '/']
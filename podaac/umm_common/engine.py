@@ -0,0 +1,462 @@
+"""
+==============
+engine.py
+==============
+
+Update engine shared by umms_updater and ummt_updater.
+
+Every function is parameterized by a ConceptType, so searching,
+ingesting and associating UMM-S, UMM-T or UMM-Var records goes through
+the same code; the package entry points only choose the concept type.
+Records naming another concept type in their MetadataSpecification
+are routed to that type, which lets one run publish a mixed batch.
+
+Importing this module loads requests and backoff; the entry points
+only import it once the arguments are parsed.
+"""
+
+import copy
+import functools
+import logging
+import re
+import socket
+
+import backoff
+from requests import exceptions
+
+from podaac.umm_common import associations
+from podaac.umm_common import codec
+from podaac.umm_common import deadline
+from podaac.umm_common import history
+from podaac.umm_common import tracing
+from podaac.umm_common import pipeline
+from podaac.umm_common.client import client_from_args, cmr_environment_url, get_client
+from podaac.umm_common.concepts import record_concept, record_version
+from podaac.umm_common.failures import FailureReport
+from podaac.umm_common.revisions import check_conflict, revision_header
+
+LOGGER = logging.getLogger(__name__)
+
+
+def create_native_id(provider, umm_json):
+    """
+    Assigned native_id based on provider and
+    snake_case version of the record Name field.
+
+    Parameters
+    ----------
+    provider : string
+    umm_json : json
+    Returns
+    -------
+    new_nid : string
+    """
+    name = re.sub(r"\s+", '_', umm_json['Name']).lower()
+    return provider + "_" + name
+
+
+@backoff.on_predicate(backoff.fibo, lambda x: x is None, max_tries=10,
+                      max_time=deadline.backoff_max_time, on_giveup=deadline.backoff_giveup,
+                      on_backoff=(history.count_retry, tracing.retry))
+@tracing.traced(category='lookup')
+def pull_concept_id(concept, cmr_env, provider, native_id, timeout=30, client=None):
+    """
+    Uses constructed native_id, cmr environment and provider string to
+    pull concept_id of a record on CMR.
+
+    Parameters
+    ----------
+    concept : ConceptType
+    cmr_env : string
+    provider : string
+    native_id : string
+    client : CmrClient caching concept_ids between calls
+
+    Returns
+    -------
+    string concept_id or None
+    """
+
+    client = get_client(client)
+    concept_id = client.cached_concept_id(cmr_env, concept.path, provider, native_id)
+    if concept_id is not None:
+        return concept_id
+
+    url = concept.search_url(cmr_environment_url(cmr_env), 'json') + f"?provider={provider}&native_id={native_id}"
+    req = client.get(url, timeout=timeout)
+    found = codec.response_json(req)
+
+    if found['hits'] == 1:
+        concept_id = found['items'][0]['concept_id']
+        client.cache_concept_id(cmr_env, concept.path, provider, native_id, concept_id)
+        return concept_id
+    if found['hits'] > 1:
+        raise Exception('Provider and Native ID are not unique, '
+                        f'more than 1 {concept.name} returned.')
+    # No concept-id exists, record does not exist within CMR
+    return None
+
+
+@backoff.on_predicate(backoff.fibo, lambda x: x[0] is None, max_tries=10,
+                      max_time=deadline.backoff_max_time, on_giveup=deadline.backoff_giveup,
+                      on_backoff=(history.count_retry, tracing.retry))
+@tracing.traced(category='lookup')
+def get_current_revision(concept, cmr_env, concept_id, timeout=30, client=None):
+    """
+    Pull current profile of a record and its revision-id
+    Parameters
+    ----------
+    concept : ConceptType
+    cmr_env : string
+    concept_id : string
+
+    Returns
+    -------
+    (JSON object or None, int revision-id or None)
+    """
+
+    url = concept.search_url(cmr_environment_url(cmr_env), 'umm_json') + f"?concept_id={concept_id}&pretty=true"
+    try:
+        req = get_client(client).get(url, timeout=timeout)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Response text from get_current %s: %s", concept.name, req.text)
+        current_umm = codec.response_json(req)
+    except exceptions.HTTPError as err:
+        raise SystemExit(err) from err
+    try:
+        item = current_umm['items'][0]
+    except (IndexError, KeyError) as inderr:
+        LOGGER.debug("%s, CMR has no %s with a %s record containing "
+                     "this concept_id, one will be created.", inderr, concept.name, concept.label)
+        return None, None
+    return item['umm'], item.get('meta', {}).get('revision-id')
+
+
+def get_current(concept, cmr_env, concept_id, timeout=30, client=None):
+    """
+    Pull current profile of a record
+    Returns
+    -------
+    JSON object or None
+    """
+    return get_current_revision(concept, cmr_env, concept_id, timeout=timeout, client=client)[0]
+
+
+def create_record(concept, cmr_env, local_umm, provider, native_id, header, timeout=30, client=None,
+                  revision_id=None, collection=None):
+    """
+    Creates or updates a record and returns the ingest response
+    Parameters
+    ----------
+    concept : ConceptType
+    cmr_env : string
+    local_umm : json object
+    provider : string
+    native_id : string
+    header : json object
+    revision_id : int revision the update must become, checked by CMR
+                  (RevisionConflict on mismatch), optional
+    collection : string collection concept id a collection scoped record
+                 (UMM-Var) is ingested under
+
+    Returns
+    -------
+    Request response
+    """
+
+    if concept.collection_scoped and not collection:
+        raise Exception(f'{concept.label} record {native_id} can only be ingested under its collection, '
+                        f'give the collection with -a/--assoc')
+    url = concept.ingest_url(cmr_environment_url(cmr_env), provider, native_id,
+                             collection if concept.collection_scoped else None)
+    LOGGER.debug("URL used to create %s: %s", concept.name, url)
+    try:
+        req = get_client(client).put(url, data=codec.dump_bytes(local_umm), headers=revision_header(header, revision_id),
+                                     timeout=timeout)
+        LOGGER.info("Response from create %s: %s", concept.name, req.text)
+        check_conflict(req, revision_id)
+        req.raise_for_status()
+    except exceptions.HTTPError as err:
+        LOGGER.exception("Error creating %s", concept.name)
+        raise SystemExit(err) from err
+    return req
+
+
+def delete_record(concept, cmr_env, provider, native_id, header, timeout=30, client=None):
+    """
+    Deletes an existing record and returns the ingest response
+    Parameters
+    ----------
+    concept : ConceptType
+    cmr_env : string
+    provider : string
+    native_id : string
+    header : json object
+
+    Returns
+    -------
+    Request response
+    """
+
+    url = concept.ingest_url(cmr_environment_url(cmr_env), provider, native_id)
+    LOGGER.info("URL used to delete %s: %s", concept.name, url)
+    try:
+        req = get_client(client).delete(url, headers=header, timeout=timeout)
+        LOGGER.info("Response from delete %s: %s", concept.name, req.text)
+        req.raise_for_status()
+    except exceptions.HTTPError as err:
+        LOGGER.exception("Error deleting %s", concept.name)
+        raise SystemExit(err) from err
+    return req
+
+
+@functools.lru_cache(maxsize=1)
+def host_ip_address():
+    """IP address of this host sent with token requests, resolved once per process"""
+    return str(socket.gethostbyname(socket.gethostname()))
+
+
+def request_token(cmr_env, cmr_user, cmr_pass, client=None):
+    """
+    Function for requesting a CMR token, cached on client per environment
+    Returns
+    -------
+    current_token : string
+    """
+
+    client = get_client(client)
+    if cmr_env in client.tokens:
+        return client.tokens[cmr_env]
+
+    url = cmr_environment_url(cmr_env) + "/legacy-services/rest/tokens"
+    ip_address = host_ip_address()
+    header = {
+        'Accept': "application/json",
+        'Content-type': "application/json"
+    }
+    payload = {'token': {'username': cmr_user, 'password': cmr_pass, 'client_id': 'client',
+                         'user_ip_address': ip_address}}
+
+    LOGGER.debug("Requesting token...")
+    try:
+        req = client.post(url, json=payload, headers=header, timeout=120)
+        LOGGER.debug("Response from request for token: %s", req.text)
+        req.raise_for_status()
+    except exceptions.HTTPError as err:
+        raise SystemExit(err) from err
+    current_token = codec.response_json(req)['token']['id']
+    client.tokens[cmr_env] = current_token
+    return current_token
+
+
+def record_api(concept):
+    """
+    Functions of a concept type used by the shared update pipeline
+    Returns
+    -------
+    RecordApi
+    """
+
+    return pipeline.RecordApi(
+        label=concept.label,
+        concept_type=concept.path,
+        default_version=concept.default_version,
+        collection_scoped=concept.collection_scoped,
+        create_native_id=create_native_id,
+        pull_concept_id=functools.partial(pull_concept_id, concept),
+        get_current=functools.partial(get_current, concept),
+        get_current_revision=functools.partial(get_current_revision, concept),
+        create_record=functools.partial(create_record, concept),
+        token=request_token,
+    )
+
+
+def update_record(args, concept, client=None, local_umm=None):
+    """
+    Create or update the record in args.jfilename (or local_umm) and
+    synchronize its associations, as the concept type the record names
+    in its MetadataSpecification or else as concept
+
+    Parameters
+    ----------
+    args : argparse.Namespace updater arguments
+    concept : ConceptType of the entry point
+    client : CmrClient reused between records
+    local_umm : dict record to publish instead of reading args.jfilename
+    Returns
+    -------
+    UpdateResult
+    """
+
+    if local_umm is None:
+        with open(args.jfilename) as json_file:
+            local_umm = codec.load(json_file)
+    actual = record_concept(local_umm, concept)
+    if actual != concept:
+        LOGGER.info("%s is a %s record", args.jfilename or 'Record', actual.label)
+        args = copy.copy(args)
+        args.umm_version = record_version(local_umm, actual)
+    return pipeline.update_record(args, record_api(actual), client=client, local_umm=local_umm)
+
+
+def update_with_token_refresh(args, concept, client=None):
+    """
+    update_record, run once more with a new token when CMR rejected the
+    cached one (401) during the run, as happens once it expires in a
+    long watch run
+    Returns
+    -------
+    UpdateResult
+    """
+    client = get_client(client)
+    cached = None if args.token else client.tokens.get(args.env)
+
+    def token_dropped():
+        return cached is not None and client.tokens.get(args.env) != cached
+
+    try:
+        result = update_record(args, concept, client)
+        if result.ok or not token_dropped():
+            return result
+    except (Exception, SystemExit):  # pylint: disable=broad-except
+        if not token_dropped():
+            raise
+    LOGGER.warning("Retrying %s with a new CMR token", args.jfilename)
+    return update_record(args, concept, client)
+
+
+def recorded_update(args, concept, client=None):
+    """
+    update_record, appended to the --history file when one is given
+    Returns
+    -------
+    UpdateResult
+    """
+    recorder = history.RunRecorder(args.history, args, concept.path, 'watch', client)
+    status, result = 'failed', None
+    try:
+        result = update_with_token_refresh(args, concept, client)
+        status = 'ok' if result.ok else 'incomplete'
+        return result
+    finally:
+        recorder.finish(status, result)
+
+
+def get_token(args, client=None):
+    """
+    Token given with -t, otherwise one requested for the cmr user
+    """
+    if args.token is None:
+        return request_token(args.env, args.cmr_user, args.cmr_pass, client=client)
+    return args.token
+
+
+def selected_record(args, concept):
+    """
+    Concept type and native_id of the record named by --native_id or -f
+    Returns
+    -------
+    (ConceptType, string native_id)
+    """
+    if not args.jfilename:
+        return concept, args.native_id
+    with open(args.jfilename) as json_file:
+        local_umm = codec.load(json_file)
+    return record_concept(local_umm, concept), args.native_id or create_native_id(args.provider, local_umm)
+
+
+def main(args, concept):
+    """
+    Perfoms update to cmr and logs profile update.
+
+    Parameters
+    ----------
+    args Arguments passed to the program
+    concept : ConceptType published by the entry point
+    """
+
+    if args.debug is True:
+        service_log_level = logging.DEBUG
+    else:
+        service_log_level = logging.INFO
+    logging.basicConfig(level=service_log_level)
+    logger = logging.getLogger('podaac')
+    logger.setLevel(level=service_log_level)
+    logging.info("Starting %s update", concept.label)
+
+    tracing.start(args.trace)
+    try:
+        with tracing.span('run', mode=history.run_mode(args), env=args.env, provider=args.provider):
+            if args.profile:
+                from podaac.umm_common import profiling  # pylint: disable=import-outside-toplevel
+                with profiling.Profiler(args.profile):
+                    run(args, concept)
+            else:
+                run(args, concept)
+    finally:
+        events = tracing.stop()
+        if events is not None:
+            logging.info("Trace of %s events written to %s", events, args.trace)
+
+
+def run(args, concept):
+    """
+    Run the mode selected by args: watch, failure retry, sweep or a single update
+
+    Parameters
+    ----------
+    args Arguments passed to the program
+    concept : ConceptType published by the entry point
+    """
+
+    client = client_from_args(args)
+    deadline.start(args.deadline)
+    mode = history.run_mode(args)
+    # watch mode records each record sync instead of the whole run
+    recorder = history.RunRecorder(args.history if mode != 'watch' else None, args, concept.path, mode, client)
+    status, result = 'failed', None
+    try:
+        # modes are imported on demand so a plain update only loads what it uses
+        if args.watch:
+            from podaac.umm_common import watch  # pylint: disable=import-outside-toplevel
+            watch.run_watch(args, lambda record_args: recorded_update(record_args, concept, client), client)
+        elif args.compare:
+            from podaac.umm_common import compare  # pylint: disable=import-outside-toplevel
+            concept, native_id = selected_record(args, concept)
+            compare.run_compare(args, concept, native_id, client=client)
+        elif args.rollback:
+            from podaac.umm_common import rollback  # pylint: disable=import-outside-toplevel
+            concept, native_id = selected_record(args, concept)
+            rollback.run_rollback(args, concept, native_id, record_api(concept), get_token(args, client),
+                                  revision=args.to_revision, client=client)
+        elif args.retry_failures:
+            current_token = get_token(args, client)
+            associations.retry_report_file(args.retry_failures, current_token, args.failure_report,
+                                           timeout=args.timeout, client=client)
+        elif args.decommission or args.decommission_file:
+            from podaac.umm_common import decommission  # pylint: disable=import-outside-toplevel
+            current_token = get_token(args, client) if args.apply else None
+            failures = FailureReport()
+            decommission.run_decommission(args, concept, functools.partial(delete_record, concept),
+                                          current_token=current_token, client=client, failures=failures)
+        elif args.sweep:
+            from podaac.umm_common import sweep  # pylint: disable=import-outside-toplevel
+            current_token = None
+            failures = FailureReport()
+            if args.apply:
+                current_token = get_token(args, client)
+            sweep.run_sweep(args, concept.path, create_native_id, functools.partial(create_record, concept),
+                            args.umm_version or concept.default_version,
+                            current_token=current_token, client=client, failures=failures,
+                            record_filter=lambda umm: record_concept(umm, concept) == concept)
+            if args.apply:
+                associations.final_retry_pass(failures, current_token, args.failure_report,
+                                              timeout=args.timeout, client=client)
+        else:
+            result = update_record(args, concept, client)
+        status = 'ok' if result is None or result.ok else 'incomplete'
+    except deadline.DeadlineExceeded as err:
+        raise SystemExit(f"Stopped: {err}") from err
+    finally:
+        recorder.finish(status, result)
+        client.close()
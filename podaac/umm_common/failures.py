@@ -0,0 +1,122 @@
+"""
+==============
+failures.py
+==============
+
+Structured report of association operations that did not succeed.
+
+Failures are classified as transient (worth retrying: timeouts,
+throttling, 5xx) or permanent (e.g. an invalid collection concept id)
+and can be written to a JSON file that a later run consumes with
+`--retry_failures` to retry only those operations.
+"""
+
+import logging
+import threading
+
+from podaac.umm_common import codec
+
+LOGGER = logging.getLogger(__name__)
+
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+
+TRANSIENT_STATUS = (408, 425, 429, 500, 502, 503, 504)
+TRANSIENT_MARKERS = ('timeout', 'timed out', 'temporarily', 'try again', 'unavailable')
+
+
+def classify(status, body=None):
+    """
+    Classify a failed operation
+    Parameters
+    ----------
+    status : int HTTP status or None when no response was received
+    body : string response text or error message
+    Returns
+    -------
+    'transient' or 'permanent'
+    """
+
+    if status is None or status in TRANSIENT_STATUS:
+        return TRANSIENT
+    text = (body or '').lower()
+    if any(marker in text for marker in TRANSIENT_MARKERS):
+        return TRANSIENT
+    return PERMANENT
+
+
+class FailureReport:
+    """
+    Collected association failures of a run
+    """
+
+    def __init__(self, failures=None):
+        self.failures = list(failures or [])
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.failures)
+
+    def __iter__(self):
+        return iter(list(self.failures))
+
+    def add(self, cmr_env, concept_type, concept_id, operation, assoc_id, status, body=None, kind=None):
+        """
+        Record a failed 'add' or 'remove' association operation
+        """
+        failure = {
+            'env': cmr_env,
+            'concept_type': concept_type,
+            'concept_id': concept_id,
+            'operation': operation,
+            'assoc_id': assoc_id.strip(),
+            'status': status,
+            'body': body,
+            'kind': kind or classify(status, body),
+        }
+        with self._lock:
+            self.failures.append(failure)
+
+    def extend(self, other):
+        """Add all failures of another report"""
+        for failure in other:
+            with self._lock:
+                self.failures.append(failure)
+
+    def count(self, kind):
+        """Number of failures of the given kind"""
+        return sum(1 for failure in self.failures if failure['kind'] == kind)
+
+    def summary(self):
+        """
+        Counts per kind
+        Returns
+        -------
+        dict
+        """
+        return {'total': len(self), TRANSIENT: self.count(TRANSIENT), PERMANENT: self.count(PERMANENT)}
+
+    def write(self, path):
+        """
+        Write the report as JSON
+        Parameters
+        ----------
+        path : string
+        """
+        with open(path, 'w') as rfile:
+            codec.dump({'summary': self.summary(), 'failures': self.failures}, rfile, pretty=True)
+        LOGGER.info("Wrote failure report to %s: %s", path, self.summary())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a report written by `write`
+        Parameters
+        ----------
+        path : string
+        Returns
+        -------
+        FailureReport
+        """
+        with open(path) as rfile:
+            return cls(codec.load(rfile)['failures'])
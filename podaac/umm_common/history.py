@@ -0,0 +1,301 @@
+"""
+==============
+history.py
+==============
+
+Run history (`--history FILE`) and its trend report.
+
+Each run appends one JSON line to the history file with its duration,
+phase timings, request, error and retry counts, association volumes
+and the env/provider/native_id it worked on, so timings survive the CI
+log. In watch mode one line is written per record sync.
+
+    python -m podaac.umm_common.history report runs.jsonl
+
+shows per record how the duration and request count evolve and flags
+the runs exceeding `--threshold` times the median of the `--window`
+runs before them.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+from podaac.umm_common import codec
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 10
+DEFAULT_THRESHOLD = 1.5
+# runs needed before a baseline is trusted
+MIN_BASELINE = 3
+
+_RETRIES = {'count': 0}
+_RETRIES_LOCK = threading.Lock()
+
+
+def count_retry(_details=None):
+    """on_backoff handler counting the retries of the process"""
+    with _RETRIES_LOCK:
+        _RETRIES['count'] += 1
+
+
+def retries():
+    """Retries counted so far"""
+    with _RETRIES_LOCK:
+        return _RETRIES['count']
+
+
+def run_mode(args):
+    """Name of the mode selected by args"""
+    if args.watch:
+        return 'watch'
+    for mode in ('compare', 'rollback', 'retry_failures', 'decommission', 'sweep'):
+        if getattr(args, mode, None):
+            return mode
+    if args.decommission_file:
+        return 'decommission'
+    return 'update'
+
+
+class RunRecorder:
+    """
+    Counters of one run, appended to the history when it finishes
+    """
+
+    def __init__(self, path, args, concept_type, mode, client):
+        """
+        Parameters
+        ----------
+        path : string history file, None to record nothing
+        args : argparse.Namespace updater arguments
+        concept_type : string 'services' or 'tools'
+        mode : string, see run_mode
+        client : CmrClient of the run, its counters are read at start and finish
+        """
+        self.path = path
+        self.args = args
+        self.concept_type = concept_type
+        self.mode = mode
+        self.client = client
+        self.started = time.time()
+        self._start = time.monotonic()
+        self._counters = self._read_counters()
+
+    def _read_counters(self):
+        stats = self.client.metrics()
+        return {'requests': stats['requests'], 'errors': stats['errors'], 'hedges': stats['hedges_sent'],
+                'retries': retries()}
+
+    def summary(self, status, result=None):
+        """
+        History entry of the run
+        Parameters
+        ----------
+        status : string 'ok', 'incomplete' (failures or discrepancies left) or 'failed'
+        result : UpdateResult of an update, optional
+        Returns
+        -------
+        dict
+        """
+
+        counters = self._read_counters()
+        entry = {
+            'time': self.started,
+            'duration': round(time.monotonic() - self._start, 3),
+            'status': status,
+            'mode': self.mode,
+            'env': self.args.env,
+            'provider': self.args.provider,
+            'concept_type': self.concept_type,
+            'native_id': getattr(self.args, 'native_id', None),
+        }
+        entry.update({name: value - self._counters[name] for name, value in counters.items()})
+        if result is not None:
+            entry.update({
+                'native_id': result.native_id,
+                'concept_id': result.concept_id,
+                'revision_id': result.revision_id,
+                'phases': {phase: round(seconds, 3) for phase, seconds in result.timings.items()},
+                'critical_path': result.critical_path,
+                'associations_added': len(result.associations_added),
+                'associations_removed': len(result.associations_removed),
+                'association_failures': len(result.failures),
+                'discrepancies': len(result.discrepancies),
+            })
+        return entry
+
+    def finish(self, status, result=None):
+        """
+        Append the run to the history file
+        Returns
+        -------
+        dict history entry, None without a history file
+        """
+        if not self.path:
+            return None
+        entry = self.summary(status, result)
+        append(self.path, entry)
+        LOGGER.debug("Run appended to history %s: %s", self.path, entry)
+        return entry
+
+
+def append(path, entry):
+    """Append one entry to a history file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'a') as hfile:
+        hfile.write(codec.dumps(entry, sort_keys=True) + "\n")
+
+
+def read_history(path):
+    """
+    Entries of a history file, in the order they were written; a line
+    cut short by an interrupted run is skipped
+    Returns
+    -------
+    list of dicts
+    """
+    entries = []
+    with open(path) as hfile:
+        for line in hfile:
+            try:
+                entries.append(codec.loads(line))
+            except ValueError:
+                LOGGER.warning("Skipping unreadable history line: %s", line.strip())
+    return entries
+
+
+def entry_key(entry):
+    """Runs comparable with each other: same record, environment and mode"""
+    return (entry.get('env'), entry.get('provider'), entry.get('concept_type'), entry.get('native_id'),
+            entry.get('mode'))
+
+
+def regressions(entries, window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD):
+    """
+    Runs whose duration or request count exceed threshold times the
+    median of the window earlier runs of the same key
+    Returns
+    -------
+    list of (entry, list of (metric, value, baseline))
+    """
+
+    earlier = {}
+    flagged = []
+    for entry in entries:
+        previous = earlier.setdefault(entry_key(entry), [])
+        baseline = previous[-window:]
+        if len(baseline) >= MIN_BASELINE:
+            exceeded = []
+            for metric in ('duration', 'requests'):
+                median = statistics.median(run.get(metric) or 0 for run in baseline)
+                value = entry.get(metric) or 0
+                if median and value > threshold * median:
+                    exceeded.append((metric, value, median))
+            if exceeded:
+                flagged.append((entry, exceeded))
+        previous.append(entry)
+    return flagged
+
+
+def trends(entries, window=DEFAULT_WINDOW):
+    """
+    Per key summary of the runs
+    Returns
+    -------
+    list of dicts with key, runs, last and baseline duration and requests
+    """
+
+    grouped = {}
+    for entry in entries:
+        grouped.setdefault(entry_key(entry), []).append(entry)
+    rows = []
+    for key, runs in grouped.items():
+        last, baseline = runs[-1], runs[-window - 1:-1]
+        rows.append({
+            'key': key,
+            'runs': len(runs),
+            'last_time': last.get('time'),
+            'last_duration': last.get('duration'),
+            'baseline_duration': statistics.median(run.get('duration') or 0 for run in baseline) if baseline else None,
+            'last_requests': last.get('requests'),
+            'baseline_requests': statistics.median(run.get('requests') or 0 for run in baseline) if baseline else None,
+            'failed': sum(1 for run in runs if run.get('status') != 'ok'),
+        })
+    return rows
+
+
+def _change(value, baseline):
+    if not baseline or value is None:
+        return ''
+    return f"{100.0 * (value - baseline) / baseline:+.0f}%"
+
+
+def _when(epoch):
+    return time.strftime('%Y-%m-%d %H:%M', time.gmtime(epoch)) if epoch else '-'
+
+
+def report(entries, window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD, out=None):
+    """
+    Print trends and regressions of entries
+    Returns
+    -------
+    list of regressions, see regressions
+    """
+
+    out = out or sys.stdout
+    out.write(f"{'record':60} {'runs':>5} {'last run':>16} {'duration':>9} {'median':>8} {'':>6} "
+              f"{'requests':>8} {'median':>7} {'':>6} {'failed':>6}\n")
+    for row in trends(entries, window):
+        env, provider, concept_type, native_id, mode = row['key']
+        name = f"{env}/{provider}/{concept_type}/{native_id or '*'} ({mode})"
+        duration, baseline = row['last_duration'], row['baseline_duration']
+        requests, baseline_requests = row['last_requests'], row['baseline_requests']
+        out.write(f"{name:60} {row['runs']:>5} {_when(row['last_time']):>16} {duration or 0:>8.2f}s "
+                  f"{'-' if baseline is None else f'{baseline:.2f}s':>8} {_change(duration, baseline):>6} "
+                  f"{requests if requests is not None else '-':>8} "
+                  f"{baseline_requests if baseline_requests is not None else '-':>7} "
+                  f"{_change(requests, baseline_requests):>6} {row['failed']:>6}\n")
+
+    flagged = regressions(entries, window, threshold)
+    out.write(f"\n{len(flagged)} runs above {threshold}x the median of the previous {window} runs\n")
+    for entry, exceeded in flagged:
+        details = ', '.join(f"{metric} {value:g} (median {baseline:g})" for metric, value, baseline in exceeded)
+        out.write(f"  {_when(entry.get('time'))} {entry.get('env')} {entry.get('native_id') or '*'} "
+                  f"{entry.get('mode')}: {details}\n")
+    return flagged
+
+
+def main(argv=None):
+    """Command line of the history report"""
+    parser = argparse.ArgumentParser(prog='python -m podaac.umm_common.history',
+                                     description='Trends and regressions of the runs in a history file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    report_parser = commands.add_parser('report', help='Show trends and flag runs above the baseline')
+    report_parser.add_argument('history', help='History file written with --history')
+    report_parser.add_argument('--window', type=int, default=DEFAULT_WINDOW,
+                               help='Earlier runs the baseline median is taken over')
+    report_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                               help='Flag runs above this multiple of the baseline')
+    report_parser.add_argument('--native_id', default=None, help='Only report this record')
+    report_parser.add_argument('--env', default=None, help='Only report this environment')
+    report_parser.add_argument('--fail', action='store_true',
+                               help='Exit with status 1 when the latest run of a record is flagged')
+    args = parser.parse_args(argv)
+
+    entries = [entry for entry in read_history(args.history)
+               if (args.native_id is None or entry.get('native_id') == args.native_id)
+               and (args.env is None or entry.get('env') == args.env)]
+    flagged = report(entries, args.window, args.threshold)
+    latest = {entry_key(entry): entry for entry in entries}
+    if args.fail and any(latest[entry_key(entry)] is entry for entry, _ in flagged):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
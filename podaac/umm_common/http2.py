@@ -0,0 +1,130 @@
+"""
+==============
+http2.py
+==============
+
+Optional HTTP/2 transport (`--http2`) for the shared client.
+
+Http2Adapter is a requests transport adapter sending the requests of
+the session through an httpx client with HTTP/2 enabled, so the
+concurrent requests of a run (phases running side by side,
+decommission workers, hedged searches, both environments of a
+compare) share a few multiplexed connections instead of one pooled
+HTTP/1.1 connection each. Everything above the adapter (retries, the
+circuit breaker, latency tracking, tracing) keeps working on
+requests.Response objects.
+
+The httpx client is asynchronous and runs on an event loop thread
+owned by the adapter; the calling threads submit their request to it
+and wait for the answer. Its synchronous client is not used because
+streams opened from several threads can reach the connection out of
+order, which HTTP/2 servers reject.
+
+httpx is an optional dependency: pip install cmr-umm-updater[http2].
+CMR negotiates the protocol with ALPN and the adapter falls back to
+HTTP/1.1 when HTTP/2 is not offered.
+"""
+
+import asyncio
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # pylint: disable=invalid-name
+
+LOGGER = logging.getLogger(__name__)
+
+# connection specific headers HTTP/2 forbids, httpx sets Content-Length itself
+DROPPED_HEADERS = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade', 'host',
+                   'content-length'}
+MAX_CONNECTIONS = 4
+
+
+def _timeout(timeout):
+    """httpx timeout from a requests timeout: None, seconds or (connect, read)"""
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+class Http2Adapter(HTTPAdapter):
+    """
+    Transport adapter sending requests over HTTP/2 with httpx
+    """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, prior_knowledge=False):
+        """
+        Parameters
+        ----------
+        max_connections : int connections per host, each carrying many streams
+        prior_knowledge : bool speak HTTP/2 without negotiating it, for
+                          cleartext http:// servers known to support it
+        """
+        if httpx is None:
+            raise Exception('--http2 needs httpx with HTTP/2 support: pip install cmr-umm-updater[http2]')
+        super().__init__()
+        self.client = httpx.AsyncClient(http2=True, http1=not prior_knowledge,
+                                        limits=httpx.Limits(max_connections=max_connections,
+                                                            max_keepalive_connections=max_connections))
+        self.protocols = {}
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='cmr-http2', daemon=True)
+        self._thread.start()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        # pylint: disable=too-many-arguments,arguments-differ
+        headers = [(key, value) for key, value in request.headers.items() if key.lower() not in DROPPED_HEADERS]
+        call = self.client.request(request.method, request.url, headers=headers, content=request.body,
+                                   timeout=_timeout(timeout))
+        try:
+            resp = asyncio.run_coroutine_threadsafe(call, self._loop).result()
+        except httpx.TimeoutException as err:
+            raise requests.exceptions.Timeout(err, request=request) from err
+        except httpx.TransportError as err:
+            raise requests.exceptions.ConnectionError(err, request=request) from err
+        with self._lock:
+            self.protocols[resp.http_version] = self.protocols.get(resp.http_version, 0) + 1
+        return self._response(request, resp)
+
+    @staticmethod
+    def _response(request, resp):
+        response = requests.Response()
+        response.status_code = resp.status_code
+        response.headers = CaseInsensitiveDict(resp.headers)
+        response._content = resp.content  # pylint: disable=protected-access
+        response.encoding = resp.charset_encoding
+        response.reason = resp.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.elapsed = resp.elapsed
+        return response
+
+    def close(self):
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+        super().close()
+
+
+def mount(session, prefixes=('https://',), max_connections=MAX_CONNECTIONS, prior_knowledge=False):
+    """
+    Mount an Http2Adapter on the requests of a session
+    Returns
+    -------
+    Http2Adapter
+    """
+    adapter = Http2Adapter(max_connections=max_connections, prior_knowledge=prior_knowledge)
+    for prefix in prefixes:
+        session.mount(prefix, adapter)
+    LOGGER.info("Using HTTP/2 for %s", ', '.join(prefixes))
+    return adapter
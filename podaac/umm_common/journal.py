@@ -0,0 +1,120 @@
+"""
+==============
+journal.py
+==============
+
+Append-only journal of association operations so an interrupted
+sync can resume from the last completed add/remove instead of
+recomputing the plan from a fresh CMR query.
+
+Each line is a JSON object with `env`, `concept_id` and `event`:
+`plan` (the add/remove lists and a digest of the association file),
+`add`/`remove` (one completed operation) and `complete`.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from podaac.umm_common import codec
+
+LOGGER = logging.getLogger(__name__)
+
+
+def digest(concept_ids):
+    """
+    Stable digest of the desired association list
+    Parameters
+    ----------
+    concept_ids : list of string
+    Returns
+    -------
+    string
+    """
+    return hashlib.sha256("\n".join(sorted(concept_ids)).encode()).hexdigest()
+
+
+class AssociationJournal:
+    """
+    Journal of planned and completed association operations
+    per environment and concept_id
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _write(self, entry):
+        entry['time'] = time.time()
+        with self._lock:
+            with open(self.path, 'a') as jfile:
+                jfile.write(codec.dumps(entry) + "\n")
+                jfile.flush()
+
+    def _entries(self, cmr_env, concept_id):
+        if not os.path.isfile(self.path):
+            return []
+        entries = []
+        with open(self.path) as jfile:
+            for line in jfile:
+                try:
+                    entry = codec.loads(line)
+                except ValueError:
+                    # a run killed mid-write can leave a truncated last line
+                    LOGGER.debug("Skipping unreadable journal line: %s", line)
+                    continue
+                if entry.get('env') == cmr_env and entry.get('concept_id') == concept_id:
+                    entries.append(entry)
+        return entries
+
+    def pending(self, cmr_env, concept_id, desired):
+        """
+        Remaining operations of an unfinished sync
+        Parameters
+        ----------
+        cmr_env : string
+        concept_id : string
+        desired : list of string concept ids in the association file
+        Returns
+        -------
+        (add, remove) lists, or None when there is no unfinished plan
+        for the same association file
+        """
+
+        plan = None
+        done = set()
+        for entry in self._entries(cmr_env, concept_id):
+            if entry['event'] == 'plan':
+                plan = entry
+                done = set()
+            elif entry['event'] == 'complete':
+                plan = None
+            elif plan is not None:
+                done.add((entry['event'], entry['assoc_id']))
+
+        if plan is None:
+            return None
+        if plan['digest'] != digest(desired):
+            LOGGER.info("Association file changed since journaled plan, not resuming")
+            return None
+        add = [ac_id for ac_id in plan['add'] if ('add', ac_id) not in done]
+        remove = [ac_id for ac_id in plan['remove'] if ('remove', ac_id) not in done]
+        LOGGER.info("Resuming journaled sync for %s: %s adds and %s removes remaining",
+                    concept_id, len(add), len(remove))
+        return add, remove
+
+    def plan(self, cmr_env, concept_id, desired, add, remove):
+        """Record the operations a sync is about to perform"""
+        self._write({'env': cmr_env, 'concept_id': concept_id, 'event': 'plan',
+                     'digest': digest(desired), 'add': sorted(add), 'remove': sorted(remove)})
+
+    def record(self, cmr_env, concept_id, operation, assoc_id):
+        """Record a successfully completed 'add' or 'remove'"""
+        self._write({'env': cmr_env, 'concept_id': concept_id,
+                     'event': operation, 'assoc_id': assoc_id})
+
+    def complete(self, cmr_env, concept_id):
+        """Mark the current plan as finished"""
+        self._write({'env': cmr_env, 'concept_id': concept_id, 'event': 'complete'})
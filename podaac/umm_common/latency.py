@@ -0,0 +1,109 @@
+"""
+==============
+latency.py
+==============
+
+Per endpoint latency tracking for the shared CMR client.
+
+Response times of the recent requests to each endpoint are kept so the
+client can derive adaptive timeouts (a multiple of the observed p99,
+never above the configured timeout; disabled when multiplier is None)
+and the delay after which an idempotent GET is hedged (the observed
+p95).
+"""
+
+import collections
+import re
+import threading
+from urllib.parse import urlparse
+
+CONCEPT_ID = re.compile(r'/[A-Z]+\d+-[A-Z0-9_]+(?=/|$)')
+INGEST_NATIVE_ID = re.compile(r'^(/ingest/providers/[^/]+/[^/]+)/.+$')
+
+
+def endpoint_key(method, url):
+    """
+    Endpoint a request belongs to: method, host and path with concept
+    and native ids replaced, query string dropped
+    Parameters
+    ----------
+    method : string
+    url : string
+    Returns
+    -------
+    string
+    """
+
+    parsed = urlparse(url)
+    path = CONCEPT_ID.sub('/{concept_id}', parsed.path)
+    path = INGEST_NATIVE_ID.sub(r'\1/{native_id}', path)
+    return f"{method} {parsed.netloc}{path}"
+
+
+def percentile(samples, percent):
+    """Nearest rank percentile of a non empty sequence"""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class LatencyTracker:
+    """
+    Sliding window of response times per endpoint
+    """
+
+    def __init__(self, window=200, min_samples=20, multiplier=3.0, floor=2.0):
+        self.window = window
+        self.min_samples = min_samples
+        self.multiplier = multiplier
+        self.floor = floor
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        """Add the response time of one request"""
+        with self._lock:
+            self._samples[endpoint].append(seconds)
+
+    def percentile(self, endpoint, percent):
+        """
+        Observed percentile of an endpoint, None until min_samples
+        requests were recorded
+        """
+        with self._lock:
+            samples = list(self._samples.get(endpoint, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return percentile(samples, percent)
+
+    def timeout(self, endpoint, default):
+        """
+        Adaptive timeout of an endpoint
+        Parameters
+        ----------
+        endpoint : string from endpoint_key
+        default : number configured timeout, the upper bound
+        Returns
+        -------
+        number
+        """
+        if self.multiplier is None or default is None:
+            return default
+        p99 = self.percentile(endpoint, 99)
+        if p99 is None:
+            return default
+        return min(default, max(self.floor, p99 * self.multiplier))
+
+    def metrics(self):
+        """
+        Request count, p50 and p95 per endpoint
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+        return {endpoint: {'count': len(samples),
+                           'p50': round(percentile(samples, 50), 3),
+                           'p95': round(percentile(samples, 95), 3)}
+                for endpoint, samples in snapshot.items() if samples}
@@ -0,0 +1,136 @@
+"""
+==============
+overrides.py
+==============
+
+In memory overrides applied to a UMM record after it is loaded.
+
+Overrides are JSON pointers (RFC 6901) with a value, given on the
+command line (`--set /Version=1.2.3`, `--set /URL:={"URLValue": "..."}`
+for JSON values) or read from a per environment override file: a JSON
+object mapping pointers to values, named `<record>_<env>_overrides.json`
+or `<env>_overrides.json` next to the record. File overrides are
+applied first so the command line wins.
+"""
+
+import copy
+import logging
+import os
+
+from podaac.umm_common import codec
+from podaac.umm_common import watch
+
+LOGGER = logging.getLogger(__name__)
+
+
+def parse_set(expression):
+    """
+    Parse a `--set` expression
+    Parameters
+    ----------
+    expression : string `pointer=value` (string value) or `pointer:=json`
+    Returns
+    -------
+    (pointer, value)
+    """
+
+    pointer, sep, value = expression.partition('=')
+    if not sep or not pointer:
+        raise ValueError(f'Override "{expression}" is not of the form /pointer=value or /pointer:=json')
+    if pointer.endswith(':'):
+        return pointer[:-1], codec.loads(value)
+    return pointer, value
+
+
+def _tokens(pointer):
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise ValueError(f'JSON pointer "{pointer}" must start with /')
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def set_pointer(document, pointer, value):
+    """
+    Set the value at pointer, creating missing objects on the way;
+    `-` appends to an array
+    Parameters
+    ----------
+    document : dict modified in place
+    pointer : string JSON pointer
+    value : any JSON value
+    """
+
+    tokens = _tokens(pointer)
+    if not tokens:
+        raise ValueError('Cannot override the whole record')
+    target = document
+    for token in tokens[:-1]:
+        if isinstance(target, list):
+            target = target[int(token)]
+        else:
+            target = target.setdefault(token, {})
+    last = tokens[-1]
+    if isinstance(target, list):
+        if last == '-':
+            target.append(value)
+        else:
+            target[int(last)] = value
+    else:
+        target[last] = value
+
+
+def override_file(record_path, cmr_env):
+    """
+    Override file used for a record: `<record>_<env>_overrides.json`
+    if present, otherwise the directory wide `<env>_overrides.json`
+    Returns
+    -------
+    string path or None
+    """
+    return watch.companion_file(record_path, cmr_env, watch.OVERRIDE_SUFFIX)
+
+
+def load_override_file(path):
+    """
+    Read an override file
+    Returns
+    -------
+    list of (pointer, value)
+    """
+    with open(path) as ofile:
+        overrides = codec.load(ofile)
+    if not isinstance(overrides, dict):
+        raise ValueError(f'Override file {path} must contain a JSON object of pointer: value')
+    return list(overrides.items())
+
+
+def apply_overrides(umm, record_path, cmr_env, set_values=None, override_path=None):
+    """
+    Copy of umm with the overrides of a record applied
+    Parameters
+    ----------
+    umm : dict loaded UMM record
+    record_path : string file the record was loaded from, None for in memory records
+    cmr_env : string
+    set_values : list of `--set` expressions
+    override_path : string override file, instead of the one found next to the record
+    Returns
+    -------
+    dict
+    """
+
+    overrides = []
+    path = override_path or (override_file(record_path, cmr_env) if record_path else None)
+    if path:
+        overrides.extend(load_override_file(path))
+    overrides.extend(parse_set(expression) for expression in set_values or ())
+    if not overrides:
+        return umm
+
+    umm = copy.deepcopy(umm)
+    for pointer, value in overrides:
+        LOGGER.info("Override %s%s = %s", os.path.basename(record_path) + ':' if record_path else '',
+                    pointer, codec.dumps(value))
+        set_pointer(umm, pointer, value)
+    return umm
@@ -0,0 +1,130 @@
+"""
+==============
+phases.py
+==============
+
+Small dependency-graph scheduler for the phases of an update run.
+
+Phases whose dependencies are complete run concurrently on a thread
+pool; each phase receives the results of the phases finished so far.
+Start and end times are kept so the run can report its critical path.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from podaac.umm_common import tracing
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PhaseGraph:
+    """
+    Phases with dependencies, executed as soon as they are ready
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.phases = {}
+        self.results = {}
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, func, deps=()):
+        """
+        Register a phase
+        Parameters
+        ----------
+        name : string
+        func : callable(results) run once every dependency finished
+        deps : iterable of phase names
+        """
+        for dep in deps:
+            if dep not in self.phases:
+                raise Exception(f'Phase {name} depends on unknown phase {dep}')
+        self.phases[name] = (func, tuple(deps))
+
+    def _run_phase(self, name):
+        func = self.phases[name][0]
+        start = time.monotonic()
+        try:
+            with tracing.span(name, 'phase'):
+                return func(self.results)
+        finally:
+            with self._lock:
+                self.timings[name] = (start, time.monotonic())
+
+    def run(self):
+        """
+        Execute all phases, raising the first phase error
+        Returns
+        -------
+        dict phase name -> result
+        """
+
+        done = set()
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='phase') as executor:
+            while True:
+                if error is None:
+                    for name, (_, deps) in self.phases.items():
+                        if name not in done and name not in running.values() and set(deps) <= done:
+                            running[executor.submit(self._run_phase, name)] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except BaseException as err:  # pylint: disable=broad-except
+                        if error is None:
+                            error = err
+                    done.add(name)
+        if error is not None:
+            raise error
+        return self.results
+
+    def durations(self):
+        """
+        Seconds spent in each finished phase
+        Returns
+        -------
+        dict
+        """
+        return {name: end - start for name, (start, end) in self.timings.items()}
+
+    def critical_path(self):
+        """
+        Chain of phases that determined the total run time, found by
+        walking back from the last phase to finish through its latest
+        finishing dependency
+        Returns
+        -------
+        list of phase names, total seconds
+        """
+
+        if not self.timings:
+            return [], 0.0
+        origin = min(start for start, _ in self.timings.values())
+        name = max(self.timings, key=lambda phase: self.timings[phase][1])
+        total = self.timings[name][1] - origin
+        path = [name]
+        while True:
+            deps = [dep for dep in self.phases[name][1] if dep in self.timings]
+            if not deps:
+                break
+            name = max(deps, key=lambda phase: self.timings[phase][1])
+            path.append(name)
+        path.reverse()
+        return path, total
+
+    def log_report(self):
+        """Log phase durations and the critical path"""
+        for name, seconds in sorted(self.durations().items(), key=lambda item: self.timings[item[0]][0]):
+            LOGGER.info("Phase %s: %.3fs", name, seconds)
+        path, total = self.critical_path()
+        LOGGER.info("Critical path (%.3fs): %s", total, " -> ".join(path))
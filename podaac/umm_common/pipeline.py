@@ -0,0 +1,372 @@
+"""
+==============
+pipeline.py
+==============
+
+Phase pipeline updating a single UMM record and its associations.
+
+The run is split into phases (token, lookup, create, diff, put, wait,
+verify, assoc_resolve, assoc_fetch, assoc_diff, assoc_writes, assoc_retry)
+scheduled on a PhaseGraph. Association phases only need the concept_id,
+so for an existing record they run while the profile is being updated
+and the run takes max(update, sync) instead of the sum.
+The verify phase then checks the end state, see verify.py, after the
+final retry pass of failed association operations.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from podaac.umm_common import associations
+from podaac.umm_common import codec
+from podaac.umm_common import deadline
+from podaac.umm_common import history
+from podaac.umm_common import overrides
+from podaac.umm_common import resolver
+from podaac.umm_common import rollback
+from podaac.umm_common import tracing
+from podaac.umm_common import verify
+from podaac.umm_common.diff import changed_paths
+from podaac.umm_common.failures import FailureReport
+from podaac.umm_common.journal import AssociationJournal
+from podaac.umm_common.phases import PhaseGraph
+from podaac.umm_common.revisions import MAX_CONFLICT_RETRIES, RevisionConflict, next_revision
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds to wait after an ingest so the updated record is searchable
+READINESS_WAIT = 10
+
+
+@dataclass
+class RecordApi:
+    """
+    Concept specific functions used by the pipeline
+    """
+    label: str
+    concept_type: str
+    default_version: str
+    create_native_id: Callable
+    pull_concept_id: Callable
+    get_current: Callable
+    get_current_revision: Callable
+    create_record: Callable
+    token: Callable
+    # ingested under its collection, which makes the association (UMM-Var)
+    collection_scoped: bool = False
+
+
+@dataclass
+class UpdateResult:  # pylint: disable=too-many-instance-attributes
+    """
+    Outcome of updating one record
+    """
+    native_id: str
+    concept_id: Optional[str] = None
+    revision_id: Optional[int] = None
+    created: bool = False
+    updated: bool = False
+    changed_paths: list = field(default_factory=list)
+    associations_added: list = field(default_factory=list)
+    associations_removed: list = field(default_factory=list)
+    failures: list = field(default_factory=list)
+    discrepancies: list = field(default_factory=list)
+    timings: dict = field(default_factory=dict)
+    critical_path: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        """True when every association operation succeeded and verification found no discrepancy"""
+        return not self.failures and not self.discrepancies
+
+
+def log_partial_progress(graph, failures, report_path=None):
+    """
+    Report what a run cut short by the deadline managed to do
+    Parameters
+    ----------
+    graph : PhaseGraph of the interrupted run
+    failures : FailureReport of the run
+    report_path : string failure report file, optional
+    """
+
+    completed = sorted(graph.results, key=lambda name: graph.timings[name][0])
+    not_completed = [name for name in graph.phases if name not in graph.results]
+    LOGGER.error("Run deadline exceeded. Completed phases: %s; not completed: %s",
+                 ", ".join(completed) or "none", ", ".join(not_completed))
+    if len(failures):
+        LOGGER.error("Association operations not done: %s", failures.summary())
+    if report_path:
+        failures.write(report_path)
+
+
+def _dump(umm):
+    return codec.dumps(umm, pretty=True, sort_keys=True)
+
+
+def _result(native_id, graph, failures, remaining):
+    results = graph.results
+    verified = results['verify'] or {}
+    result = UpdateResult(native_id=native_id, concept_id=results['create'],
+                          created=results['lookup'] is None, updated=results['put'],
+                          revision_id=verified.get('revision_id') or results['diff'].get('revision_id'),
+                          changed_paths=results['diff'].get('changed_paths', []),
+                          failures=list(remaining), discrepancies=verified.get('discrepancies', []),
+                          timings=graph.durations(),
+                          critical_path=graph.critical_path()[0])
+    writes = results.get('assoc_writes') or {}
+    result.associations_added = list(writes.get('added', []))
+    result.associations_removed = list(writes.get('removed', []))
+    # operations that failed at first but succeeded in the final retry pass
+    still_failing = {(failure['operation'], failure['assoc_id']) for failure in remaining}
+    for failure in failures:
+        if (failure['operation'], failure['assoc_id']) not in still_failing:
+            if failure['operation'] == 'add':
+                result.associations_added.append(failure['assoc_id'])
+            else:
+                result.associations_removed.append(failure['assoc_id'])
+    return result
+
+
+# pylint: disable=too-many-statements
+def update_record(args, api, client=None, local_umm=None):
+    """
+    Create or update the record in args.jfilename and synchronize
+    its associations.
+
+    Parameters
+    ----------
+    args : argparse.Namespace updater arguments
+    api : RecordApi
+    client : CmrClient reused between records
+    local_umm : dict record to publish instead of reading args.jfilename
+    Returns
+    -------
+    UpdateResult
+    """
+
+    provider = args.provider
+    umm_version = args.umm_version or api.default_version
+    if local_umm is None:
+        with open(args.jfilename) as json_file:
+            local_umm = codec.load(json_file)
+    local_umm = overrides.apply_overrides(local_umm, args.jfilename, args.env, args.set, args.override_file)
+
+    # construct native ID
+    native_id = api.create_native_id(provider, local_umm)
+    LOGGER.info("native_id: %s", native_id)
+
+    if api.collection_scoped and args.assoc is None:
+        raise Exception(f'{api.label} record {native_id} is ingested under its collection, '
+                        f'give the collection with -a/--assoc')
+
+    journal = AssociationJournal(args.journal) if args.journal else None
+    failures = FailureReport()
+    # revision the put phase sent, checked by the verify phase
+    written = {}
+    graph = PhaseGraph()
+
+    def ingest_header(current_token):
+        return {
+            'Content-type': f'application/vnd.nasa.cmr.umm+json;version={umm_version}',
+            'Authorization': str(current_token),
+        }
+
+    def ingest_collection(results):
+        # the one collection a collection scoped record is ingested under
+        if not api.collection_scoped:
+            return None
+        collections = associations.get_association(results['assoc_resolve'])
+        if len(collections) != 1:
+            raise Exception(f'{api.label} record {native_id} belongs to exactly one collection, '
+                            f'the association names {len(collections)}')
+        return collections[0]
+
+    def token_phase(_):
+        if args.token is None:
+            return api.token(args.env, args.cmr_user, args.cmr_pass, client=client)
+        return args.token
+
+    def lookup_phase(_):
+        # check if record is currently within CMR
+        return api.pull_concept_id(args.env, provider, native_id, timeout=args.timeout, client=client)
+
+    def create_phase(results):
+        concept_id = results['lookup']
+        if concept_id is not None:
+            LOGGER.info("concept_id: %s", concept_id)
+            return concept_id
+        # concept_id could not be found, record is not within CMR
+        LOGGER.info("No CMR profile found. Creating new %s record...", api.label)
+        api.create_record(args.env, local_umm, provider, native_id, ingest_header(results['token']),
+                          timeout=args.timeout, client=client, collection=ingest_collection(results))
+        new_concept_id = api.pull_concept_id(args.env, provider, native_id, timeout=args.timeout, client=client)
+        LOGGER.info("concept_id: %s", new_concept_id)
+        return new_concept_id
+
+    def read_current(concept_id):
+        current_umm, revision_id = api.get_current_revision(args.env, concept_id, timeout=args.timeout,
+                                                            client=client)
+        LOGGER.info("CMR %s Profile (revision %s):", api.label, revision_id)
+        LOGGER.info(_dump(current_umm))
+        # Compare CMR profile to locally maintained profile
+        if sorted(current_umm.items()) == sorted(local_umm.items()):
+            LOGGER.info("CMR and local profiles match, no update needed.")
+            return [], revision_id, current_umm
+        return changed_paths(current_umm, local_umm) or ['/'], revision_id, current_umm
+
+    def diff_phase(results):
+        concept_id = results['lookup']
+        if concept_id is None:
+            return {'changed': False}
+        LOGGER.info("Local %s Profile:", api.label)
+        LOGGER.info(_dump(local_umm))
+        paths, revision_id, current_umm = read_current(concept_id)
+        return {'changed': bool(paths), 'revision_id': revision_id, 'changed_paths': paths,
+                'current_umm': current_umm}
+
+    def put_phase(results):
+        if not results['diff']['changed']:
+            return False
+        revision_id = results['diff']['revision_id']
+        for attempt in range(1, MAX_CONFLICT_RETRIES + 1):
+            LOGGER.info("Updating CMR %s profile...", api.label)
+            try:
+                api.create_record(args.env, local_umm, provider, native_id, ingest_header(results['token']),
+                                  timeout=args.timeout, client=client, revision_id=next_revision(revision_id),
+                                  collection=ingest_collection(results))
+                written['revision_id'] = next_revision(revision_id)
+                return True
+            except RevisionConflict as err:
+                # another writer updated the record since it was read
+                LOGGER.warning("Concurrent update (attempt %s): %s", attempt, err)
+                history.count_retry()
+                tracing.instant('revision_conflict', 'retry', attempt=attempt)
+                paths, revision_id, _ = read_current(results['create'])
+                if not paths:
+                    return False
+        raise Exception(f'{api.label} record {native_id} still conflicting after '
+                        f'{MAX_CONFLICT_RETRIES} attempts')
+
+    def wait_phase(results):
+        if results['put']:
+            # Need to sleep so there is time for the cmr to update.
+            deadline.sleep(READINESS_WAIT)
+
+    def verify_phase(results):
+        # check the end state with a revision lookup and one association listing
+        created, updated = results['lookup'] is None, results['put']
+        if not (created or updated or args.assoc is not None):
+            return None
+        report = {'revision_id': None, 'discrepancies': []}
+        if created or updated:
+            report['revision_id'], found = verify.verify_revision(
+                args.env, api.concept_type, results['create'], expected=written.get('revision_id'),
+                timeout=args.timeout, client=client)
+            if found:
+                # show what CMR holds instead of the profile that was sent
+                LOGGER.info("CMR %s Profile:", api.label)
+                LOGGER.info(_dump(api.get_current(args.env, results['create'], timeout=args.timeout,
+                                                  client=client)))
+            report['discrepancies'].extend(found)
+        if args.assoc is not None:
+            report['discrepancies'].extend(verify.verify_associations(
+                args.env, api.concept_type, results['create'],
+                associations.get_association(results['assoc_resolve']),
+                remove_collection=args.disable_removal, timeout=args.timeout, client=client))
+        if report['discrepancies']:
+            LOGGER.error("Verification of %s found discrepancies: %s", native_id, report['discrepancies'])
+        else:
+            LOGGER.info("Verified %s: %s revision %s%s", native_id, 'created' if created else 'updated to'
+                        if updated else 'at', report['revision_id'] or results['diff'].get('revision_id'),
+                        ', associations as intended' if args.assoc is not None else '')
+        return report
+
+    def snapshot_phase(results):
+        diff = results['diff']
+        if diff.get('current_umm') is None:
+            return None
+        state = results.get('assoc_fetch')
+        return rollback.write_snapshot(args.snapshot_dir, args.env, provider, api.concept_type, native_id,
+                                       results['lookup'], diff['revision_id'], diff['current_umm'],
+                                       collections=state['current'] if state else None)
+
+    def assoc_resolve_phase(_):
+        # collection names in the association file become concept ids of this environment
+        return resolver.resolve_association(args.assoc, args.env,
+                                            cache_path=args.resolver_cache or resolver.DEFAULT_CACHE,
+                                            ttl=args.resolver_ttl, timeout=args.timeout, client=client)
+
+    # the ingest of a collection scoped record needs its collection
+    ingest_deps = ('assoc_resolve',) if api.collection_scoped else ()
+    graph.add('token', token_phase)
+    graph.add('lookup', lookup_phase)
+    if args.assoc is not None:
+        graph.add('assoc_resolve', assoc_resolve_phase)
+    graph.add('create', create_phase, deps=('token', 'lookup') + ingest_deps)
+    graph.add('diff', diff_phase, deps=('lookup',))
+    # with snapshots, nothing is written before the current profile and associations are saved
+    snapshot_deps = ('snapshot',) if args.snapshot_dir else ()
+
+    # check for associations to be made with the profile; the ingest makes the one of a collection scoped record
+    if args.assoc is not None and not api.collection_scoped:
+        def assoc_fetch_phase(results):
+            if results['lookup'] is None:
+                return None
+            LOGGER.info("Synchronize associations...")
+            return associations.fetch_association_state(
+                args.env, results['create'], results['token'], results['assoc_resolve'], api.concept_type,
+                timeout=args.timeout, client=client, journal=journal, resume=args.resume)
+
+        def assoc_diff_phase(results):
+            if results['assoc_fetch'] is None:
+                return None
+            return associations.plan_association_changes(
+                args.env, results['create'], results['assoc_fetch'],
+                remove_collection=args.disable_removal, journal=journal)
+
+        def assoc_writes_phase(results):
+            if results['lookup'] is None:
+                added = associations.create_association(
+                    args.env, results['create'], results['token'], results['assoc_resolve'], api.concept_type,
+                    timeout=args.timeout, client=client, failures=failures)
+                return {'added': added, 'removed': []}
+            if results['assoc_diff'] is not None:
+                add, remove = results['assoc_diff']
+                header = {
+                    'Authorization': str(results['token']),
+                    'Content-type': "application/json",
+                }
+                added, removed = associations.apply_association_changes(
+                    args.env, results['create'], add, remove, header, api.concept_type,
+                    timeout=args.timeout, remove_collection=args.disable_removal, client=client,
+                    journal=journal, failures=failures)
+                return {'added': added, 'removed': removed}
+            return None
+
+        graph.add('assoc_fetch', assoc_fetch_phase, deps=('create', 'token', 'assoc_resolve'))
+        graph.add('assoc_diff', assoc_diff_phase, deps=('assoc_fetch',))
+        if args.snapshot_dir:
+            graph.add('snapshot', snapshot_phase, deps=('diff', 'assoc_fetch'))
+        graph.add('assoc_writes', assoc_writes_phase, deps=('assoc_diff', 'token', 'assoc_resolve') + snapshot_deps)
+    elif args.snapshot_dir:
+        graph.add('snapshot', snapshot_phase, deps=('diff',))
+
+    def assoc_retry_phase(results):
+        # retried before verify, so an operation cleared here is not reported as a discrepancy
+        return associations.final_retry_pass(failures, results['token'], args.failure_report,
+                                             timeout=args.timeout, client=client)
+
+    graph.add('put', put_phase, deps=('diff', 'token') + ingest_deps + snapshot_deps)
+    graph.add('wait', wait_phase, deps=('put',))
+    graph.add('assoc_retry', assoc_retry_phase, deps=('token',) + (('assoc_writes',) if 'assoc_writes' in graph.phases else ()))
+    graph.add('verify', verify_phase, deps=('wait', 'create', 'assoc_retry') + (('assoc_resolve',) if args.assoc is not None else ()))
+
+    try:
+        graph.run()
+    except deadline.DeadlineExceeded:
+        log_partial_progress(graph, failures, args.failure_report)
+        raise
+    graph.log_report()
+    return _result(native_id, graph, failures, graph.results['assoc_retry'])
@@ -0,0 +1,190 @@
+"""
+==============
+profiling.py
+==============
+
+Profile of a run, enabled with --profile.
+
+The run is recorded with cProfile, in the main thread and in the
+threads it starts (pipeline phases, hedged requests): one profiler per
+thread up to Python 3.11, one process-wide profiler from 3.12 where
+cProfile runs on sys.monitoring and sees every thread. Every
+time.sleep is timed and attributed to its caller, so backoff retries,
+deadline bounded waits and other sleeps show apart from the work
+itself. Two files are written with the given prefix:
+
+* `<prefix>.prof` raw cProfile stats, for pstats or snakeviz
+* `<prefix>.txt` report: wall and CPU time, time per category
+  (network, JSON, sleep, thread wait, other), sleeps by caller and the functions
+  with the highest cumulative time
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+# (category, fragments of the module paths and built-in names it covers), first match wins
+CATEGORIES = (
+    ('network', ('/requests/', '/urllib3/', '/http/client.py', '/ssl.py', '/socket.py', '/selectors.py',
+                 '_socket.', '_ssl.', 'select.')),
+    ('json', ('/json/', '_json.')),
+    ('wait', ('_thread.', '_queue.')),
+)
+TOP_FUNCTIONS = 30
+# from 3.12 a second cProfile cannot be enabled while one is active
+PROCESS_WIDE = sys.version_info >= (3, 12)
+
+
+def _category(filename, name):
+    """Category of a profiled function, built-ins have the file name ~"""
+    if filename == '~' and 'time.sleep' in name:
+        return 'sleep'
+    text = name if filename == '~' else filename.replace('\\', '/')
+    for category, fragments in CATEGORIES:
+        if any(fragment in text for fragment in fragments):
+            return category
+    return 'other'
+
+
+def _sleep_caller(frame):
+    """Module a sleep is charged to: backoff, or the first caller outside deadline.py"""
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.split('.')[0] == 'backoff':
+            return 'backoff'
+        if module != 'podaac.umm_common.deadline':
+            return module
+        frame = frame.f_back
+    return 'unknown'
+
+
+class Profiler:
+    """
+    Context manager profiling the code it wraps
+    """
+
+    def __init__(self, prefix):
+        """
+        Parameters
+        ----------
+        prefix : string path prefix of the .prof and .txt files
+        """
+        self.prefix = prefix
+        self.profile = cProfile.Profile()
+        self.thread_profiles = []
+        self.sleeps = {}
+        self.wall = 0.0
+        self.cpu = 0.0
+        self._lock = threading.Lock()
+        self._sleep = None
+        self._start = None
+
+    def _timed_sleep(self, seconds):
+        caller = _sleep_caller(sys._getframe(1))  # pylint: disable=protected-access
+        start = time.perf_counter()
+        try:
+            self._sleep(seconds)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                count, total = self.sleeps.get(caller, (0, 0.0))
+                self.sleeps[caller] = (count + 1, total + elapsed)
+
+    def _profile_thread(self, *_event):
+        """threading profile hook, replaced by a cProfile of its own in each new thread"""
+        profile = cProfile.Profile()
+        with self._lock:
+            self.thread_profiles.append(profile)
+        profile.enable()
+
+    def __enter__(self):
+        self._sleep = time.sleep
+        time.sleep = self._timed_sleep
+        if not PROCESS_WIDE:
+            threading.setprofile(self._profile_thread)
+        self._start = (time.perf_counter(), time.process_time())
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        if not PROCESS_WIDE:
+            threading.setprofile(None)
+        self.wall = time.perf_counter() - self._start[0]
+        self.cpu = time.process_time() - self._start[1]
+        time.sleep = self._sleep
+        self.write()
+
+    def stats(self, stream=None):
+        """
+        Stats of the main and the started threads; threads that
+        recorded nothing are skipped
+        Returns
+        -------
+        pstats.Stats
+        """
+        stats = pstats.Stats(self.profile, stream=stream)
+        with self._lock:
+            profiles = list(self.thread_profiles)
+        for profile in profiles:
+            profile.create_stats()
+            if profile.stats:  # pylint: disable=no-member
+                stats.add(profile)
+        return stats
+
+    def threads(self):
+        """Threads covered, as shown in the report"""
+        if PROCESS_WIDE:
+            return 'all threads'
+        return f"{1 + len(self.thread_profiles)} threads"
+
+    def categories(self):
+        """
+        Own time of the profiled functions summed per category, over
+        all threads so the total can exceed the wall time
+        Returns
+        -------
+        dict category: seconds
+        """
+        totals = {'network': 0.0, 'json': 0.0, 'sleep': 0.0, 'wait': 0.0, 'other': 0.0}
+        stats = self.stats().stats  # pylint: disable=no-member
+        for (filename, _line, name), (_calls, _primitive, own, _cumulative, _callers) in stats.items():
+            totals[_category(filename, name)] += own
+        return totals
+
+    def report(self):
+        """
+        Text report of the profile
+        Returns
+        -------
+        string
+        """
+        out = io.StringIO()
+        out.write(f"Wall time {self.wall:.3f}s, CPU time {self.cpu:.3f}s\n\n")
+        out.write(f"Time by category (own time in {self.threads()})\n")
+        for category, seconds in self.categories().items():
+            share = 100 * seconds / self.wall if self.wall else 0
+            out.write(f"  {category:<8} {seconds:9.3f}s {share:5.1f}%\n")
+        out.write("\nSleeps by caller\n")
+        for caller, (count, seconds) in sorted(self.sleeps.items(), key=lambda item: -item[1][1]):
+            out.write(f"  {caller:<40} {count:5d} {seconds:9.3f}s\n")
+        if not self.sleeps:
+            out.write("  none\n")
+        out.write("\n")
+        self.stats(stream=out).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        return out.getvalue()
+
+    def write(self):
+        """Write <prefix>.prof and <prefix>.txt"""
+        self.stats().dump_stats(self.prefix + '.prof')
+        with open(self.prefix + '.txt', 'w') as rfile:
+            rfile.write(self.report())
+        sleep_total = sum(seconds for _count, seconds in self.sleeps.values())
+        LOGGER.info("Wrote profile to %s.prof and %s.txt (wall %.3fs, sleeping %.3fs)",
+                    self.prefix, self.prefix, self.wall, sleep_total)
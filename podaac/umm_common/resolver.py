@@ -0,0 +1,241 @@
+"""
+==============
+resolver.py
+==============
+
+Resolve association file entries naming collections to concept ids.
+
+Besides collection concept ids, association files may list
+`short_name`, `short_name/version` or `entry_title:<title>` entries,
+so one file serves every environment. Entries are resolved per
+environment with bulk paginated collection searches (many names per
+request) and the answers are kept in a JSON cache file for `ttl`
+seconds, so repeated runs over thousands of entries only query the
+ones that expired. Entries matching nothing are not cached, and fail
+the run: dropping them would dissociate collections over a typo or a
+CMR hiccup. Short names match regardless of case, as CMR searches them.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import quote
+
+from podaac.umm_common import codec
+from podaac.umm_common.client import cmr_environment_url
+from podaac.umm_common.search import search_items
+
+LOGGER = logging.getLogger(__name__)
+
+CONCEPT_ID = re.compile(r'^C\d+-[A-Za-z0-9_]+$')
+ENTRY_TITLE_PREFIX = 'entry_title:'
+DEFAULT_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'cmr-umm-updater', 'collections.json')
+DEFAULT_TTL = 24 * 3600
+# names per search request, keeps the query string short
+BATCH_SIZE = 50
+
+
+def parse_entry(entry):
+    """
+    Kind and search values of an association file entry
+    Returns
+    -------
+    ('concept_id', id), ('entry_title', title) or ('short_name', (short_name, version or None))
+    """
+    entry = entry.strip()
+    if CONCEPT_ID.match(entry):
+        return 'concept_id', entry
+    if entry.startswith(ENTRY_TITLE_PREFIX):
+        return 'entry_title', entry[len(ENTRY_TITLE_PREFIX):].strip()
+    short_name, sep, version = entry.rpartition('/')
+    if not sep:
+        return 'short_name', (entry, None)
+    return 'short_name', (short_name, version or None)
+
+
+def needs_resolution(entries):
+    """True when some entry is not a collection concept id"""
+    return any(parse_entry(entry)[0] != 'concept_id' for entry in entries)
+
+
+class Resolver:
+    """
+    Collection name to concept id resolver of one environment
+    """
+
+    def __init__(self, cmr_env, cache_path=DEFAULT_CACHE, ttl=DEFAULT_TTL, timeout=30, client=None):
+        """
+        Parameters
+        ----------
+        cmr_env : string
+        cache_path : string JSON cache file, None to only cache in memory
+        ttl : float seconds a cached answer is used
+        """
+        self.cmr_env = cmr_env
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.timeout = timeout
+        self.client = client
+        self.stats = {'cached': 0, 'resolved': 0, 'unresolved': 0, 'requests': 0}
+        self._cache = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._cache is None:
+            self._cache = {}
+            if self.cache_path and os.path.exists(self.cache_path):
+                try:
+                    with open(self.cache_path) as cfile:
+                        self._cache = codec.load(cfile)
+                except ValueError:
+                    LOGGER.warning("Ignoring unreadable resolver cache %s", self.cache_path)
+        return self._cache
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        now = time.time()
+        live = {key: value for key, value in self._cache.items() if now - value['time'] < self.ttl}
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as cfile:
+            codec.dump(live, cfile)
+        os.replace(tmp_path, self.cache_path)
+
+    def _key(self, entry):
+        return f"{self.cmr_env}|{entry.strip()}"
+
+    def _search(self, param, values):
+        """Collections matching any of values for param, as feed entries"""
+        url_prefix = cmr_environment_url(self.cmr_env)
+        found = []
+        for start in range(0, len(values), BATCH_SIZE):
+            query = '&'.join(f"{param}[]={quote(value)}" for value in values[start:start + BATCH_SIZE])
+            self.stats['requests'] += 1
+            found.extend(search_items(f"{url_prefix}/search/collections.json?{query}", timeout=self.timeout,
+                                      client=self.client))
+        return found
+
+    def _query(self, entries):
+        """Concept ids of uncached entries, from one bulk search per entry kind"""
+        parsed = {entry: parse_entry(entry) for entry in entries}
+        titles = sorted({value for kind, value in parsed.values() if kind == 'entry_title'})
+        names = sorted({value[0] for kind, value in parsed.values() if kind == 'short_name'})
+        by_title, by_name = {}, {}
+        # CMR matches entry_title[] and short_name[] case-insensitively
+        for item in self._search('entry_title', titles) if titles else ():
+            by_title.setdefault((item.get('title') or '').lower(), []).append(item['id'])
+        for item in self._search('short_name', names) if names else ():
+            by_name.setdefault((item.get('short_name') or '').lower(), []).append((item.get('version_id'), item['id']))
+
+        answers = {}
+        for entry, (kind, value) in parsed.items():
+            if kind == 'entry_title':
+                ids = by_title.get(value.lower(), [])
+            else:
+                short_name, version = value
+                ids = [cid for found_version, cid in by_name.get(short_name.lower(), [])
+                       if version is None or found_version == version]
+            if len(ids) > 1:
+                LOGGER.info("Association entry %s matches %s collections in %s", entry, len(ids), self.cmr_env)
+            answers[entry] = sorted(ids)
+        return answers
+
+    def resolve(self, entries):
+        """
+        Concept ids of each entry
+        Parameters
+        ----------
+        entries : iterable of association file entries
+        Returns
+        -------
+        dict entry -> list of concept ids, empty when nothing matches
+        """
+
+        now = time.time()
+        resolved, missing = {}, []
+        with self._lock:
+            cache = self._load()
+            for entry in {entry.strip() for entry in entries if entry.strip()}:
+                kind, value = parse_entry(entry)
+                cached = cache.get(self._key(entry))
+                if kind == 'concept_id':
+                    resolved[entry] = [value]
+                elif cached is not None and now - cached['time'] < self.ttl:
+                    resolved[entry] = cached['ids']
+                    self.stats['cached'] += 1
+                else:
+                    missing.append(entry)
+            if not missing:
+                return resolved
+
+            for entry, ids in self._query(missing).items():
+                resolved[entry] = ids
+                if ids:
+                    cache[self._key(entry)] = {'ids': ids, 'time': now}
+                    self.stats['resolved'] += 1
+                else:
+                    LOGGER.warning("Association entry %s matches no collection in %s", entry, self.cmr_env)
+                    self.stats['unresolved'] += 1
+            self._save()
+        LOGGER.info("Resolved association entries in %s: %s", self.cmr_env, self.stats)
+        return resolved
+
+    def expand(self, entries):
+        """
+        Sorted concept ids of all entries
+        Returns
+        -------
+        list of strings
+        Raises
+        ------
+        Exception when an entry matches no collection, see require_resolved
+        """
+        resolved = require_resolved(self.resolve(entries), self.cmr_env)
+        return sorted({cid for ids in resolved.values() for cid in ids})
+
+
+def require_resolved(resolved, cmr_env):
+    """
+    resolved, unless an entry matches no collection: syncing without it
+    would remove the association of the collection it was meant to name
+    Parameters
+    ----------
+    resolved : dict entry -> list of concept ids, from Resolver.resolve
+    Returns
+    -------
+    resolved
+    """
+    unresolved = sorted(entry for entry, ids in resolved.items() if not ids)
+    if unresolved:
+        raise Exception(f'Association entries match no collection in {cmr_env}: {", ".join(unresolved)}; '
+                        'fix or remove them before syncing')
+    return resolved
+
+
+def resolve_association(association, cmr_env, cache_path=DEFAULT_CACHE, ttl=DEFAULT_TTL, timeout=30, client=None):
+    """
+    Association argument with names resolved: the concept ids of an
+    association file or list that names collections, otherwise
+    association unchanged
+    Parameters
+    ----------
+    association : string association file or concept id, or list of entries
+    Returns
+    -------
+    string or list
+    """
+
+    if isinstance(association, (list, tuple)):
+        entries = list(association)
+    elif ".txt" in association:
+        with open(association) as afile:
+            entries = afile.readlines()
+    else:
+        entries = [association]
+    entries = [entry.strip() for entry in entries if entry.strip()]
+    if not needs_resolution(entries):
+        return association
+    return Resolver(cmr_env, cache_path=cache_path, ttl=ttl, timeout=timeout, client=client).expand(entries)
@@ -0,0 +1,59 @@
+"""
+==============
+revisions.py
+==============
+
+Optimistic concurrency for record ingest.
+
+The revision-id of a record is captured when its profile is read and
+the ingest PUT sends `Cmr-Revision-Id` with the next revision. If
+another writer updated the record in between CMR answers 409 and
+RevisionConflict is raised so the caller can re-read, re-diff and
+retry instead of silently overwriting the other update.
+"""
+
+REVISION_HEADER = 'Cmr-Revision-Id'
+
+# Re-read / re-diff / PUT cycles before giving up on a contended record
+MAX_CONFLICT_RETRIES = 5
+
+
+class RevisionConflict(Exception):
+    """Raised when CMR rejects an ingest because the record changed since it was read"""
+
+
+def next_revision(revision_id):
+    """
+    Revision to send when updating a record read at revision_id
+    Parameters
+    ----------
+    revision_id : int or None
+    Returns
+    -------
+    int or None when the remote revision is unknown
+    """
+    if revision_id is None:
+        return None
+    return int(revision_id) + 1
+
+
+def revision_header(header, revision_id):
+    """
+    Copy of header carrying the expected revision, header itself when
+    revision_id is None
+    """
+    if revision_id is None:
+        return header
+    return dict(header, **{REVISION_HEADER: str(revision_id)})
+
+
+def check_conflict(resp, revision_id):
+    """
+    Raise RevisionConflict for a 409 answer to a revision checked ingest
+    Parameters
+    ----------
+    resp : Request response
+    revision_id : int or None revision sent with the request
+    """
+    if revision_id is not None and resp.status_code == 409:
+        raise RevisionConflict(f"revision {revision_id} rejected by CMR: {resp.text}")
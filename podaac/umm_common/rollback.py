@@ -0,0 +1,245 @@
+"""
+==============
+rollback.py
+==============
+
+Snapshots of records before they are updated and rollback to an
+earlier revision.
+
+With a snapshot directory the update pipeline writes the CMR profile
+it already read for the diff, with its revision and the collection
+associations it already fetched, to `<native_id>.<revision>.json`
+before changing anything. `--rollback` re-ingests an earlier revision,
+from a snapshot when there is one or else from the CMR `all_revisions`
+search, and with a snapshot restores the association set with one
+batched add and one batched remove.
+"""
+
+import glob
+import logging
+import os
+import re
+import time
+
+from podaac.umm_common import associations
+from podaac.umm_common import codec
+from podaac.umm_common.client import cmr_environment_url
+from podaac.umm_common.concepts import record_version
+from podaac.umm_common.revisions import next_revision
+from podaac.umm_common.search import search_items
+
+LOGGER = logging.getLogger(__name__)
+
+
+def snapshot_path(directory, native_id, revision_id):
+    """Snapshot file of a revision"""
+    return os.path.join(directory, f"{native_id}.{revision_id}.json")
+
+
+def write_snapshot(directory, cmr_env, provider, concept_type, native_id, concept_id, revision_id, umm,
+                   collections=None):
+    """
+    Write the snapshot of a revision
+    Parameters
+    ----------
+    directory : string snapshot directory, created if missing
+    concept_type : string 'services' or 'tools'
+    revision_id : int revision of umm
+    umm : dict profile in CMR
+    collections : list of associated collection concept ids, None when unknown
+    Returns
+    -------
+    string path
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(directory, native_id, revision_id)
+    snapshot = {
+        'env': cmr_env,
+        'provider': provider,
+        'concept_type': concept_type,
+        'native_id': native_id,
+        'concept_id': concept_id,
+        'revision_id': revision_id,
+        'time': time.time(),
+        'umm': umm,
+        'associations': collections,
+    }
+    with open(path, 'w') as sfile:
+        codec.dump(snapshot, sfile, pretty=True)
+    LOGGER.info("Snapshot of %s revision %s written to %s", native_id, revision_id, path)
+    return path
+
+
+def snapshot_revisions(directory, native_id):
+    """
+    Revisions with a snapshot
+    Returns
+    -------
+    sorted list of int revision ids
+    """
+    pattern = re.compile(re.escape(native_id) + r'\.(\d+)\.json$')
+    revisions = []
+    for path in glob.glob(os.path.join(glob.escape(directory), glob.escape(native_id) + '.*.json')):
+        match = pattern.search(os.path.basename(path))
+        if match:
+            revisions.append(int(match.group(1)))
+    return sorted(revisions)
+
+
+def cmr_revisions(concept, cmr_env, provider, native_id, timeout=30, client=None):
+    """
+    Every revision CMR keeps of a record
+    Returns
+    -------
+    dict revision id -> {concept_id, deleted, umm}
+    """
+
+    url = concept.search_url(cmr_environment_url(cmr_env), 'umm_json') + \
+        f"?provider={provider}&native_id={native_id}&all_revisions=true"
+    revisions = {}
+    for item in search_items(url, timeout=timeout, client=client):
+        meta = item['meta']
+        revisions[meta['revision-id']] = {
+            'concept_id': meta['concept-id'],
+            'deleted': meta.get('deleted', False),
+            'umm': item.get('umm'),
+        }
+    return revisions
+
+
+def rollback_target(revisions, current, revision=None, snapshots=()):
+    """
+    Revision to roll back to: the requested one, or else the latest
+    earlier revision that is not a deletion
+    Parameters
+    ----------
+    revisions : dict from cmr_revisions
+    current : int current revision, None when CMR has none
+    revision : int requested revision, optional
+    snapshots : revisions with a snapshot, used when CMR no longer has them
+    Returns
+    -------
+    int revision id
+    """
+
+    if revision is not None:
+        if revision not in revisions and revision not in snapshots:
+            raise Exception(f'Revision {revision} is neither in CMR nor in the snapshots')
+        if revision not in snapshots and revisions[revision]['deleted']:
+            raise Exception(f'Revision {revision} is a deletion and has no profile to roll back to')
+        return revision
+
+    def earlier(rev):
+        return current is None or rev < current
+
+    candidates = [rev for rev, found in revisions.items() if earlier(rev) and not found['deleted']]
+    candidates.extend(rev for rev in snapshots if earlier(rev) and rev not in revisions)
+    if not candidates:
+        raise Exception(f'No revision before {current} to roll back to')
+    return max(candidates)
+
+
+def restore_associations(cmr_env, concept, concept_id, wanted, current_token, timeout=30, client=None):
+    """
+    Bring the associations of a record back to wanted with one batched
+    add and one batched remove
+    Returns
+    -------
+    (added, removed) lists of collection concept ids
+    """
+
+    header = {
+        'Content-type': "application/json",
+        'Authorization': str(current_token),
+    }
+    url_prefix = cmr_environment_url(cmr_env)
+    current = associations.current_association(concept_id, url_prefix, header, concept.path, timeout=timeout,
+                                               client=client) or []
+    add = sorted(set(wanted) - set(current))
+    remove = sorted(set(current) - set(wanted))
+    added, removed = [], []
+    for method, batch, done in (('POST', add, added), ('DELETE', remove, removed)):
+        if not batch:
+            continue
+        status, text = associations.association_batch(method, url_prefix, concept_id, batch, header, concept.path,
+                                                      timeout=timeout, client=client)
+        LOGGER.info("%s %s associations: response status: %s", 'Restore' if method == 'POST' else 'Remove',
+                    len(batch), status)
+        if status != 200:
+            raise Exception(f'Association {method} failed with status {status}: {text}')
+        done.extend(batch)
+    return added, removed
+
+
+def run_rollback(args, concept, native_id, api, current_token, revision=None, client=None):
+    """
+    Re-ingest an earlier revision of native_id and, when it comes from a
+    snapshot, restore its associations
+    Parameters
+    ----------
+    args : argparse.Namespace with env, provider, timeout and snapshot_dir
+    concept : ConceptType
+    api : RecordApi of concept
+    current_token : string cmr token
+    revision : int revision to restore, by default the one before the current
+    Returns
+    -------
+    dict rollback report
+    """
+
+    revisions = cmr_revisions(concept, args.env, args.provider, native_id, timeout=args.timeout, client=client)
+    current = max(revisions) if revisions else None
+    snapshots = snapshot_revisions(args.snapshot_dir, native_id) if args.snapshot_dir else []
+    target = rollback_target(revisions, current, revision, snapshots)
+
+    snapshot = None
+    if target in snapshots:
+        with open(snapshot_path(args.snapshot_dir, native_id, target)) as sfile:
+            snapshot = codec.load(sfile)
+        umm = snapshot['umm']
+    else:
+        umm = revisions[target]['umm']
+    LOGGER.info("Rolling %s back from revision %s to %s (%s)", native_id, current, target,
+                'snapshot' if snapshot else 'CMR revision')
+
+    header = {
+        'Content-type': f'application/vnd.nasa.cmr.umm+json;version={record_version(umm, concept)}',
+        'Accept': 'application/json',
+        'Authorization': str(current_token),
+    }
+    collection = None
+    if concept.collection_scoped:
+        # re-ingested under the collection it belongs to
+        collections = snapshot.get('associations') if snapshot else None
+        if not collections and current is not None:
+            collections = associations.current_association(
+                revisions[current]['concept_id'], cmr_environment_url(args.env), header, concept.path,
+                timeout=args.timeout, client=client)
+        collection = collections[0] if collections else None
+    # the revision id check fails the rollback if someone else updates the record meanwhile
+    resp = api.create_record(args.env, umm, args.provider, native_id, header, timeout=args.timeout, client=client,
+                             revision_id=next_revision(current) if current is not None else None,
+                             collection=collection)
+    try:
+        ingested = codec.response_json(resp)
+    except ValueError:
+        ingested = {}
+    report = {
+        'native_id': native_id,
+        'from_revision': current,
+        'to_revision': target,
+        'source': 'snapshot' if snapshot else 'cmr',
+        'new_revision': ingested.get('revision-id'),
+        'concept_id': ingested.get('concept-id'),
+        'associations_added': [],
+        'associations_removed': [],
+    }
+    if snapshot is not None and snapshot.get('associations') is not None:
+        added, removed = restore_associations(args.env, concept, report['concept_id'] or snapshot['concept_id'],
+                                              snapshot['associations'], current_token, timeout=args.timeout,
+                                              client=client)
+        report['associations_added'] = added
+        report['associations_removed'] = removed
+    LOGGER.info("Rollback of %s: %s", native_id, report)
+    return report
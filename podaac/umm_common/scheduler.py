@@ -0,0 +1,185 @@
+"""
+==============
+scheduler.py
+==============
+
+Priority request scheduler of the shared client (`--schedule`).
+
+Every request is classified as token, ingest (record writes and
+deletes), search (reads) or association (association writes). Each
+class has its own concurrency budget and all requests share a total
+budget; when a slot frees up, the waiting request of the most urgent
+class with room goes first (token, then ingest, search and association
+last, in arrival order within a class). With the association budget
+below the total, an association fan-out cannot hold every slot, so the
+record ingest and readiness polls of the run, or of the other records
+of a batch, are never queued behind it.
+
+Queue depth and wait time per class are kept for the client metrics.
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from podaac.umm_common import deadline
+
+TOKEN = 'token'
+INGEST = 'ingest'
+SEARCH = 'search'
+ASSOCIATION = 'association'
+
+# lower goes first
+PRIORITIES = {TOKEN: 0, INGEST: 1, SEARCH: 2, ASSOCIATION: 3}
+DEFAULT_BUDGETS = {TOKEN: 2, INGEST: 4, SEARCH: 8, ASSOCIATION: 6}
+DEFAULT_TOTAL = 12
+
+
+def request_class(method, url):
+    """
+    Class of a request
+    Returns
+    -------
+    one of TOKEN, INGEST, SEARCH, ASSOCIATION
+    """
+    path = urlparse(url).path
+    if path.endswith('/tokens'):
+        return TOKEN
+    if path.startswith('/ingest/'):
+        return INGEST
+    if path.endswith('/associations') and method != 'GET':
+        return ASSOCIATION
+    return SEARCH
+
+
+def parse_budgets(values):
+    """
+    Budgets from CLASS=N strings, on top of the defaults
+    Returns
+    -------
+    dict class -> int
+    Raises
+    ------
+    ValueError for a value that is not CLASS=N with a known class and N >= 1
+    """
+    budgets = dict(DEFAULT_BUDGETS)
+    for value in values or ():
+        name, sep, count = value.partition('=')
+        if not sep or name not in budgets or not count.isdigit() or int(count) < 1:
+            raise ValueError(f'Budget "{value}" is not CLASS=N with CLASS one of {", ".join(budgets)} and N >= 1')
+        budgets[name] = int(count)
+    return budgets
+
+
+class RequestScheduler:
+    """
+    Admits requests by class budget, total budget and class priority
+    """
+
+    def __init__(self, budgets=None, total=DEFAULT_TOTAL):
+        """
+        Parameters
+        ----------
+        budgets : dict class -> concurrent requests, defaults to DEFAULT_BUDGETS
+        total : int concurrent requests of all classes together
+        """
+        self.budgets = dict(budgets or DEFAULT_BUDGETS)
+        self.total = total
+        self.in_flight = {name: 0 for name in self.budgets}
+        self.stats = {name: {'admitted': 0, 'queued': 0, 'max_queue': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+                      for name in self.budgets}
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _running(self):
+        return sum(self.in_flight.values())
+
+    def _next(self):
+        """Ticket of the waiting request to admit next, None if none may start"""
+        if self._running() >= self.total:
+            return None
+        eligible = [ticket for ticket in self._waiting if self.in_flight[ticket[2]] < self.budgets[ticket[2]]]
+        return min(eligible, default=None)
+
+    def _queue_depth(self, name):
+        return sum(1 for ticket in self._waiting if ticket[2] == name)
+
+    def acquire(self, name):
+        """
+        Block until a request of class name may start
+        Returns
+        -------
+        float seconds waited
+        """
+        start = time.monotonic()
+        ticket = (PRIORITIES.get(name, len(PRIORITIES)), next(self._sequence), name)
+        with self._condition:
+            self._waiting.append(ticket)
+            stats = self.stats[name]
+            queued = False
+            try:
+                while self._next() != ticket:
+                    if not queued:
+                        queued = True
+                        stats['queued'] += 1
+                        stats['max_queue'] = max(stats['max_queue'], self._queue_depth(name))
+                    current = deadline.current()
+                    self._condition.wait(timeout=current.remaining() if current else None)
+                    if current is not None:
+                        current.check()
+            except BaseException:
+                self._waiting.remove(ticket)
+                # this ticket may have been the one holding back an admissible waiter
+                self._condition.notify_all()
+                raise
+            self._waiting.remove(ticket)
+            self.in_flight[name] += 1
+            waited = time.monotonic() - start
+            stats['admitted'] += 1
+            stats['wait_total'] += waited
+            stats['wait_max'] = max(stats['wait_max'], waited)
+            # the next waiter may be admissible too
+            self._condition.notify_all()
+        return waited
+
+    def release(self, name):
+        """A request of class name finished"""
+        with self._condition:
+            self.in_flight[name] -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, method, url):
+        """Hold a slot of the class of a request while it runs"""
+        name = request_class(method, url)
+        self.acquire(name)
+        try:
+            yield name
+        finally:
+            self.release(name)
+
+    def metrics(self):
+        """
+        Snapshot of the budgets, queues and waits of each class
+        Returns
+        -------
+        dict
+        """
+        with self._condition:
+            classes = {}
+            for name, stats in self.stats.items():
+                admitted = stats['admitted']
+                classes[name] = {
+                    'budget': self.budgets[name],
+                    'in_flight': self.in_flight[name],
+                    'queue_depth': self._queue_depth(name),
+                    'max_queue_depth': stats['max_queue'],
+                    'admitted': admitted,
+                    'queued': stats['queued'],
+                    'wait_mean': round(stats['wait_total'] / admitted, 4) if admitted else 0.0,
+                    'wait_max': round(stats['wait_max'], 4),
+                }
+            return {'total': self.total, 'in_flight': self._running(), 'classes': classes}
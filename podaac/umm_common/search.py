@@ -0,0 +1,49 @@
+"""
+==============
+search.py
+==============
+
+Paginated CMR search helpers
+"""
+
+import logging
+
+from podaac.umm_common import codec
+from podaac.umm_common.client import get_client
+
+LOGGER = logging.getLogger(__name__)
+
+PAGE_SIZE = 2000
+
+
+def search_items(url, headers=None, page_size=PAGE_SIZE, timeout=30, client=None):
+    """
+    Yield every item of a CMR search, following CMR-Search-After pages;
+    for .json searches the feed entries are yielded
+    Parameters
+    ----------
+    url : string search url, with or without query parameters
+    headers : dict request headers
+    page_size : int
+    Returns
+    -------
+    generator of item dicts
+    """
+
+    client = get_client(client)
+    headers = dict(headers or {})
+    separator = '&' if '?' in url else '?'
+    url = f"{url}{separator}page_size={page_size}"
+    page = 0
+    while True:
+        resp = client.get(url, headers=headers, timeout=timeout)
+        resp.raise_for_status()
+        body = codec.response_json(resp)
+        items = body.get('items') or body.get('feed', {}).get('entry') or []
+        page += 1
+        LOGGER.debug("Search page %s returned %s items: %s", page, len(items), url)
+        yield from items
+        search_after = resp.headers.get('CMR-Search-After')
+        if not search_after or len(items) < page_size:
+            return
+        headers['CMR-Search-After'] = search_after
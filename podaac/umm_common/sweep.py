@@ -0,0 +1,266 @@
+"""
+==============
+sweep.py
+==============
+
+Provider-wide reconciliation: pulls every service or tool of a
+provider (with its collection associations) in paginated bulk
+searches, matches them to a directory of local records by native_id
+and reports, or applies, the drift for all of them in one pass.
+"""
+
+import logging
+import os
+
+from requests import exceptions
+
+from podaac.umm_common import associations
+from podaac.umm_common import codec
+from podaac.umm_common import overrides
+from podaac.umm_common import resolver
+from podaac.umm_common import watch
+from podaac.umm_common.client import cmr_environment_url
+from podaac.umm_common.diff import changed_paths
+from podaac.umm_common.revisions import RevisionConflict, next_revision
+from podaac.umm_common.search import search_items
+
+LOGGER = logging.getLogger(__name__)
+
+
+def remote_records(cmr_env, provider, concept_type, timeout=30, client=None):
+    """
+    All records of a provider keyed by native_id
+    Parameters
+    ----------
+    cmr_env : string
+    provider : string
+    concept_type : string 'services' or 'tools'
+    Returns
+    -------
+    dict native_id -> {concept_id, revision_id, umm, associations}
+    """
+
+    url = f"{cmr_environment_url(cmr_env)}/search/{concept_type}.umm_json?provider={provider}"
+    records = {}
+    for item in search_items(url, timeout=timeout, client=client):
+        meta = item['meta']
+        records[meta['native-id']] = {
+            'concept_id': meta['concept-id'],
+            'revision_id': meta.get('revision-id'),
+            'umm': item['umm'],
+            'associations': associations.meta_collections(meta),
+        }
+    LOGGER.info("Found %s %s for provider %s", len(records), concept_type, provider)
+    return records
+
+
+def local_records(directory, provider, cmr_env, native_id_func, set_values=None, record_filter=None):
+    """
+    UMM JSON records of a directory keyed by native_id
+    Parameters
+    ----------
+    directory : string
+    provider : string
+    cmr_env : string
+    native_id_func : callable(provider, umm_json) -> native_id
+    set_values : list of `--set` override expressions
+    record_filter : callable(umm_json) -> bool, records it rejects are skipped
+    Returns
+    -------
+    dict native_id -> {file, umm, associations}
+    """
+
+    records = {}
+    for name in sorted(os.listdir(directory)):
+        if not watch.is_record(name):
+            continue
+        path = os.path.join(directory, name)
+        with open(path) as json_file:
+            umm = overrides.apply_overrides(codec.load(json_file), path, cmr_env, set_values)
+        if record_filter is not None and not record_filter(umm):
+            continue
+        assoc_file = watch.association_file(path, cmr_env)
+        records[native_id_func(provider, umm)] = {
+            'file': path,
+            'umm': umm,
+            'associations': associations.get_association(assoc_file) if assoc_file else None,
+        }
+    return records
+
+
+def resolve_local_associations(local, cmr_env, cache_path=None, ttl=resolver.DEFAULT_TTL, timeout=30, client=None):
+    """
+    Replace collection names in the associations of local records by
+    concept ids, resolving the entries of all records in one bulk pass
+    Parameters
+    ----------
+    local : dict from local_records, updated in place
+    cache_path : string resolver cache file, the default one when None
+    """
+
+    entries = [entry for record in local.values() for entry in record['associations'] or ()]
+    if not resolver.needs_resolution(entries):
+        return
+    names = resolver.Resolver(cmr_env, cache_path=cache_path or resolver.DEFAULT_CACHE, ttl=ttl, timeout=timeout,
+                              client=client)
+    resolved = resolver.require_resolved(names.resolve(entries), cmr_env)
+    for record in local.values():
+        if record['associations'] is not None:
+            record['associations'] = sorted({cid for entry in record['associations'] if entry.strip()
+                                             for cid in resolved[entry.strip()]})
+
+
+def compare_records(local, remote, remove_collection=True):
+    """
+    Drift between local and remote records
+    Parameters
+    ----------
+    local : dict from local_records
+    remote : dict from remote_records
+    remove_collection : bool report remote-only associations for removal
+    Returns
+    -------
+    list of per record drift entries, remote-only native_ids
+    """
+
+    entries = []
+    for native_id, record in sorted(local.items()):
+        current = remote.get(native_id)
+        entry = {'native_id': native_id, 'file': record['file'], 'drift': []}
+        if current is None:
+            entry['concept_id'] = None
+            entry['drift'].append('missing')
+            entry['add'] = list(record['associations'] or [])
+            entry['remove'] = []
+        else:
+            entry['concept_id'] = current['concept_id']
+            entry['revision_id'] = current['revision_id']
+            entry['changed_paths'] = changed_paths(current['umm'], record['umm'])
+            if entry['changed_paths']:
+                entry['drift'].append('profile')
+            wanted = record['associations']
+            if wanted is None:
+                entry['add'], entry['remove'] = [], []
+            else:
+                entry['add'] = sorted(set(wanted) - set(current['associations']))
+                entry['remove'] = sorted(set(current['associations']) - set(wanted)) if remove_collection else []
+        if entry['add'] or entry['remove']:
+            entry['drift'].append('associations')
+        entries.append(entry)
+    remote_only = sorted(set(remote) - set(local))
+    return entries, remote_only
+
+
+def apply_drift(entries, local, cmr_env, provider, concept_type, create_record, current_token,
+                umm_version, timeout=30, client=None, failures=None):
+    """
+    Ingest drifted profiles and apply association changes. A record that
+    fails to ingest gets applied False and an error, the others are still
+    applied
+    Parameters
+    ----------
+    entries : list from compare_records
+    local : dict from local_records
+    create_record : callable with the create_service/create_tool signature
+    current_token : string cmr token
+    umm_version : string UMM schema version of the local records
+    failures : FailureReport collecting failed association operations
+    """
+
+    ingest_header = {
+        'Content-type': f'application/vnd.nasa.cmr.umm+json;version={umm_version}',
+        'Accept': 'application/json',
+        'Authorization': str(current_token),
+    }
+    assoc_header = {
+        'Content-type': 'application/json',
+        'Authorization': str(current_token),
+    }
+    for entry in entries:
+        native_id = entry['native_id']
+        if 'missing' in entry['drift'] or 'profile' in entry['drift']:
+            LOGGER.info("Ingesting %s (%s)", native_id, ', '.join(entry['drift']))
+            try:
+                resp = create_record(cmr_env, local[native_id]['umm'], provider, native_id, ingest_header,
+                                     timeout=timeout, client=client,
+                                     revision_id=next_revision(entry.get('revision_id')))
+            except RevisionConflict as err:
+                # changed in CMR since the sweep read it, left for the next sweep
+                LOGGER.warning("Skipping %s: %s", native_id, err)
+                entry['applied'] = False
+                entry['conflict'] = str(err)
+                continue
+            except (SystemExit, exceptions.RequestException) as err:
+                # create_record reports HTTP errors as SystemExit; one bad record must not stop the sweep
+                LOGGER.error("Failed to ingest %s: %s", native_id, err)
+                entry['applied'] = False
+                entry['error'] = f'ingest failed: {err}'
+                continue
+            if entry['concept_id'] is None:
+                entry['concept_id'] = codec.response_json(resp)['concept-id']
+        if 'associations' in entry['drift']:
+            associations.apply_association_changes(cmr_env, entry['concept_id'], entry['add'], entry['remove'],
+                                                   assoc_header, concept_type, timeout=timeout,
+                                                   client=client, failures=failures)
+        entry['applied'] = bool(entry['drift'])
+
+
+def run_sweep(args, concept_type, native_id_func, create_record, umm_version, current_token=None, client=None,
+              failures=None, record_filter=None):
+    """
+    Reconcile the directory args.sweep against every record of args.provider
+    Parameters
+    ----------
+    args : argparse.Namespace updater arguments
+    concept_type : string 'services' or 'tools'
+    native_id_func : callable(provider, umm_json) -> native_id
+    create_record : callable with the create_service/create_tool signature
+    umm_version : string UMM schema version of the local records
+    current_token : string cmr token, needed with args.apply
+    failures : FailureReport collecting failed association operations
+    record_filter : callable(umm_json) -> bool selecting the local records of concept_type
+    Returns
+    -------
+    dict sweep report
+    """
+
+    remote = remote_records(args.env, args.provider, concept_type, timeout=args.timeout, client=client)
+    local = local_records(args.sweep, args.provider, args.env, native_id_func, set_values=args.set,
+                          record_filter=record_filter)
+    resolve_local_associations(local, args.env, cache_path=args.resolver_cache, ttl=args.resolver_ttl,
+                               timeout=args.timeout, client=client)
+    entries, remote_only = compare_records(local, remote, remove_collection=args.disable_removal)
+
+    for entry in entries:
+        if entry['drift']:
+            LOGGER.info("Drift %s: %s changed paths %s, +%s/-%s associations", entry['native_id'],
+                        entry['drift'], entry.get('changed_paths', []), len(entry['add']), len(entry['remove']))
+        else:
+            LOGGER.info("In sync: %s", entry['native_id'])
+    if remote_only:
+        LOGGER.info("In CMR but not in %s: %s", args.sweep, remote_only)
+
+    if args.apply:
+        apply_drift(entries, local, args.env, args.provider, concept_type, create_record, current_token,
+                    umm_version, timeout=args.timeout, client=client, failures=failures)
+
+    report = {
+        'env': args.env,
+        'provider': args.provider,
+        'concept_type': concept_type,
+        'applied': args.apply,
+        'records': entries,
+        'remote_only': remote_only,
+        'summary': {
+            'local': len(local),
+            'remote': len(remote),
+            'drifted': sum(1 for entry in entries if entry['drift']),
+            'remote_only': len(remote_only),
+            'failed': sum(1 for entry in entries if entry.get('error')),
+        },
+    }
+    LOGGER.info("Sweep summary: %s", report['summary'])
+    if args.sweep_report:
+        with open(args.sweep_report, 'w') as rfile:
+            codec.dump(report, rfile, pretty=True)
+    return report
@@ -0,0 +1,195 @@
+"""
+==============
+tracing.py
+==============
+
+Span tracing of a run (`--trace FILE`) in the Chrome trace event
+format, viewable in chrome://tracing or https://ui.perfetto.dev.
+
+Spans cover the run, each pipeline phase (token, lookup, diff, put,
+wait, verify and the association phases), each attempt of a backoff
+loop such as pull_concept_id, association batches and every HTTP
+request; backoff retries are marked as instant events with the wait
+before the next attempt. Spans of the phase and request threads keep
+their own track.
+
+Without a trace file span() returns a shared no-op object and traced()
+calls the function directly, so the cost is one global lookup.
+"""
+
+import functools
+import os
+import threading
+import time
+
+from podaac.umm_common import codec
+
+_TRACER = None
+
+
+class _NoopSpan:
+    """Span used while tracing is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        """Ignore args"""
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """
+    One complete ('X') event, recorded when the block exits
+    """
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args['error'] = f'{exc_type.__name__}: {exc}'
+        self.tracer.complete(self.name, self.category, self.start, end, self.args)
+        return False
+
+    def set(self, **args):
+        """Add arguments shown with the span, e.g. a response status"""
+        self.args.update(args)
+
+
+class Tracer:
+    """
+    Collects trace events of every thread and writes them as JSON
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def _event(self, event):
+        thread = threading.current_thread()
+        event['pid'] = self.pid
+        event['tid'] = thread.ident
+        with self._lock:
+            if thread.ident not in self._threads:
+                self._threads[thread.ident] = thread.name
+            self.events.append(event)
+
+    def _micros(self, seconds):
+        return round((seconds - self.origin) * 1e6, 1)
+
+    def complete(self, name, category, begin, end, args):
+        """Record a span from begin to end (perf_counter seconds)"""
+        self._event({'name': name, 'cat': category, 'ph': 'X', 'ts': self._micros(begin),
+                     'dur': round((end - begin) * 1e6, 1), 'args': args})
+
+    def instant(self, name, category, args):
+        """Record a point in time on the current thread"""
+        self._event({'name': name, 'cat': category, 'ph': 'i', 's': 't', 'ts': self._micros(time.perf_counter()),
+                     'args': args})
+
+    def write(self):
+        """
+        Write the trace file
+        Returns
+        -------
+        int number of events
+        """
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                    for tid, name in threads.items()]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'w') as tfile:
+            codec.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, tfile)
+        return len(events)
+
+
+def start(path):
+    """
+    Start tracing to path, None leaves tracing off
+    Returns
+    -------
+    Tracer or None
+    """
+    global _TRACER  # pylint: disable=global-statement
+    _TRACER = Tracer(path) if path else None
+    return _TRACER
+
+
+def stop():
+    """
+    Write the trace file and turn tracing off
+    Returns
+    -------
+    int number of events written, None when tracing was off
+    """
+    global _TRACER  # pylint: disable=global-statement
+    tracer, _TRACER = _TRACER, None
+    if tracer is None:
+        return None
+    return tracer.write()
+
+
+def span(name, category='run', **args):
+    """
+    Context manager timing a block as a span
+    Returns
+    -------
+    Span, or a no-op span when tracing is off
+    """
+    if _TRACER is None:
+        return _NOOP
+    return Span(_TRACER, name, category, args)
+
+
+def instant(name, category='run', **args):
+    """Mark a point in time, nothing when tracing is off"""
+    if _TRACER is not None:
+        _TRACER.instant(name, category, args)
+
+
+def traced(name=None, category='call'):
+    """
+    Decorator running each call of the function in a span; under a
+    backoff decorator every attempt gets its own span
+    """
+
+    def decorate(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _TRACER is None:
+                return func(*args, **kwargs)
+            with Span(_TRACER, span_name, category, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def retry(details):
+    """on_backoff handler marking the retry of a backoff loop"""
+    if _TRACER is not None:
+        _TRACER.instant('retry', 'retry', {'target': details['target'].__name__, 'tries': details['tries'],
+                                           'wait': round(details.get('wait') or 0.0, 3)})
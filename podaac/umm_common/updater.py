@@ -0,0 +1,152 @@
+"""
+==============
+updater.py
+==============
+
+Library interface to the update pipeline.
+
+An Updater is bound to a CMR environment and provider, keeps a single
+client (pooled connections, token and concept_id caches) for all its
+calls and returns an UpdateResult per record, so many records can be
+published in process:
+
+    with ServiceUpdater('uat', 'POCLOUD', token=token) as updater:
+        for path in paths:
+            result = updater.update(path, associations='cmr/uat_associations.txt')
+
+A plain Updater without a concept type publishes mixed batches, each
+record as the type named by its MetadataSpecification.
+"""
+
+import argparse
+
+from podaac.umm_common import codec
+from podaac.umm_common import engine
+from podaac.umm_common.client import CmrClient
+from podaac.umm_common.concepts import SERVICE, TOOL, VARIABLE
+from podaac.umm_common.resolver import DEFAULT_TTL
+
+
+class Updater:
+    """
+    Create or update UMM records
+    """
+
+    def __init__(self, env, provider, concept=None, token=None, cmr_user=None, cmr_pass=None, timeout=30,
+                 umm_version=None, client=None):
+        """
+        Parameters
+        ----------
+        env : string 'uat' or 'ops'
+        provider : string CMR provider id
+        concept : ConceptType of records not naming their own, optional
+        token : string CMR token, or cmr_user and cmr_pass to request one
+        timeout : int request timeout in seconds
+        umm_version : string UMM schema version of the records, defaults to the concept type's
+        client : CmrClient to share, a new one by default
+        """
+        if not token and not (cmr_user and cmr_pass):
+            raise ValueError('No credentials provided, pass token or cmr_user and cmr_pass')
+        self.concept = concept
+        self.env = env
+        self.provider = provider
+        self.token = token
+        self.cmr_user = cmr_user
+        self.cmr_pass = cmr_pass
+        self.timeout = timeout
+        self.umm_version = umm_version
+        self.client = client or CmrClient(timeout=timeout)
+
+    def update(self, record, associations=None, remove_associations=True, overrides=None,
+               override_file=None, journal=None, resume=False, failure_report=None, snapshot_dir=None):
+        """
+        Create or update one record and synchronize its associations
+        Parameters
+        ----------
+        record : string path to a UMM JSON file, or the record as dict
+        associations : string association file or collection concept id, or list of collection
+                       concept ids or names (short_name[/version], entry_title:<title>);
+                       None leaves associations alone
+        remove_associations : bool remove associations missing from associations
+        overrides : list of `/pointer=value` or `/pointer:=json` expressions
+        override_file : string override file, by default the one next to record
+        journal : string association journal file
+        resume : bool continue an unfinished journaled association plan
+        failure_report : string file failed association operations are written to
+        snapshot_dir : string directory the replaced CMR profile and associations are saved in
+        Returns
+        -------
+        UpdateResult
+        """
+
+        path = record if isinstance(record, str) else None
+        if path is not None:
+            with open(path) as json_file:
+                record = codec.load(json_file)
+        args = argparse.Namespace(
+            jfilename=path,
+            provider=self.provider,
+            env=self.env,
+            token=self.token,
+            cmr_user=self.cmr_user,
+            cmr_pass=self.cmr_pass,
+            timeout=self.timeout,
+            umm_version=self.umm_version,
+            assoc=associations,
+            disable_removal=remove_associations,
+            set=list(overrides or []),
+            override_file=override_file,
+            journal=journal,
+            resume=resume,
+            failure_report=failure_report,
+            snapshot_dir=snapshot_dir,
+            resolver_cache=None,
+            resolver_ttl=DEFAULT_TTL,
+        )
+        return engine.update_record(args, self.concept, client=self.client, local_umm=record)
+
+    def update_many(self, records, **kwargs):
+        """
+        Update several records with the same options, in order
+        Returns
+        -------
+        list of UpdateResult
+        """
+        return [self.update(record, **kwargs) for record in records]
+
+    def close(self):
+        """Close the client's pooled connections"""
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ServiceUpdater(Updater):  # pylint: disable=too-few-public-methods
+    """
+    Create or update UMM-S records
+    """
+
+    def __init__(self, env, provider, **kwargs):
+        super().__init__(env, provider, concept=SERVICE, **kwargs)
+
+
+class ToolUpdater(Updater):  # pylint: disable=too-few-public-methods
+    """
+    Create or update UMM-T records
+    """
+
+    def __init__(self, env, provider, **kwargs):
+        super().__init__(env, provider, concept=TOOL, **kwargs)
+
+
+class VariableUpdater(Updater):  # pylint: disable=too-few-public-methods
+    """
+    Create or update UMM-Var records
+    """
+
+    def __init__(self, env, provider, **kwargs):
+        super().__init__(env, provider, concept=VARIABLE, **kwargs)
@@ -0,0 +1,120 @@
+"""
+==============
+verify.py
+==============
+
+Verification of the end state of an update.
+
+Instead of trusting the status of each call, the pipeline checks the
+outcome with two light queries: the revision of the record from a
+.json search (no profile download) and the collections associated
+with it from one paginated listing. Both are compared with what the
+run meant to do and every mismatch is reported as a discrepancy.
+"""
+
+import logging
+
+import backoff
+
+from podaac.umm_common import codec
+from podaac.umm_common import deadline
+from podaac.umm_common import history
+from podaac.umm_common import tracing
+from podaac.umm_common.client import cmr_environment_url, get_client
+from podaac.umm_common.search import search_items
+
+LOGGER = logging.getLogger(__name__)
+
+# seconds between association listings while CMR indexes the last writes
+ASSOCIATION_RECHECK = 2
+
+
+def current_revision(cmr_env, concept_type, concept_id, timeout=30, client=None):
+    """
+    Revision of a record from a .json search
+    Parameters
+    ----------
+    concept_type : string 'services' or 'tools'
+    Returns
+    -------
+    int revision id, None when the record is not found
+    """
+
+    url = f"{cmr_environment_url(cmr_env)}/search/{concept_type}.json?concept_id={concept_id}"
+    resp = get_client(client).get(url, timeout=timeout)
+    resp.raise_for_status()
+    items = codec.response_json(resp).get('items') or []
+    if not items:
+        return None
+    return items[0].get('revision_id')
+
+
+def associated_collections(cmr_env, concept_type, concept_id, timeout=30, client=None):
+    """
+    Concept ids of every collection associated with a record, all pages
+    Returns
+    -------
+    set of strings
+    """
+
+    url = f"{cmr_environment_url(cmr_env)}/search/collections.json?{concept_type[:-1]}_concept_id={concept_id}"
+    return {item['id'] for item in search_items(url, timeout=timeout, client=client)}
+
+
+def association_discrepancies(intended, current, remove_collection=True):
+    """
+    Differences between the intended and the current association set
+    Parameters
+    ----------
+    intended : iterable of collection concept ids the record should be associated with
+    current : set of associated collection concept ids
+    remove_collection : bool associations outside intended should be gone
+    Returns
+    -------
+    list of discrepancy dicts
+    """
+
+    intended = {assoc_id.strip() for assoc_id in intended if assoc_id.strip()}
+    found = [{'kind': 'missing_association', 'assoc_id': assoc_id} for assoc_id in sorted(intended - current)]
+    if remove_collection:
+        found.extend({'kind': 'unexpected_association', 'assoc_id': assoc_id}
+                     for assoc_id in sorted(current - intended))
+    return found
+
+
+@backoff.on_predicate(backoff.constant, bool, interval=ASSOCIATION_RECHECK, max_tries=3, jitter=None,
+                      max_time=deadline.backoff_max_time, on_giveup=deadline.backoff_giveup,
+                      on_backoff=(history.count_retry, tracing.retry))
+@tracing.traced(category='verify')
+def verify_associations(cmr_env, concept_type, concept_id, intended, remove_collection=True, timeout=30,
+                        client=None):
+    """
+    Association discrepancies, listed again a few times while there
+    are some since CMR may still be indexing the last writes
+    Returns
+    -------
+    list of discrepancy dicts
+    """
+    current = associated_collections(cmr_env, concept_type, concept_id, timeout=timeout, client=client)
+    return association_discrepancies(intended, current, remove_collection)
+
+
+@backoff.on_predicate(backoff.fibo, lambda result: bool(result[1]), max_tries=5,
+                      max_time=deadline.backoff_max_time, on_giveup=deadline.backoff_giveup,
+                      on_backoff=(history.count_retry, tracing.retry))
+@tracing.traced(category='verify')
+def verify_revision(cmr_env, concept_type, concept_id, expected=None, timeout=30, client=None):
+    """
+    Check that the record exists, at the expected revision when given;
+    checked again a few times while it does not, as a new record or
+    revision may not be searchable yet
+    Returns
+    -------
+    (int revision id or None, list of discrepancy dicts)
+    """
+    revision_id = current_revision(cmr_env, concept_type, concept_id, timeout=timeout, client=client)
+    if revision_id is None:
+        return None, [{'kind': 'missing_record', 'concept_id': concept_id}]
+    if expected is not None and revision_id != expected:
+        return revision_id, [{'kind': 'revision', 'expected': expected, 'found': revision_id}]
+    return revision_id, []
@@ -0,0 +1,307 @@
+"""
+==============
+watch.py
+==============
+
+Long running watch mode: polls a directory of UMM JSON records and
+association files, debounces changes and re-syncs only the records
+affected, reusing the same client between events.
+"""
+
+import copy
+import fnmatch
+import logging
+import os
+import threading
+import time
+
+from podaac.umm_common import codec
+from podaac.umm_common import deadline
+
+LOGGER = logging.getLogger(__name__)
+
+ASSOCIATION_SUFFIX = "_associations.txt"
+OVERRIDE_SUFFIX = "_overrides.json"
+
+
+class DirectoryWatcher:
+    """
+    Polling watcher reporting files that changed and then stayed
+    unchanged for `debounce` seconds
+    """
+
+    def __init__(self, directory, patterns=('*.json', '*' + ASSOCIATION_SUFFIX), debounce=2.0):
+        self.directory = directory
+        self.patterns = patterns
+        self.debounce = debounce
+        self._seen = {}
+        self._pending = {}
+
+    def scan(self):
+        """
+        Return {path: (mtime_ns, size)} of watched files in directory
+        """
+        state = {}
+        for name in sorted(os.listdir(self.directory)):
+            if not any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def prime(self):
+        """
+        Record current state, returning all watched files
+        """
+        self._seen = self.scan()
+        return set(self._seen)
+
+    def poll(self, now=None):
+        """
+        Scan directory and return the set of files whose change has
+        settled for longer than the debounce window
+        """
+        now = time.monotonic() if now is None else now
+        state = self.scan()
+        for path, signature in state.items():
+            if self._seen.get(path) != signature:
+                self._pending[path] = now
+        for path in set(self._seen) - set(state):
+            self._pending[path] = now
+        self._seen = state
+
+        ready = {path for path, changed in self._pending.items()
+                 if now - changed >= self.debounce}
+        for path in ready:
+            del self._pending[path]
+        return ready
+
+    @property
+    def pending(self):
+        """Number of changes still inside the debounce window"""
+        return len(self._pending)
+
+
+def is_record(path):
+    """True for UMM JSON records, False for override files and other companions"""
+    return path.endswith('.json') and not path.endswith(OVERRIDE_SUFFIX)
+
+
+def companion_file(record_path, cmr_env, suffix):
+    """
+    Per record `<record>_<env><suffix>` file if present, otherwise the
+    directory wide `<env><suffix>`
+    Parameters
+    ----------
+    record_path : string path to UMM JSON record
+    cmr_env : string
+    suffix : string ASSOCIATION_SUFFIX or OVERRIDE_SUFFIX
+    Returns
+    -------
+    string path or None
+    """
+
+    directory = os.path.dirname(record_path)
+    stem = os.path.splitext(os.path.basename(record_path))[0]
+    for name in (f"{stem}_{cmr_env}{suffix}", f"{cmr_env}{suffix}"):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def association_file(record_path, cmr_env):
+    """
+    Association file used for a record: `<record>_<env>_associations.txt`
+    if present, otherwise the directory wide `<env>_associations.txt`
+    Parameters
+    ----------
+    record_path : string path to UMM JSON record
+    cmr_env : string
+    Returns
+    -------
+    string path or None
+    """
+    return companion_file(record_path, cmr_env, ASSOCIATION_SUFFIX)
+
+
+def affected_records(changed, directory, cmr_env):
+    """
+    Map changed files onto the UMM JSON records that need a sync
+    Parameters
+    ----------
+    changed : iterable of paths
+    directory : string watched directory
+    cmr_env : string
+    Returns
+    -------
+    sorted list of record paths
+    """
+
+    records = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                     if is_record(name))
+    affected = set()
+    for path in changed:
+        if is_record(path):
+            if os.path.isfile(path):
+                affected.add(path)
+            continue
+        for suffix in (ASSOCIATION_SUFFIX, OVERRIDE_SUFFIX):
+            shared = os.path.join(directory, f"{cmr_env}{suffix}")
+            if path == shared:
+                affected.update(record for record in records
+                                if companion_file(record, cmr_env, suffix) in (shared, None))
+            elif path.endswith(f"_{cmr_env}{suffix}"):
+                stem = os.path.basename(path)[:-len(f"_{cmr_env}{suffix}")]
+                record = os.path.join(directory, stem + '.json')
+                if os.path.isfile(record):
+                    affected.add(record)
+    return sorted(affected)
+
+
+class WatchMetrics:
+    """
+    Counters exposed on the health endpoint
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.started = time.time()
+        self.syncs = 0
+        self.failures = 0
+        self.last_sync = None
+        self.last_error = None
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def record(self, record_path, error=None):
+        """Count a finished sync of record_path"""
+        with self._lock:
+            self.syncs += 1
+            self.last_sync = {'record': record_path, 'time': time.time(), 'ok': error is None}
+            if error is not None:
+                self.failures += 1
+                self.last_error = str(error)
+
+    def snapshot(self):
+        """
+        Return metrics as dict
+        """
+        with self._lock:
+            return {
+                'uptime': round(time.time() - self.started, 3),
+                'syncs': self.syncs,
+                'failures': self.failures,
+                'pending': self.pending,
+                'last_sync': self.last_sync,
+                'last_error': self.last_error,
+                'client': self.client.metrics(),
+            }
+
+
+def start_health_server(metrics, port, host=''):
+    """
+    Serve `/health` and `/metrics` as JSON on a daemon thread
+    Parameters
+    ----------
+    metrics : WatchMetrics
+    port : int
+    Returns
+    -------
+    ThreadingHTTPServer
+    """
+
+    # only needed with --health_port, http.server is slow to import
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # pylint: disable=import-outside-toplevel
+
+    class Handler(BaseHTTPRequestHandler):
+        """Health and metrics handler"""
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            """Answer health and metrics requests"""
+            if self.path == '/health':
+                body = {'status': 'ok'}
+            elif self.path == '/metrics':
+                body = metrics.snapshot()
+            else:
+                self.send_error(404)
+                return
+            payload = codec.dump_bytes(body)
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Content-length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            LOGGER.debug("health endpoint: " + format, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    LOGGER.info("Health endpoint listening on port %s", server.server_address[1])
+    return server
+
+
+def sync_records(records, args, sync_file, metrics):
+    """
+    Run sync_file for each record with a copy of args pointing at it
+    """
+
+    for record in records:
+        record_args = copy.copy(args)
+        record_args.jfilename = record
+        record_args.assoc = association_file(record, args.env) if args.assoc is None else args.assoc
+        LOGGER.info("Syncing %s", record)
+        try:
+            deadline.start(args.deadline)
+            sync_file(record_args)
+        except (Exception, SystemExit) as err:  # pylint: disable=broad-except
+            LOGGER.exception("Sync failed for %s", record)
+            metrics.record(record, err)
+        else:
+            metrics.record(record)
+
+
+def run_watch(args, sync_file, client, stop_event=None):
+    """
+    Watch args.watch and sync changed records until interrupted
+    Parameters
+    ----------
+    args : argparse.Namespace updater arguments
+    sync_file : callable taking per record args, performing one sync
+    client : CmrClient kept warm between events
+    stop_event : threading.Event optional, set to stop watching
+    Returns
+    -------
+    WatchMetrics
+    """
+
+    directory = args.watch
+    watcher = DirectoryWatcher(directory, debounce=args.debounce)
+    metrics = WatchMetrics(client)
+    server = None
+    if args.health_port:
+        server = start_health_server(metrics, args.health_port)
+
+    stop_event = stop_event or threading.Event()
+    LOGGER.info("Watching %s for UMM record changes", directory)
+    try:
+        initial = [path for path in watcher.prime() if is_record(path)]
+        sync_records(sorted(initial), args, sync_file, metrics)
+        while not stop_event.wait(args.watch_interval):
+            changed = watcher.poll()
+            metrics.pending = watcher.pending
+            if changed:
+                LOGGER.info("Detected changes: %s", sorted(changed))
+                sync_records(affected_records(changed, directory, args.env), args, sync_file, metrics)
+    except KeyboardInterrupt:
+        LOGGER.info("Stopping watch mode")
+    finally:
+        if server is not None:
+            server.shutdown()
+    return metrics
@@ -2,48 +2,22 @@
 
 """
 ==============
-token_req.py
+create_assoc.py
 ==============
 
 Helper script for building UMM-S associations
 """
 
-import json
-import logging
-from requests import delete, get, post
+from podaac.umm_common import associations
 
-from podaac.umms_updater.util import svc_update
+get_association = associations.get_association
 
-LOGGER = logging.getLogger(__name__)
 
-
-def get_association(association):
-    """
-    Get list of association concept ids from association file
-    Parameters
-    ----------
-    association : string file with all associations
-    Returns
-    -------
-    List string concept ids in association file
-    """
-
-    concept_ids = []
-    if ".txt" in association:
-        with open(association) as afile:
-            assoc_concept_ids = afile.readlines()
-        for assoc_concept_id in assoc_concept_ids:
-            concept_ids.append(assoc_concept_id.strip('\n'))
-    concept_ids.sort()
-    return concept_ids
-
-
-def current_association(concept_id, url_prefix, header, timeout=30):
+def current_association(concept_id, url_prefix, header, timeout=30, client=None):
     """
     Get list of association concept ids currently in CMR for a service
     Parameters
     ----------
-    cmr_env : string environment of cmr
     concept_id : string concept id of service
     url_prefix : string url prefix
     Returns
@@ -51,19 +25,12 @@ def current_association(concept_id, url_prefix, header, timeout=30):
     List of string with concept id or None
     """
 
-    url = "{}/search/collections.umm_json?service_concept_id={}&page_size=2000".format(url_prefix, concept_id)
-    resp = get(url, headers=header, timeout=timeout)
-    if resp.status_code == 200:
-        resp_json = json.loads(resp.text)
-        concept_ids = []
-        for item in resp_json.get('items'):
-            concept_ids.append(item['meta']['concept-id'])
-        concept_ids.sort()
-        return concept_ids
-    return None
+    return associations.current_association(concept_id, url_prefix, header, 'services',
+                                            timeout=timeout, client=client)
 
 
-def sync_association(cmr_env, concept_id, current_token, association, timeout=30, remove_collection: bool = True):
+def sync_association(cmr_env, concept_id, current_token, association, timeout=30, remove_collection: bool = True,
+                     client=None, journal=None, resume=False, failures=None):
     """
     Synchronize association file with cmr associations
     Parameters
@@ -73,53 +40,20 @@ def sync_association(cmr_env, concept_id, current_token, association, timeout=30
     current_token : string cmr token
     association : string file with all associations
     remove_collection : bool to remove associations from cmr or not during sync
+    journal : AssociationJournal recording completed operations, optional
+    resume : bool trust an unfinished journaled plan instead of querying CMR
+    failures : FailureReport collecting failed operations, optional
     Returns
     -------
     None
     """
 
-    LOGGER.info("Synchronize associations...")
-    url_prefix = svc_update.cmr_environment_url(cmr_env)
-    header = {
-        'Authorization': str(current_token),
-    }
-
-    current = current_association(concept_id, url_prefix, header, timeout=timeout)
-    header["Content-type"] = "application/json"
-
-    if current is None:
-        LOGGER.info("Unable to get associations for concept_id: %s", concept_id)
-        return
-    new = get_association(association)
-
-    if current != new:
-        add = list(set(new) - set(current))
-        remove = list(set(current) - set(new))
-
-        for assoc_concept_id in add:
-            resp = add_association(url_prefix, concept_id, assoc_concept_id, header, timeout=timeout)
-            LOGGER.info("Add Association %s: response status: %s",
-                        assoc_concept_id, resp.status_code)
-            LOGGER.info("Response text from add_associations: %s", resp.text)
-            if resp.status_code != 200:
-                LOGGER.info("Failed add association: concept_id being associated "
-                            "may not be valid: %s", assoc_concept_id)
-
-        LOGGER.info("Allow association removal: %s", remove_collection)
-        if remove_collection:
-            for assoc_concept_id in remove:
-                resp = remove_association(url_prefix, concept_id, assoc_concept_id, header, timeout=timeout)
-                LOGGER.info("Remove Association %s: response status: %s",
-                            assoc_concept_id, resp.status_code)
-                LOGGER.info("Response text from remove_associations: %s", resp.text)
-                if resp.status_code != 200:
-                    LOGGER.info("Failed remove association: concept_id being associated "
-                                "may not be valid: %s", assoc_concept_id)
-    else:
-        LOGGER.info("All association is the same")
-
-
-def add_association(url_prefix, c_id, ac_id, header, timeout=30):
+    associations.sync_association(cmr_env, concept_id, current_token, association, 'services',
+                                  timeout=timeout, remove_collection=remove_collection,
+                                  client=client, journal=journal, resume=resume, failures=failures)
+
+
+def add_association(url_prefix, c_id, ac_id, header, timeout=30, client=None):
     """
     Add associations between
     Parameters
@@ -133,15 +67,11 @@ def add_association(url_prefix, c_id, ac_id, header, timeout=30):
     Request response
     """
 
-    url = url_prefix + f"/search/services/{c_id}/associations"
-    assoc_concept_id_payload = f'[{{"concept_id": "{ac_id}"}}]'
-    assoc_concept_id_payload = assoc_concept_id_payload.replace("\n", "")
-    resp = post(url, json=json.loads(assoc_concept_id_payload),
-                headers=header, timeout=timeout)
-    return resp
+    return associations.add_association(url_prefix, c_id, ac_id, header, 'services',
+                                        timeout=timeout, client=client)
 
 
-def remove_association(url_prefix, c_id, ac_id, header, timeout=30):
+def remove_association(url_prefix, c_id, ac_id, header, timeout=30, client=None):
     """
     Remove associations between
     Parameters
@@ -155,15 +85,11 @@ def remove_association(url_prefix, c_id, ac_id, header, timeout=30):
     Request response
     """
 
-    url = url_prefix + f"/search/services/{c_id}/associations"
-    assoc_concept_id_payload = f'[{{"concept_id": "{ac_id}"}}]'
-    assoc_concept_id_payload = assoc_concept_id_payload.replace("\n", "")
-    resp = delete(url, json=json.loads(assoc_concept_id_payload),
-                  headers=header, timeout=timeout)
-    return resp
+    return associations.remove_association(url_prefix, c_id, ac_id, header, 'services',
+                                           timeout=timeout, client=client)
 
 
-def create_association(cmr_env, concept_id, current_token, association, timeout=30):
+def create_association(cmr_env, concept_id, current_token, association, timeout=30, client=None, failures=None):
     """
     Create associations between
     Parameters
@@ -172,31 +98,11 @@ def create_association(cmr_env, concept_id, current_token, association, timeout=
     concept_id : string
     current_token : string
     association : string
+    failures : FailureReport collecting failed operations, optional
     Returns
     -------
-    JSON object or None
+    None
     """
 
-    header = {
-        'Content-type': "application/json",
-        'Authorization': str(current_token),
-    }
-
-    url_prefix = svc_update.cmr_environment_url(cmr_env)
-
-    if ".txt" in association:
-        with open(association) as afile:
-            assoc_concept_ids = afile.readlines()
-        for i, assoc_concept_id in enumerate(assoc_concept_ids, start=1):
-            req = add_association(url_prefix, concept_id, assoc_concept_id, header, timeout=timeout)
-            LOGGER.info("Association %s: %s, response status: %s",
-                        i, assoc_concept_id, req.status_code)
-            LOGGER.debug("Response text from build_associations: %s", req.text)
-            if req.status_code != 200:
-                LOGGER.info("Failed association: concept_id being associated "
-                            "may not be valid: %s", assoc_concept_id)
-    else:
-        req = add_association(url_prefix, concept_id, association, header, timeout=timeout)
-        LOGGER.info("Association response status: %s", req.status_code)
-        LOGGER.debug("Response text from build_associations: %s", req.text)
-    LOGGER.info("Associations complete")
+    associations.create_association(cmr_env, concept_id, current_token, association, 'services',
+                                    timeout=timeout, client=client, failures=failures)
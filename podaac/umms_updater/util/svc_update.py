@@ -4,16 +4,13 @@ svc_update.py
 ==============
 
 Helper script for calling CMR UMM-S for:
-return current UMM-S profile (getCurrentService)
-create a new or update UMM-S profile (createService)
-remove current UMM-S profile (deleteService)
+return current UMM-S profile (get_current_service)
+create a new or update UMM-S profile (create_service)
+remove current UMM-S profile (delete_service)
 """
 
-import logging
-import backoff
-from requests import put, get, delete, exceptions
-
-LOGGER = logging.getLogger(__name__)
+from podaac.umm_common import engine
+from podaac.umm_common.concepts import SERVICE
 
 
 def cmr_environment_url(env):
@@ -27,20 +24,25 @@ def cmr_environment_url(env):
     -------
     url_prefix : string
     """
-    # CMR OPS (Operations, also known as Production or PROD)
-    if env.lower() == 'ops':
-        url_prefix = "https://cmr.earthdata.nasa.gov"
-    # CMR UAT (User Acceptance Testing)
-    elif env.lower() == 'uat':
-        url_prefix = "https://cmr.uat.earthdata.nasa.gov"
-    else:
-        raise Exception('CMR environment selection not recognized;'
-                        ' Select uat or ops.')
-    return url_prefix
-
-
-@backoff.on_predicate(backoff.fibo, lambda x: x is None, max_tries=10)
-def get_current_service(cmr_env, concept_id, timeout=30):
+    return engine.cmr_environment_url(env)
+
+
+def get_current_service_revision(cmr_env, concept_id, timeout=30, client=None):
+    """
+    Pull current UMM-S profile and its revision-id
+    Parameters
+    ----------
+    cmr_env : string
+    concept_id : string
+
+    Returns
+    -------
+    (JSON object or None, int revision-id or None)
+    """
+    return engine.get_current_revision(SERVICE, cmr_env, concept_id, timeout=timeout, client=client)
+
+
+def get_current_service(cmr_env, concept_id, timeout=30, client=None):
     """
     Pull current UMM-S profile
     Parameters
@@ -52,28 +54,13 @@ def get_current_service(cmr_env, concept_id, timeout=30):
     -------
     JSON object or None
     """
+    return engine.get_current(SERVICE, cmr_env, concept_id, timeout=timeout, client=client)
+
 
-    url_prefix = cmr_environment_url(cmr_env)
-    try:
-        req = get(url_prefix + f"/search/"
-                  f"services.umm_json"
-                  f"?concept_id={concept_id}&pretty=true", timeout=timeout)
-        LOGGER.debug("Response text from get_current_service: %s", req.text)
-        current_umms = req.json()
-    except exceptions.HTTPError as err:
-        raise SystemExit(err) from err
-    try:
-        current_umms = current_umms['items'][0]['umm']
-    except (IndexError, KeyError) as inderr:
-        LOGGER.debug("%s, CMR has no service with a UMM-S record containing "
-                     "this concept_id, one will be created.", inderr)
-        current_umms = None
-    return current_umms
-
-
-def create_service(cmr_env, local_umms, provider, native_id, header, timeout=30):
+def create_service(cmr_env, local_umms, provider, native_id, header, timeout=30, client=None,
+                   revision_id=None):
     """
-    Creates new UMM-S Service and returns confirmation xml
+    Creates new or updates an existing UMM-S record
     Parameters
     ----------
     cmr_env : string
@@ -81,31 +68,20 @@ def create_service(cmr_env, local_umms, provider, native_id, header, timeout=30)
     provider : string
     native_id : string
     header : json object
+    revision_id : int revision the update must become, checked by CMR
+                  (RevisionConflict on mismatch), optional
 
     Returns
     -------
-    XML
+    Request response
     """
+    return engine.create_record(SERVICE, cmr_env, local_umms, provider, native_id, header, timeout=timeout,
+                                client=client, revision_id=revision_id)
 
-    url_prefix = cmr_environment_url(cmr_env)
-    LOGGER.debug("Environment url-prefix"
-                 " used to create_service: %s", url_prefix)
-    url = url_prefix + f"/ingest/providers/" \
-                       f"{provider}/services/{native_id}"
-    LOGGER.debug("URL used to create_service: %s", url)
-    try:
-        req = put(url, json=local_umms, headers=header, timeout=timeout)
-        LOGGER.info("Response from create_service: %s", req.text)
-        req.raise_for_status()
-    except exceptions.HTTPError as err:
-        LOGGER.exception("Error creating service")
-        raise SystemExit(err) from err
-    return req
-
-
-def delete_service(cmr_env, provider, native_id, header, timeout=30):
+
+def delete_service(cmr_env, provider, native_id, header, timeout=30, client=None):
     """
-    Deletes existing UMM-S Service and returns confirmation xml
+    Deletes existing UMM-S record
     Parameters
     ----------
     cmr_env : string
@@ -115,19 +91,6 @@ def delete_service(cmr_env, provider, native_id, header, timeout=30):
 
     Returns
     -------
-    XML
+    Request response
     """
-
-    url_prefix = cmr_environment_url(cmr_env)
-    LOGGER.debug("Environment url-prefix used to delete_service: %s",
-                 url_prefix)
-    url = url_prefix + f"/ingest/providers/" \
-                       f"{provider}/services/{native_id}"
-    LOGGER.info("URL used to delete_service: %s", url)
-    try:
-        req = delete(url, headers=header, timeout=timeout)
-        LOGGER.info("Response from delete_service: %s", req.text)
-        req.raise_for_status()
-    except exceptions.HTTPError as err:
-        LOGGER.exception("Error deleting service")
-        raise SystemExit(err) from err
+    return engine.delete_record(SERVICE, cmr_env, provider, native_id, header, timeout=timeout, client=client)
@@ -1,4 +1,4 @@
-# pylint: disable=import-error, too-many-locals
+# pylint: disable=import-error, import-outside-toplevel
 
 """
 ==============
@@ -12,19 +12,13 @@ See usage information by running ummt_updater.py -h
 
 python ummt_updater.py
 -f netcdf_cmr_umm_t.json -p POCLOUD -e uat -cu cmr_user -cp cmr_pass
-"""
 
-import re
-import json
-import logging
-import argparse
-import time
-import backoff
-import requests
+The engine (and with it requests) is imported inside the functions so
+that argument parsing does not pay for it.
+"""
 
-from podaac.ummt_updater.util import tool_update
-from podaac.ummt_updater.util import token_req
-from podaac.ummt_updater.util import create_assoc
+from podaac.umm_common import cli
+from podaac.umm_common.concepts import TOOL
 
 
 def parse_args():
@@ -34,85 +28,7 @@ def parse_args():
     -------
     args
     """
-
-    parser = argparse.ArgumentParser(
-        description='Update CMR with latest profile',
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter
-    )
-
-    parser.add_argument('-f', '--jfilename',
-                        help='UMM-T file: '
-                             'JSON file containing UMM-T profile'
-                             'schema to be submitted to CMR for'
-                             ' creation or update.',
-                        required=True,
-                        metavar='filename.json')
-
-    parser.add_argument('-p', '--provider',
-                        help='A provider ID identifies a provider and is'
-                             'composed of a combination of upper case'
-                             ' letters, digits, and underscores.'
-                             'The maximum length is 10 characters.'
-                             'Concept ID is provided if UMM-T record already'
-                             'exists and needs to be updated.',
-                        required=True,
-                        default='POCLOUD',
-                        metavar='POCLOUD')
-
-    parser.add_argument('-e', '--env',
-                        help='CMR environment used to request token '
-                             'and pull results from.',
-                        required=True,
-                        metavar='uat or ops')
-
-    parser.add_argument('-cu', '--cmr_user',
-                        help='CMR Username to be used to request token.',
-                        required=False,
-                        metavar='ssm.get_parameter, '
-                                'parameter["Parameter"]["urs_user"]')
-
-    parser.add_argument('-cp', '--cmr_pass',
-                        help='CMR Username to be used to request token.',
-                        required=False,
-                        metavar='ssm.get_parameter, '
-                                'parameter["Parameter"]["urs_password"]')
-
-    parser.add_argument('-t', '--token',
-                        help='CMR UMM token string.',
-                        default=None,
-                        required=False,
-                        metavar='Launchpad token or EDL token')
-
-    parser.add_argument('-d', '--debug', action='store_true',
-                        help='Set logging to debug',
-                        required=False)
-
-    parser.add_argument('-a', '--assoc',
-                        help='Association concept ID or file containing'
-                             ' many concept IDs to be associated'
-                             ' with UMM-T provided.',
-                        required=False,
-                        default=None,
-                        metavar='associations.txt')
-
-    parser.add_argument('-to', '--timeout',
-                        help='Set timeout on requests',
-                        required=False, type=int,
-                        default=30)
-
-    parser.add_argument('-r', '--disable_removal', action='store_false',
-                        help='Disable CMR association removal during sync event',
-                        required=False)
-
-    parser.add_argument('-uv', '--umm_version',
-                        help='umm version were trying to update',
-                        required=False,
-                        default="1.0")
-
-    args = parser.parse_args()
-    if not args.token and not (args.cmr_pass and args.cmr_user):
-        parser.error('No credentials provided, add -t or -cu and -cp')
-    return args
+    return cli.parse_args(TOOL)
 
 
 def create_native_id(provider, ummt_json):
@@ -128,17 +44,11 @@ def create_native_id(provider, ummt_json):
     -------
     new_nid : string
     """
-    def snake_case(tool_name):
-        tool_name_ns = re.sub(r"\s+", '_', tool_name)
-        return tool_name_ns.lower()
-    # noinspection PyUnresolvedReferences
-    tool_name = ummt_json['Name']
-    new_nid = provider + "_" + snake_case(tool_name)
-    return new_nid
+    from podaac.umm_common import engine
+    return engine.create_native_id(provider, ummt_json)
 
 
-@backoff.on_predicate(backoff.fibo, lambda x: x is None, max_tries=10)
-def pull_concept_id(cmr_env, provider, native_id, timeout=30):
+def pull_concept_id(cmr_env, provider, native_id, timeout=30, client=None):
     """
     Uses constructed native_id, cmr environment and provider string to
     pull concept_id for UMM-T record on CMR.
@@ -148,33 +58,16 @@ def pull_concept_id(cmr_env, provider, native_id, timeout=30):
     cmr_env : string
     provider : string
     native_id : string
+    client : CmrClient caching concept_ids between calls
 
     Returns
     -------
+    string concept_id or None
     """
+    from podaac.umm_common import engine
+    return engine.pull_concept_id(TOOL, cmr_env, provider, native_id, timeout=timeout, client=client)
 
-    url_prefix = tool_update.cmr_environment_url(cmr_env)
-    url = url_prefix + f"/search/tools.json" \
-                       f"?provider={provider}&native_id={native_id}"
-    req = requests.get(url, timeout=timeout)
-    tool = json.loads(req.text)
-
-    if tool['hits'] == 1:
-        for svc in tool['items']:
-            concept_id = svc['concept_id']
-            return concept_id
-    elif tool['hits'] > 1:
-        raise Exception('Provider and Native ID are not unique, '
-                        'more than 1 tool returned.')
-    else:
-        # No concept-id exists, UMM-T record does not exist within CMR
-        return None
 
-
-LOGGER = logging.getLogger(__name__)
-
-
-# pylint: disable=too-many-statements
 def main(args):
     """
     Perfoms update to cmr and logs profile update.
@@ -186,115 +79,44 @@ def main(args):
     Returns
     -------
     """
+    from podaac.umm_common import engine
+    engine.main(args, TOOL)
 
-    if args.debug is True:
-        service_log_level = logging.DEBUG
-    else:
-        service_log_level = logging.INFO
-    logging.basicConfig(level=service_log_level)
-    logger = logging.getLogger('podaac')
-    logger.setLevel(level=service_log_level)
-    logging.info("Starting UMM-T update")
-
-    if args.token is None:
-        current_token = token_req.token(args.env, args.cmr_user, args.cmr_pass)
-    else:
-        current_token = args.token
-
-    provider = args.provider
-    umm_version = args.umm_version
-    if not umm_version:
-        umm_version = '1.0'
 
-    header = {
-        'Content-type': f'application/vnd.nasa.cmr.umm+json;version={umm_version}',
-        'Authorization': str(current_token),
-    }
-
-    with open(args.jfilename) as json_file:
-        local_ummt = json.load(json_file)
-
-        # construct native local_ummt
-        native_id = create_native_id(provider, local_ummt)
-        logging.info("native_id: %s", native_id)
-
-        concept_id = pull_concept_id(args.env, provider, native_id, timeout=args.timeout)
-
-        if concept_id is None:
-
-            logging.info("No CMR profile found. Creating new UMM-T record...")
-
-            tool_update.create_tool(
-                args.env, local_ummt, provider, native_id, header, timeout=args.timeout
-            )
-            new_concept_id = pull_concept_id(args.env, provider, native_id, timeout=args.timeout)
-
-            logging.info("concept_id: %s", concept_id)
-            logging.info("New CMR UMM-T Profile:")
-
-            updated_ummt = tool_update.get_current_tool(
-                args.env, new_concept_id, timeout=args.timeout
-            )
-
-            logging.info(json.dumps(
-                updated_ummt,
-                sort_keys=True,
-                indent=4,
-            ))
-
-            # check for associations to be made with UMM-T profile
-            if args.assoc is not None:
-                create_assoc.create_association(
-                    args.env, new_concept_id, current_token, args.assoc, timeout=args.timeout
-                )
-        else:
-            logging.info("concept_id: %s", concept_id)
+def update_record(args, client=None):
+    """
+    Create or update the UMM-T record in args.jfilename and
+    synchronize its associations.
 
-            # Display current CMR UMM-T profile
-            current_ummt = tool_update.get_current_tool(args.env, concept_id, timeout=args.timeout)
-            logging.info("CMR UMM-T Profile:")
-            logging.info(json.dumps(
-                current_ummt,
-                sort_keys=True,
-                indent=4,
-            ))
-            # Display local UMM-T profile
-            logging.info("Local UMM-T Profile:")
-            logging.info(json.dumps(
-                local_ummt,
-                sort_keys=True,
-                indent=4,
-            ))
-            # Compare CMR UMM-T to locally maintained UMM-T profile
-            if sorted(current_ummt.items()) == sorted(local_ummt.items()):
-                logging.info("CMR and local profiles match, no update needed.")
-                if args.assoc is not None:
-                    create_assoc.sync_association(args.env, concept_id, current_token, args.assoc, timeout=args.timeout, remove_collection=args.disable_removal)
-            else:
-                logging.info("Updating CMR UMM-T profile...")
+    Parameters
+    ----------
+    args Arguments passed to the program
+    client : CmrClient reused between records
+    Returns
+    -------
+    UpdateResult
+    """
+    from podaac.umm_common import engine
+    return engine.update_record(args, TOOL, client=client)
 
-                tool_update.create_tool(
-                    args.env, local_ummt, provider, native_id, header, timeout=args.timeout
-                )
-                logging.info("Updated CMR Profile:")
 
-                # Need to sleep 10 seconds so there is time for the cmr to update.
-                time.sleep(10)
-                updated_ummt = tool_update.get_current_tool(
-                    args.env, concept_id, timeout=args.timeout
-                )
+def record_api():
+    """
+    UMM-T functions used by the shared update pipeline
+    Returns
+    -------
+    RecordApi
+    """
+    from podaac.umm_common import engine
+    return engine.record_api(TOOL)
 
-                logging.info(json.dumps(
-                    updated_ummt,
-                    sort_keys=True,
-                    indent=4,
-                ))
 
-                # check for associations to be made with UMM-T profile
-                if args.assoc is not None:
-                    create_assoc.sync_association(
-                        args.env, concept_id, current_token, args.assoc, timeout=args.timeout, remove_collection=args.disable_removal
-                    )
+def __getattr__(name):
+    """ToolUpdater is loaded on first use, see podaac.umm_common.updater"""
+    if name == 'ToolUpdater':
+        from podaac.umm_common import updater
+        return updater.ToolUpdater
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def run():
@@ -0,0 +1,90 @@
+"""
+==============
+bench_codec.py
+==============
+
+Benchmark of the JSON codec on CMR sized payloads: a full
+collections.umm_json page (2000 items) and the pretty dumps of its
+profiles, against the standard library path it replaced (decoding the
+body to text, then json.loads, and json.dumps(indent=4, sort_keys=True)
+for the logged profiles). Not collected by pytest, run it with
+
+    poetry run python tests/bench_codec.py
+"""
+import json
+import time
+
+import requests
+
+from podaac.umm_common import codec
+
+REPEAT = 5
+
+
+def collection(index):
+    concept_id = f'C{1200000000 + index}-POCLOUD'
+    return {
+        'meta': {
+            'concept-id': concept_id, 'revision-id': index % 7 + 1, 'native-id': f'MODIS_A-JPL-L2P-v{index}',
+            'provider-id': 'POCLOUD', 'format': 'application/vnd.nasa.cmr.umm+json',
+            'revision-date': '2024-03-01T12:00:00.000Z', 's3-links': [f's3://podaac-ops-cumulus-protected/{index}/'],
+            'associations': {'services': [f'S{1200000000 + n}-POCLOUD' for n in range(3)],
+                             'tools': ['T1200000001-POCLOUD']},
+        },
+        'umm': {
+            'ShortName': f'MODIS_A-JPL-L2P-v{index}', 'Version': '2019.0',
+            'EntryTitle': f'GHRSST Level 2P Global Sea Surface Skin Temperature from MODIS Aqua {index}',
+            'Abstract': 'Sea surface temperature (SST) retrievals from the Moderate Resolution Imaging '
+                        'Spectroradiometer on the Aqua satellite, température de surface – ' * 6,
+            'DOI': {'DOI': f'10.5067/GHMDA-2PJ{index:02d}'},
+            'TemporalExtents': [{'RangeDateTimes': [{'BeginningDateTime': '2002-07-04T00:00:00.000Z'}],
+                                 'EndsAtPresentFlag': True}],
+            'SpatialExtent': {'HorizontalSpatialDomain': {'Geometry': {
+                'CoordinateSystem': 'CARTESIAN',
+                'BoundingRectangles': [{'WestBoundingCoordinate': -180.0, 'EastBoundingCoordinate': 180.0,
+                                        'NorthBoundingCoordinate': 90.0, 'SouthBoundingCoordinate': -90.0}]}}},
+            'ScienceKeywords': [{'Category': 'EARTH SCIENCE', 'Topic': 'OCEANS', 'Term': 'OCEAN TEMPERATURE',
+                                 'VariableLevel1': f'SEA SURFACE TEMPERATURE {n}'} for n in range(4)],
+            'RelatedUrls': [{'URL': f'https://archive.podaac.earthdata.nasa.gov/{index}/{n}.nc',
+                             'Type': 'GET DATA', 'Description': 'Granule download'} for n in range(10)],
+            'Platforms': [{'ShortName': 'Aqua', 'Instruments': [{'ShortName': 'MODIS'}]}],
+        },
+    }
+
+
+def search_page():
+    return {'hits': 2000, 'took': 112, 'items': [collection(index) for index in range(2000)]}
+
+
+def response(body):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp._content = body  # pylint: disable=protected-access
+    resp.headers['Content-Type'] = 'application/json;charset=utf-8'
+    return resp
+
+
+def best(func):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    page = search_page()
+    resp = response(json.dumps(page).encode())
+    # what the modules did before: decode the body to text, then parse it
+    baseline_parse = best(lambda: json.loads(resp.text))
+    parse = best(lambda: codec.response_json(resp))
+    baseline_dump = best(lambda: [json.dumps(item['umm'], sort_keys=True, indent=4) for item in page['items']])
+    dump = best(lambda: [codec.dumps(item['umm'], pretty=True, sort_keys=True) for item in page['items']])
+    print(f"codec {codec.BACKEND}: parse {len(resp.content) / 1e6:.1f} MB page {parse * 1e3:.1f} ms "
+          f"(json {baseline_parse * 1e3:.1f} ms), pretty dump of 2000 profiles {dump * 1e3:.1f} ms "
+          f"(json {baseline_dump * 1e3:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+==============
+fake_cmr.py
+==============
+
+In-memory stand-in for the CMR search, ingest and association
+endpoints used by the behavior tests, mounted on the session of a
+CmrClient as its transport.
+"""
+import json
+import re
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+
+from podaac.umm_common.client import CmrClient
+
+CMR_UAT = 'https://cmr.uat.earthdata.nasa.gov'
+KINDS = {'services': 'S', 'tools': 'T', 'variables': 'V'}
+CONCEPT_PARAMS = ('service_concept_id', 'tool_concept_id', 'variable_concept_id')
+
+
+class FakeCmr(BaseAdapter):
+    """
+    Records, revisions, collections and associations of one provider
+
+    records : native_id -> {'kind', 'concept_id', 'revisions': [umm or None for a deletion]}
+    collections : concept_id -> {'ShortName', 'Version', 'EntryTitle'}
+    associations : record concept_id -> set of collection concept ids
+    fail : list of [method, url regex, status] answered instead of the endpoint,
+           or [method, url regex, status, times] for the first times matches only
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = {}
+        self.collections = {}
+        self.associations = {}
+        self.fail = []
+        self.calls = []
+
+    # state helpers
+
+    def add_record(self, kind, native_id, umm, associations=()):
+        """Add a record with one revision, returning its concept id"""
+        concept_id = f"{KINDS[kind]}{len(self.records) + 1}-POCLOUD"
+        self.records[native_id] = {'kind': kind, 'concept_id': concept_id, 'revisions': [umm]}
+        self.associations[concept_id] = set(associations)
+        return concept_id
+
+    def add_collection(self, concept_id, short_name, version='1', entry_title=None):
+        self.collections[concept_id] = {'ShortName': short_name, 'Version': version,
+                                        'EntryTitle': entry_title or f'{short_name} v{version}'}
+
+    def record(self, native_id):
+        """(concept_id, revision, umm) of a live record or None"""
+        record = self.records.get(native_id)
+        if record is None or record['revisions'][-1] is None:
+            return None
+        return record['concept_id'], len(record['revisions']), record['revisions'][-1]
+
+    def requests(self, method=None, pattern=''):
+        return [(m, url) for m, url in self.calls if (method is None or m == method) and re.search(pattern, url)]
+
+    # transport
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        self.calls.append((request.method, request.url))
+        for rule in self.fail:
+            method, pattern, status = rule[:3]
+            if method == request.method and re.search(pattern, request.url):
+                if len(rule) > 3:
+                    if not rule[3]:
+                        continue
+                    rule[3] -= 1
+                return self._response(request, status, {'errors': ['injected failure']})
+        path = urlparse(request.url).path
+        query = parse_qs(urlparse(request.url).query)
+        body = request.body.decode() if isinstance(request.body, bytes) else request.body
+        for regex, handler in (
+                (r'^/search/(services|tools|variables)\.(json|umm_json)$', self._search_records),
+                (r'^/search/collections\.(json|umm_json)$', self._search_collections),
+                (r'^/ingest/providers/[^/]+/collections/([^/]+)/(variables)/(.+)$', self._ingest_under_collection),
+                (r'^/ingest/providers/[^/]+/(services|tools|variables)/(.+)$', self._ingest),
+                (r'^/search/(services|tools|variables)/([^/]+)/associations$', self._associate),
+                (r'^/legacy-services/rest/tokens$', self._token)):
+            match = re.match(regex, path)
+            if match:
+                status, payload = handler(request, match, query, body)
+                return self._response(request, status, payload)
+        raise requests.exceptions.ConnectionError(f'unexpected request {request.method} {request.url}')
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _response(request, status, payload):
+        resp = requests.Response()
+        resp.status_code = status
+        resp._content = json.dumps(payload).encode()  # pylint: disable=protected-access
+        resp.headers['Content-Type'] = 'application/json'
+        resp.url = request.url
+        resp.request = request
+        return resp
+
+    def _search_records(self, _request, match, query, _body):
+        kind, fmt = match.groups()
+        items = []
+        for native_id, record in self.records.items():
+            if record['kind'] != kind:
+                continue
+            if 'native_id' in query and query['native_id'][0] != native_id:
+                continue
+            if 'concept_id' in query and query['concept_id'][0] != record['concept_id']:
+                continue
+            revisions = list(enumerate(record['revisions'], start=1))
+            if 'all_revisions' not in query:
+                revisions = revisions[-1:] if revisions[-1][1] is not None else []
+            for revision, umm in revisions:
+                items.append(self._record_item(native_id, record, revision, umm, fmt))
+        return 200, {'hits': len(items), 'items': items}
+
+    def _record_item(self, native_id, record, revision, umm, fmt):
+        if fmt == 'json':
+            return {'concept_id': record['concept_id'], 'native_id': native_id, 'revision_id': revision,
+                    'provider_id': 'POCLOUD', 'name': (umm or {}).get('Name')}
+        meta = {'concept-id': record['concept_id'], 'native-id': native_id, 'revision-id': revision,
+                'provider-id': 'POCLOUD', 'deleted': umm is None}
+        associated = sorted(self.associations.get(record['concept_id'], ()))
+        if associated:
+            # concept ids under associations, the details under association-details, as CMR returns them
+            meta['associations'] = {'collections': associated}
+            meta['association-details'] = {'collections': [{'concept-id': cid} for cid in associated]}
+        return {'meta': meta, 'umm': umm}
+
+    def _search_collections(self, _request, match, query, _body):
+        fmt = match.group(1)
+        ids = sorted(self.collections)
+        for param in CONCEPT_PARAMS:
+            if param in query:
+                ids = sorted(self.associations.get(query[param][0], ()))
+        if 'short_name[]' in query:
+            names = {name.lower() for name in query['short_name[]']}
+            ids = [cid for cid in ids if self.collections[cid]['ShortName'].lower() in names]
+        if 'entry_title[]' in query:
+            titles = {title.lower() for title in query['entry_title[]']}
+            ids = [cid for cid in ids if self.collections[cid]['EntryTitle'].lower() in titles]
+        if fmt == 'json':
+            entries = [{'id': cid, 'short_name': self.collections.get(cid, {}).get('ShortName'),
+                        'version_id': self.collections.get(cid, {}).get('Version'),
+                        'title': self.collections.get(cid, {}).get('EntryTitle')} for cid in ids]
+            return 200, {'feed': {'entry': entries}}
+        items = [{'meta': {'concept-id': cid}, 'umm': self.collections.get(cid, {})} for cid in ids]
+        return 200, {'hits': len(items), 'items': items}
+
+    def _ingest_under_collection(self, request, match, _query, body):
+        collection, kind, native_id = match.groups()
+        status, payload = self._write(request, kind, native_id, body)
+        if status == 201:
+            # the collection scoped ingest associates the record with its collection
+            self.associations[payload['concept-id']] = {collection}
+        return status, payload
+
+    def _ingest(self, request, match, _query, body):
+        kind, native_id = match.groups()
+        if kind == 'variables' and request.method == 'PUT':
+            return 400, {'errors': ['Variables can only be ingested under their collection']}
+        return self._write(request, kind, native_id, body)
+
+    def _write(self, request, kind, native_id, body):
+        record = self.records.get(native_id)
+        if request.method == 'DELETE':
+            if record is None or record['revisions'][-1] is None:
+                return 404, {'errors': [f'Concept with native-id [{native_id}] could not be found.']}
+            record['revisions'].append(None)
+            return 200, {'concept-id': record['concept_id'], 'revision-id': len(record['revisions'])}
+        umm = json.loads(body)
+        expected = request.headers.get('Cmr-Revision-Id')
+        if record is None:
+            self.add_record(kind, native_id, umm)
+            record = self.records[native_id]
+        else:
+            if expected is not None and int(expected) <= len(record['revisions']):
+                return 409, {'errors': [f"Expected revision-id of [{len(record['revisions']) + 1}] "
+                                        f"got [{expected}]"]}
+            record['revisions'].append(umm)
+        return 201, {'concept-id': record['concept_id'], 'revision-id': len(record['revisions'])}
+
+    def _associate(self, request, match, _query, body):
+        concept_id = match.group(2)
+        associated = self.associations.setdefault(concept_id, set())
+        for item in json.loads(body):
+            if request.method == 'POST':
+                associated.add(item['concept_id'])
+            else:
+                associated.discard(item['concept_id'])
+        return 200, [{'status': 'ok'}]
+
+    @staticmethod
+    def _token(_request, _match, _query, _body):
+        return 200, {'token': {'id': 'TOKEN'}}
+
+
+def fake_client(cmr=None, **kwargs):
+    """CmrClient sending its requests to cmr, a new FakeCmr by default"""
+    client = CmrClient(**kwargs)
+    client.session.mount('https://', cmr if cmr is not None else FakeCmr())
+    return client
+
+
+def no_backoff_waits():
+    """Patch out the sleeps of backoff retry loops, e.g. the lookup of a record not yet in CMR"""
+    return mock.patch('backoff._sync.time.sleep')
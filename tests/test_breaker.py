@@ -0,0 +1,101 @@
+"""
+==============
+test_breaker.py
+==============
+
+Circuit breaker state transitions, and the shared client failing
+fast while the circuit is open.
+"""
+import unittest
+from unittest import mock
+
+from fake_cmr import CMR_UAT, FakeCmr, fake_client
+
+from podaac.umm_common import breaker
+from podaac.umm_common.breaker import CircuitBreaker, CircuitOpen
+
+URL = CMR_UAT + '/search/services.json?provider=POCLOUD'
+
+
+class Clock:
+    """Stand-in for time.monotonic advanced by the test"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(breaker.time, 'monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.circuit = CircuitBreaker(error_rate=0.5, window=4, min_requests=4, cooldown=30)
+
+    def outcomes(self, *statuses, elapsed=0.1):
+        for status in statuses:
+            self.circuit.before(URL)
+            self.circuit.record(status, elapsed)
+
+    def test_opens_on_error_rate(self):
+        self.outcomes(200, 503, 200)
+        self.assertEqual(self.circuit.state, breaker.CLOSED)
+        # 404 is not a CMR failure
+        self.outcomes(404)
+        self.assertEqual(self.circuit.state, breaker.CLOSED)
+        self.outcomes(None)
+        self.assertEqual(self.circuit.state, breaker.OPEN)
+        self.assertTrue(self.circuit.is_open())
+        with self.assertRaises(CircuitOpen):
+            self.circuit.before(URL)
+        self.assertEqual(self.circuit.metrics(), {'trips': 1, 'short_circuited': 1, 'state': breaker.OPEN})
+
+    def test_slow_calls_count_as_failures(self):
+        self.circuit.slow_call = 2.0
+        self.outcomes(200, 200, elapsed=5.0)
+        self.outcomes(200, 200)
+        self.assertEqual(self.circuit.state, breaker.OPEN)
+
+    def test_half_open_probe(self):
+        self.outcomes(503, 503, 503, 503)
+        self.clock.now += 30
+        self.assertFalse(self.circuit.is_open())
+        # one probe is admitted, other requests keep failing fast until it finishes
+        self.circuit.before(URL)
+        self.assertEqual(self.circuit.state, breaker.HALF_OPEN)
+        with self.assertRaises(CircuitOpen):
+            self.circuit.before(URL)
+        self.circuit.record(200, 0.1)
+        self.assertEqual(self.circuit.state, breaker.CLOSED)
+        # the window starts over after recovering
+        self.outcomes(503, 503, 503)
+        self.assertEqual(self.circuit.state, breaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        self.outcomes(503, 503, 503, 503)
+        self.clock.now += 30
+        self.outcomes(502)
+        self.assertEqual(self.circuit.state, breaker.OPEN)
+        self.assertEqual(self.circuit.metrics()['trips'], 2)
+        self.clock.now += 29
+        with self.assertRaises(CircuitOpen):
+            self.circuit.before(URL)
+
+    def test_client_fails_fast(self):
+        cmr = FakeCmr()
+        cmr.fail.append(['GET', 'services', 503])
+        client = fake_client(cmr, breaker=self.circuit)
+        for _ in range(4):
+            self.assertEqual(client.get(URL).status_code, 503)
+        with self.assertRaises(CircuitOpen):
+            client.get(URL)
+        self.assertEqual(len(cmr.calls), 4)
+        self.assertEqual(client.metrics()['breaker']['short_circuited'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+==============
+test_cassette.py
+==============
+
+Replay recorded CMR interactions of the update paths and check the
+requests sent, and with UMM_TIMING_TESTS=1 the wall time against a
+budget.
+
+The cassettes in tests/cassettes were recorded with --record_cassette
+for tests/cassettes/umm-s.json and uat_associations.txt. Budgets hold
+for replay at the recorded latency; set UMM_REPLAY_LATENCY to replay
+faster or slower, the budgets scale with it.
+"""
+import collections
+import json
+import os
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from podaac.umm_common import cassette, cli, engine, pipeline
+from podaac.umm_common.client import client_from_args
+from podaac.umm_common.concepts import SERVICE
+
+CASSETTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes')
+CMR_UAT = 'https://cmr.uat.earthdata.nasa.gov'
+TIMING = os.environ.get('UMM_TIMING_TESTS') == '1'
+# without the timing checks nothing needs the recorded latency
+LATENCY = float(os.environ.get('UMM_REPLAY_LATENCY', '1.0' if TIMING else '0'))
+# seconds at the recorded latency; the phases overlap so each is below the sum of the latencies
+BUDGETS = {'update': 0.75, 'unchanged': 0.3, 'associations': 0.45}
+
+
+def replay(name):
+    args = cli.parse_args(SERVICE, [
+        '-f', os.path.join(CASSETTES, 'umm-s.json'), '-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN',
+        '-a', os.path.join(CASSETTES, 'uat_associations.txt'),
+        '--replay_cassette', os.path.join(CASSETTES, name + '.json'), '--replay_latency', str(LATENCY),
+    ])
+    client = client_from_args(args)
+    adapter = client.session.get_adapter(CMR_UAT)
+    start = time.monotonic()
+    with mock.patch.object(pipeline, 'READINESS_WAIT', 0):
+        result = engine.update_record(args, SERVICE, client)
+    elapsed = time.monotonic() - start
+    client.close()
+    return result, adapter, elapsed
+
+
+def methods(adapter):
+    return dict(collections.Counter(interaction['request']['method'] for interaction in adapter.interactions))
+
+
+class TestCassetteReplay(unittest.TestCase):
+
+    def check_budget(self, name, elapsed):
+        if not TIMING:
+            return
+        self.assertLess(elapsed, BUDGETS[name] * LATENCY + 0.1, f'{name} took {elapsed:.3f}s')
+
+    def test_update(self):
+        result, adapter, elapsed = replay('update')
+        self.assertTrue(result.ok)
+        self.assertTrue(result.updated)
+        self.assertEqual(result.revision_id, 8)
+        self.assertEqual(result.associations_added, ['C3-POCLOUD'])
+        self.assertEqual(result.discrepancies, [])
+        self.assertEqual(result.associations_removed, ['C1-POCLOUD'])
+        self.assertEqual(methods(adapter), {'GET': 5, 'POST': 1, 'DELETE': 1, 'PUT': 1})
+        self.assertEqual(adapter.remaining(), [])
+        self.check_budget('update', elapsed)
+
+    def test_unchanged(self):
+        result, adapter, elapsed = replay('unchanged')
+        self.assertTrue(result.ok)
+        self.assertFalse(result.updated)
+        self.assertEqual(methods(adapter), {'GET': 4})
+        self.assertEqual(adapter.remaining(), [])
+        self.check_budget('unchanged', elapsed)
+
+    def test_associations_only(self):
+        result, adapter, elapsed = replay('associations')
+        self.assertFalse(result.updated)
+        self.assertEqual(result.associations_removed, ['C9-POCLOUD'])
+        self.assertEqual(methods(adapter), {'GET': 4, 'DELETE': 1})
+        self.assertEqual(adapter.remaining(), [])
+        self.check_budget('associations', elapsed)
+
+    def test_unrecorded_request(self):
+        session = requests.Session()
+        cassette.mount(session, os.path.join(CASSETTES, 'unchanged.json'), 'replay', latency_scale=0)
+        with self.assertRaises(cassette.CassetteError):
+            session.get(CMR_UAT + '/search/tools.json?provider=POCLOUD')
+
+    def test_token_redacted(self):
+        body = json.dumps({'token': {'username': 'user', 'password': 'secret', 'client_id': 'client'}})
+        stored = json.loads(cassette._body(body, CMR_UAT + '/legacy-services/rest/tokens'))
+        self.assertEqual(stored['token']['password'], cassette.REDACTED)
+        self.assertEqual(stored['token']['username'], cassette.REDACTED)
+        self.assertEqual(stored['token']['client_id'], 'client')
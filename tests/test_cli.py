@@ -0,0 +1,43 @@
+"""
+==============
+test_cli.py
+==============
+
+Argument parsing: run modes are mutually exclusive.
+"""
+import contextlib
+import io
+import unittest
+
+from podaac.umm_common import cli
+from podaac.umm_common.concepts import SERVICE
+
+BASE = ['-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN']
+
+
+def parse(*argv):
+    return cli.parse_args(SERVICE, BASE + list(argv))
+
+
+class TestCli(unittest.TestCase):
+
+    def assert_rejected(self, *argv):
+        with contextlib.redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit):
+            parse(*argv)
+        return err.getvalue()
+
+    def test_single_mode(self):
+        self.assertEqual(parse('--sweep', 'cmr/').sweep, 'cmr/')
+        self.assertEqual(parse('--decommission', 'POCLOUD_old_*', '--decommission_file', 'old.txt').decommission,
+                         ['POCLOUD_old_*'])
+        self.assertTrue(parse('-f', 'cmr.json', '--rollback', '--snapshot_dir', 'snapshots/').rollback)
+
+    def test_modes_exclusive(self):
+        self.assertIn('not allowed with argument', self.assert_rejected('--sweep', 'cmr/', '-w', 'cmr/'))
+        self.assert_rejected('-f', 'cmr.json', '--rollback', '--compare', 'ops')
+        self.assert_rejected('--decommission', 'POCLOUD_old', '--retry_failures', 'failures.json')
+        self.assertIn('--decommission_file', self.assert_rejected('--decommission_file', 'old.txt', '--sweep', 'cmr/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+==============
+test_codec.py
+==============
+
+JSON codec round trips on CMR sized payloads: a full
+collections.umm_json page (2000 items) and the profile of
+tests/cassettes/umm-s.json. The timings are in tests/bench_codec.py.
+"""
+import json
+import os
+import unittest
+
+from bench_codec import response, search_page
+
+from podaac.umm_common import codec
+
+CASSETTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes')
+
+
+class TestCodec(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.page = search_page()
+        cls.page_bytes = json.dumps(cls.page).encode()
+        with open(os.path.join(CASSETTES, 'umm-s.json')) as profile_file:
+            cls.profile = json.load(profile_file)
+
+    def test_round_trip(self):
+        self.assertEqual(codec.loads(self.page_bytes), self.page)
+        self.assertEqual(codec.loads(self.page_bytes.decode()), self.page)
+        self.assertEqual(codec.response_json(response(self.page_bytes)), self.page)
+        self.assertEqual(codec.loads(codec.dump_bytes(self.profile)), self.profile)
+        pretty = codec.dumps(self.profile, pretty=True, sort_keys=True)
+        self.assertEqual(json.loads(pretty), self.profile)
+        self.assertIn('\n', pretty)
+        self.assertEqual(codec.dumps({1: 'a'}), '{"1":"a"}' if codec.BACKEND == 'orjson' else '{"1": "a"}')
+
+    def test_invalid_json_is_value_error(self):
+        with self.assertRaises(ValueError):
+            codec.response_json(response(b'<html>Service Unavailable</html>'))
+
+
+if __name__ == '__main__':
+    unittest.main()
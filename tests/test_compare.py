@@ -0,0 +1,85 @@
+"""
+==============
+test_compare.py
+==============
+
+Read-only comparison of a record between UAT and OPS, each served by
+its own in-memory CMR.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from fake_cmr import FakeCmr, fake_client
+
+from podaac.umm_common import cli, compare
+from podaac.umm_common.concepts import SERVICE
+
+NATIVE_ID = 'POCLOUD_subsetter'
+
+
+def environments():
+    uat, ops = FakeCmr(), FakeCmr()
+    uat.add_record('services', NATIVE_ID, {'Name': 'subsetter', 'Version': '2.0', 'URL': {'URLValue': 'a'}},
+                   associations={'C1-UAT', 'C2-UAT', 'C3-UAT'})
+    ops.add_record('services', NATIVE_ID, {'Name': 'subsetter', 'Version': '1.0'},
+                   associations={'C1-OPS', 'C2-OPS', 'C9-OPS'})
+    for cmr, suffix in ((uat, 'UAT'), (ops, 'OPS')):
+        cmr.add_collection(f'C1-{suffix}', 'MUR-JPL-L4-GLOB-v4.1', '4.1')
+        cmr.add_collection(f'C2-{suffix}', 'MODIS_A-JPL-L2P-v2019.0', '2019.0')
+    uat.add_collection('C3-UAT', 'VIIRS_NPP-JPL-L2P-v2016.2', '2016.2')
+    ops.add_collection('C9-OPS', 'MODIS_A-JPL-L2P-v2019.0', '2014.0')
+    return uat, ops
+
+
+def client_for(uat, ops):
+    client = fake_client(uat)
+    client.session.mount('https://cmr.earthdata.nasa.gov', ops)
+    return client
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_map_collections(self):
+        matched, source_only, target_only = compare.map_collections(
+            {('A', '1'): 'C1-U', ('B', '1'): 'C2-U'}, {('A', '1'): 'C1-O', ('B', '2'): 'C3-O'})
+        self.assertEqual(matched, [{'short_name': 'A', 'version': '1', 'source': 'C1-U', 'target': 'C1-O'}])
+        self.assertEqual(source_only, [{'short_name': 'B', 'version': '1', 'source': 'C2-U', 'target': None}])
+        self.assertEqual(target_only, [{'short_name': 'B', 'version': '2', 'source': None, 'target': 'C3-O'}])
+
+    def test_compare_environments(self):
+        uat, ops = environments()
+        report = compare.compare_environments(SERVICE, 'POCLOUD', NATIVE_ID, 'uat', 'ops', client=client_for(uat, ops))
+        self.assertEqual(report['source_record'], {'concept_id': 'S1-POCLOUD', 'revision_id': 1})
+        self.assertEqual(report['changed_paths'], ['/URL', '/Version'])
+        collections = report['collections']
+        self.assertEqual([(entry['short_name'], entry['source'], entry['target']) for entry in collections['matched']],
+                         [('MODIS_A-JPL-L2P-v2019.0', 'C2-UAT', 'C2-OPS'), ('MUR-JPL-L4-GLOB-v4.1', 'C1-UAT', 'C1-OPS')])
+        self.assertEqual([entry['source'] for entry in collections['source_only']], ['C3-UAT'])
+        self.assertEqual([entry['target'] for entry in collections['target_only']], ['C9-OPS'])
+        # read only, collections from the json feed
+        self.assertEqual([method for method, _ in uat.calls + ops.calls], ['GET'] * 4)
+        self.assertEqual(len(uat.requests('GET', r'/search/collections\.json\?')), 1)
+
+    def test_missing_in_target(self):
+        uat, _ = environments()
+        report = compare.compare_environments(SERVICE, 'POCLOUD', NATIVE_ID, 'uat', 'ops',
+                                              client=client_for(uat, FakeCmr()))
+        self.assertIsNone(report['target_record'])
+        self.assertIsNone(report['changed_paths'])
+        self.assertIsNone(report['collections'])
+
+    def test_run_compare_writes_report(self):
+        uat, ops = environments()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'compare.json')
+            args = cli.parse_args(SERVICE, ['-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN', '--compare', 'ops',
+                                            '--native_id', NATIVE_ID, '--compare_report', path])
+            report = compare.run_compare(args, SERVICE, NATIVE_ID, client=client_for(uat, ops))
+            with open(path) as rfile:
+                self.assertEqual(json.load(rfile), json.loads(json.dumps(report)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+==============
+test_concepts.py
+==============
+
+Concept type descriptors and mixed batches of UMM-S, UMM-T and
+UMM-Var records published through one engine.
+"""
+import unittest
+from unittest import mock
+
+from fake_cmr import FakeCmr, fake_client, no_backoff_waits
+
+from podaac.umm_common import pipeline
+from podaac.umm_common.concepts import SERVICE, TOOL, VARIABLE, record_concept, record_version
+from podaac.umm_common.updater import ToolUpdater, Updater, VariableUpdater
+
+
+def record(name, spec=None, version=None):
+    umm = {'Name': name, 'Description': f'{name} record'}
+    if spec is not None:
+        umm['MetadataSpecification'] = {'Name': spec, 'Version': version,
+                                        'URL': f'https://cdn.earthdata.nasa.gov/umm/{spec}'}
+    return umm
+
+
+class TestConcepts(unittest.TestCase):
+
+    def test_urls(self):
+        prefix = 'https://cmr.uat.earthdata.nasa.gov'
+        self.assertEqual(TOOL.search_url(prefix, 'umm_json'), prefix + '/search/tools.umm_json')
+        self.assertEqual(VARIABLE.ingest_url(prefix, 'POCLOUD', 'POCLOUD_sst', 'C1-POCLOUD'),
+                         prefix + '/ingest/providers/POCLOUD/collections/C1-POCLOUD/variables/POCLOUD_sst')
+        self.assertEqual(TOOL.ingest_url(prefix, 'POCLOUD', 'POCLOUD_viewer'),
+                         prefix + '/ingest/providers/POCLOUD/tools/POCLOUD_viewer')
+        self.assertEqual(SERVICE.association_url(prefix, 'S1-POCLOUD'),
+                         prefix + '/search/services/S1-POCLOUD/associations')
+
+    def test_record_concept(self):
+        self.assertIs(record_concept(record('a', 'UMM-T', '1.1')), TOOL)
+        self.assertIs(record_concept(record('a', 'UMM-Var', '1.8')), VARIABLE)
+        self.assertIs(record_concept(record('a'), SERVICE), SERVICE)
+        with self.assertRaises(ValueError):
+            record_concept(record('a'))
+        self.assertEqual(record_version(record('a', 'UMM-T', '1.1'), TOOL), '1.1')
+        self.assertEqual(record_version(record('a'), VARIABLE), VARIABLE.default_version)
+
+    def test_mixed_batch(self):
+        cmr = FakeCmr()
+        batch = [record('subsetter', 'UMM-S', '1.5.0'), record('viewer', 'UMM-T', '1.1'),
+                 record('sst', 'UMM-Var', '1.8')]
+        with mock.patch.object(pipeline, 'READINESS_WAIT', 0), no_backoff_waits(), \
+                Updater('uat', 'POCLOUD', token='TOKEN', client=fake_client(cmr)) as updater:
+            results = updater.update_many(batch, associations=['C1-POCLOUD'])
+            with self.assertRaises(ValueError):
+                updater.update(record('untyped'))
+        self.assertEqual([cmr.records[result.native_id]['kind'] for result in results],
+                         ['services', 'tools', 'variables'])
+        self.assertEqual([result.concept_id[0] for result in results], ['S', 'T', 'V'])
+        puts = [url for method, url in cmr.calls if method == 'PUT']
+        self.assertEqual(len(puts), 3)
+        self.assertTrue(all(result.ok for result in results))
+
+    def test_variable_ingested_under_collection(self):
+        cmr = FakeCmr()
+        with mock.patch.object(pipeline, 'READINESS_WAIT', 0), no_backoff_waits(), \
+                VariableUpdater('uat', 'POCLOUD', token='TOKEN', client=fake_client(cmr)) as updater:
+            created = updater.update(record('sst'), associations=['C1-POCLOUD'])
+            updated = updater.update(record('sst', 'UMM-Var', '1.9.0'), associations=['C1-POCLOUD'])
+            with self.assertRaises(Exception):
+                updater.update(record('wind'))
+            with self.assertRaises(Exception):
+                updater.update(record('wind'), associations=['C1-POCLOUD', 'C2-POCLOUD'])
+        self.assertTrue(created.ok and created.created)
+        self.assertTrue(updated.ok and updated.updated)
+        self.assertEqual(cmr.associations[created.concept_id], {'C1-POCLOUD'})
+        self.assertEqual([url.split('/ingest/providers/POCLOUD/')[1] for _, url in cmr.requests('PUT')],
+                         ['collections/C1-POCLOUD/variables/POCLOUD_sst'] * 2)
+        # the ingest made the association
+        self.assertEqual(cmr.requests('POST', '/associations'), [])
+
+    def test_entry_point_type_is_the_default(self):
+        cmr = FakeCmr()
+        with mock.patch.object(pipeline, 'READINESS_WAIT', 0), no_backoff_waits(), \
+                ToolUpdater('uat', 'POCLOUD', token='TOKEN', client=fake_client(cmr)) as updater:
+            untyped = updater.update(record('viewer'))
+            service = updater.update(record('subsetter', 'UMM-S', '1.5.0'))
+        self.assertEqual(cmr.records[untyped.native_id]['kind'], 'tools')
+        self.assertEqual(cmr.records[service.native_id]['kind'], 'services')
+
+
+if __name__ == '__main__':
+    unittest.main()
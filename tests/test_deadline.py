@@ -0,0 +1,82 @@
+"""
+==============
+test_deadline.py
+==============
+
+The run deadline: request timeouts, backoff limits and an expired
+deadline in the middle of an association sync.
+"""
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from fake_cmr import CMR_UAT, FakeCmr, fake_client
+
+from podaac.umm_common import associations, deadline
+from podaac.umm_common.failures import FailureReport
+from podaac.umm_common.journal import AssociationJournal
+
+
+class TestDeadline(unittest.TestCase):
+
+    def tearDown(self):
+        deadline.start(None)
+
+    def test_no_deadline(self):
+        self.assertIsNone(deadline.start(None))
+        self.assertIsNone(deadline.current())
+        self.assertEqual(deadline.request_timeout(30), 30)
+        self.assertIsNone(deadline.backoff_max_time())
+
+    def test_timeouts_shrink(self):
+        run_deadline = deadline.start(10)
+        self.assertIs(deadline.current(), run_deadline)
+        self.assertLessEqual(deadline.request_timeout(30), 10)
+        self.assertEqual(deadline.request_timeout(5), 5)
+        self.assertLessEqual(run_deadline.timeout(None), 10)
+        self.assertLessEqual(deadline.backoff_max_time(), 10)
+        self.assertFalse(run_deadline.expired())
+
+    def test_expired(self):
+        run_deadline = deadline.start(0.01)
+        time.sleep(0.02)
+        self.assertTrue(run_deadline.expired())
+        self.assertEqual(run_deadline.remaining(), 0.0)
+        with self.assertRaises(deadline.DeadlineExceeded):
+            deadline.request_timeout(30)
+        with self.assertRaises(deadline.DeadlineExceeded):
+            deadline.backoff_giveup({'target': self.test_expired})
+
+    def test_request_timeout_sent(self):
+        cmr = FakeCmr()
+        client = fake_client(cmr)
+        deadline.start(2)
+        with mock.patch.object(cmr, 'send', wraps=cmr.send) as send:
+            client.get(CMR_UAT + '/search/services.json', timeout=30)
+        self.assertLessEqual(send.call_args.kwargs['timeout'], 2)
+
+    def test_expired_sync_stays_resumable(self):
+        cmr = FakeCmr()
+        client = fake_client(cmr)
+        header = {'Authorization': 'TOKEN', 'Content-type': 'application/json'}
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = AssociationJournal(os.path.join(tmp, 'journal.jsonl'))
+            desired = ['C1-P', 'C2-P']
+            journal.plan('uat', 'S1-P', desired, ['C1-P', 'C2-P'], ['C9-P'])
+            deadline.start(0.01)
+            time.sleep(0.02)
+            failures = FailureReport()
+            with self.assertRaises(deadline.DeadlineExceeded):
+                associations.apply_association_changes('uat', 'S1-P', ['C1-P', 'C2-P'], ['C9-P'], header,
+                                                       'services', client=client, journal=journal,
+                                                       failures=failures)
+            self.assertEqual(cmr.calls, [])
+            self.assertEqual(len(failures), 0)
+            deadline.start(None)
+            self.assertEqual(journal.pending('uat', 'S1-P', desired), (['C1-P', 'C2-P'], ['C9-P']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+==============
+test_decommission.py
+==============
+
+Decommission runs against an in-memory CMR: selection, dry run,
+batched dissociation, deletes and the retry of failed dissociations.
+"""
+import functools
+import os
+import tempfile
+import time
+import unittest
+
+from fake_cmr import FakeCmr, fake_client, no_backoff_waits
+
+from podaac.umm_common import cli, decommission, engine
+from podaac.umm_common.concepts import SERVICE
+from podaac.umm_common.failures import FailureReport
+
+
+def provider():
+    cmr = FakeCmr()
+    for name in ('old_a', 'old_b', 'keep'):
+        cmr.add_record('services', f'POCLOUD_{name}', {'Name': name},
+                       associations={f'C{n}-POCLOUD' for n in range(150)})
+    return cmr
+
+
+def run(cmr, *argv):
+    args = cli.parse_args(SERVICE, ['-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN', '--rate_limit', '0', *argv])
+    failures = FailureReport()
+    with no_backoff_waits():
+        report = decommission.run_decommission(args, SERVICE, functools.partial(engine.delete_record, SERVICE),
+                                               current_token='TOKEN', client=fake_client(cmr), failures=failures)
+    return report, failures
+
+
+class TestDecommission(unittest.TestCase):
+
+    def test_select_records(self):
+        remote = {'POCLOUD_old_a': {}, 'POCLOUD_old_b': {}, 'POCLOUD_keep': {}}
+        self.assertEqual(decommission.select_records(remote, ['POCLOUD_old_*', 'POCLOUD_gone']),
+                         (['POCLOUD_old_a', 'POCLOUD_old_b'], ['POCLOUD_gone']))
+
+    def test_read_native_ids(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'retire.txt')
+            with open(path, 'w') as nfile:
+                nfile.write('# retired in 2024\nPOCLOUD_old_a\n\nPOCLOUD_old_b  # duplicate\n')
+            self.assertEqual(decommission.read_native_ids(path), ['POCLOUD_old_a', 'POCLOUD_old_b'])
+
+    def test_rate_limiter(self):
+        limiter = decommission.RateLimiter(50)
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 3 / 50)
+
+    def test_dry_run(self):
+        cmr = provider()
+        report, _ = run(cmr, '--decommission', 'POCLOUD_old_*')
+        self.assertEqual(report['summary'], {'matched': 2, 'deleted': 0, 'failed': 0, 'associations': 300,
+                                             'associations_removed': 0})
+        self.assertEqual([method for method, _ in cmr.calls], ['GET'])
+
+    def test_apply(self):
+        cmr = provider()
+        report, failures = run(cmr, '--decommission', 'POCLOUD_old_*', '--apply')
+        self.assertEqual(report['summary']['deleted'], 2)
+        self.assertEqual(report['summary']['associations_removed'], 300)
+        self.assertIsNone(cmr.record('POCLOUD_old_a'))
+        self.assertIsNotNone(cmr.record('POCLOUD_keep'))
+        self.assertEqual(cmr.associations['S1-POCLOUD'], set())
+        # 150 associations in batches of 100
+        self.assertEqual(len(cmr.requests('DELETE', 'S1-POCLOUD/associations')), 2)
+        self.assertEqual(len(failures), 0)
+
+    def test_dissociation_recovered_on_retry(self):
+        cmr = provider()
+        cmr.fail.append(['DELETE', 'S1-POCLOUD/associations', 503, 1])
+        report, failures = run(cmr, '--decommission', 'POCLOUD_old_a', '--apply')
+        entry = report['records'][0]
+        self.assertTrue(entry['deleted'])
+        self.assertIsNone(entry['error'])
+        self.assertIsNone(cmr.record('POCLOUD_old_a'))
+        self.assertEqual(cmr.associations['S1-POCLOUD'], set())
+        self.assertEqual(len(failures), 100)
+
+    def test_dissociation_still_failing(self):
+        cmr = provider()
+        cmr.fail.append(['DELETE', 'S1-POCLOUD/associations', 503])
+        report, _ = run(cmr, '--decommission', 'POCLOUD_old_*', '--apply')
+        entries = {entry['native_id']: entry for entry in report['records']}
+        self.assertFalse(entries['POCLOUD_old_a']['deleted'])
+        self.assertTrue(entries['POCLOUD_old_a']['error'].startswith('not decommissioned'))
+        self.assertIsNotNone(cmr.record('POCLOUD_old_a'))
+        self.assertTrue(entries['POCLOUD_old_b']['deleted'])
+        self.assertEqual(report['summary']['failed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+==============
+test_failures.py
+==============
+
+Failure classification, the failure report file and the retry of
+failed association operations against an in-memory CMR.
+"""
+import os
+import tempfile
+import unittest
+
+from fake_cmr import FakeCmr, fake_client, no_backoff_waits
+
+from podaac.umm_common import associations, failures
+from podaac.umm_common.failures import FailureReport
+
+HEADER = {'Authorization': 'TOKEN', 'Content-type': 'application/json'}
+
+
+class TestFailures(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cmr = FakeCmr()
+        self.concept_id = self.cmr.add_record('services', 'POCLOUD_svc', {'Name': 'svc'}, associations={'C9-P'})
+        self.client = fake_client(self.cmr)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def apply(self, add, remove=()):
+        report = FailureReport()
+        associations.apply_association_changes('uat', self.concept_id, add, list(remove), HEADER, 'services',
+                                               client=self.client, failures=report)
+        return report
+
+    def test_classify(self):
+        self.assertEqual(failures.classify(None, 'Read timed out'), failures.TRANSIENT)
+        self.assertEqual(failures.classify(503), failures.TRANSIENT)
+        self.assertEqual(failures.classify(400, 'Service temporarily unavailable'), failures.TRANSIENT)
+        self.assertEqual(failures.classify(422, 'Collection [C0-P] does not exist'), failures.PERMANENT)
+
+    def test_report_file(self):
+        report = FailureReport()
+        report.add('uat', 'services', 'S1-P', 'add', 'C1-P\n', 503, 'unavailable')
+        report.add('uat', 'services', 'S1-P', 'remove', 'C2-P', 422, 'invalid')
+        self.assertEqual(report.summary(), {'total': 2, 'transient': 1, 'permanent': 1})
+        path = os.path.join(self.tmp.name, 'failures.json')
+        report.write(path)
+        loaded = FailureReport.load(path)
+        self.assertEqual(list(loaded), list(report))
+        self.assertEqual(next(iter(loaded))['assoc_id'], 'C1-P')
+
+    def test_failed_operations_collected(self):
+        self.cmr.fail.append(['POST', 'associations', 503])
+        self.cmr.fail.append(['DELETE', 'associations', 422])
+        report = self.apply(['C1-P'], ['C9-P'])
+        self.assertEqual([(failure['operation'], failure['assoc_id'], failure['kind']) for failure in report],
+                         [('add', 'C1-P', 'transient'), ('remove', 'C9-P', 'permanent')])
+
+    def test_final_retry_pass(self):
+        self.cmr.fail.append(['POST', 'associations', 503, 1])
+        self.cmr.fail.append(['DELETE', 'associations', 422])
+        report = self.apply(['C1-P'], ['C9-P'])
+        path = os.path.join(self.tmp.name, 'failures.json')
+        with no_backoff_waits():
+            remaining = associations.final_retry_pass(report, 'TOKEN', report_path=path, client=self.client)
+        # the transient add recovered, the permanent remove is not retried
+        self.assertEqual(self.cmr.associations[self.concept_id], {'C1-P', 'C9-P'})
+        self.assertEqual(len(self.cmr.requests('DELETE')), 1)
+        self.assertEqual([failure['operation'] for failure in remaining], ['remove'])
+        self.assertEqual([failure['operation'] for failure in FailureReport.load(path)], ['remove'])
+
+    def test_transient_retried_with_backoff(self):
+        self.cmr.fail.append(['POST', 'associations', 503])
+        report = self.apply(['C1-P'])
+        with no_backoff_waits():
+            remaining = associations.retry_failures(report, 'TOKEN', client=self.client)
+        self.assertEqual(len(remaining), 1)
+        # first attempt plus four tries of the retry
+        self.assertEqual(len(self.cmr.requests('POST')), 5)
+
+    def test_retry_report_file(self):
+        self.cmr.fail.append(['DELETE', 'associations', 422, 1])
+        path = os.path.join(self.tmp.name, 'failures.json')
+        self.apply([], ['C9-P']).write(path)
+        with no_backoff_waits():
+            remaining = associations.retry_report_file(path, 'TOKEN', client=self.client)
+        # a report file is retried as a whole, permanent failures included
+        self.assertEqual(len(remaining), 0)
+        self.assertEqual(self.cmr.associations[self.concept_id], set())
+        self.assertEqual(len(FailureReport.load(path)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
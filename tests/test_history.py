@@ -0,0 +1,89 @@
+"""
+==============
+test_history.py
+==============
+
+Run history: entries recorded for a run, reading the file back, the
+per record trends and the runs flagged as regressions.
+"""
+import argparse
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fake_cmr import fake_client
+
+from podaac.umm_common import history
+from podaac.umm_common.pipeline import UpdateResult
+
+
+def run(duration, requests=10, native_id='POCLOUD_a', env='uat', status='ok'):
+    return {'env': env, 'provider': 'POCLOUD', 'concept_type': 'services', 'native_id': native_id,
+            'mode': 'update', 'duration': duration, 'requests': requests, 'status': status, 'time': 1.7e9}
+
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'ci', 'runs.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_regressions(self):
+        entries = [run(1.0), run(1.2), run(2.0), run(1.1), run(1.9, requests=30), run(5.0, native_id='POCLOUD_b')]
+        flagged = history.regressions(entries, window=3, threshold=1.5)
+        # the 2.0s run has only two earlier runs, too few for a baseline; other records have their own
+        self.assertEqual(flagged, [(entries[4], [('duration', 1.9, 1.2), ('requests', 30, 10)])])
+        self.assertEqual(history.regressions(entries, window=3, threshold=2.5), [(entries[4], [('requests', 30, 10)])])
+
+    def test_window(self):
+        entries = [run(1.0)] * 3 + [run(4.0)] * 3 + [run(5.0)]
+        self.assertEqual(len(history.regressions(entries, window=10)), 4)
+        # with a short window the slower runs become the baseline
+        self.assertEqual(len(history.regressions(entries, window=3)), 2)
+
+    def test_trends(self):
+        entries = [run(1.0), run(3.0), run(2.0, status='failed'), run(9.0, env='ops')]
+        rows = {row['key'][0]: row for row in history.trends(entries, window=10)}
+        self.assertEqual(rows['uat']['runs'], 3)
+        self.assertEqual((rows['uat']['last_duration'], rows['uat']['baseline_duration']), (2.0, 2.0))
+        self.assertEqual(rows['uat']['failed'], 1)
+        self.assertIsNone(rows['ops']['baseline_duration'])
+
+    def test_recorder_and_file(self):
+        client = fake_client()
+        args = argparse.Namespace(env='uat', provider='POCLOUD', native_id=None)
+        recorder = history.RunRecorder(self.path, args, 'services', 'update', client)
+        client.stats['requests'] += 4
+        history.count_retry()
+        result = UpdateResult(native_id='POCLOUD_a', concept_id='S1-POCLOUD', revision_id=3,
+                              associations_added=['C1-P'], timings={'put': 0.25})
+        entry = recorder.finish('ok', result)
+        self.assertEqual((entry['requests'], entry['retries'], entry['errors']), (4, 1, 0))
+        self.assertEqual((entry['native_id'], entry['revision_id'], entry['associations_added']), ('POCLOUD_a', 3, 1))
+        self.assertEqual(entry['phases'], {'put': 0.25})
+        self.assertIsNone(history.RunRecorder(None, args, 'services', 'update', client).finish('ok'))
+        with open(self.path, 'a') as hfile:
+            hfile.write('{"env": "uat", "dura')
+        self.assertEqual(history.read_history(self.path), [entry])
+
+    def test_report_fail(self):
+        for entry in [run(1.0)] * 3 + [run(3.0)]:
+            history.append(self.path, entry)
+        out = io.StringIO()
+        with mock.patch('sys.stdout', out), self.assertRaises(SystemExit) as exit_:
+            history.main(['report', self.path, '--fail'])
+        self.assertEqual(exit_.exception.code, 1)
+        self.assertIn('1 runs above 1.5x', out.getvalue())
+        # a later normal run clears the flag of the latest run
+        history.append(self.path, run(1.0))
+        with mock.patch('sys.stdout', io.StringIO()):
+            history.main(['report', self.path, '--fail'])
+
+
+if __name__ == '__main__':
+    unittest.main()
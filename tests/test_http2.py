@@ -0,0 +1,195 @@
+"""
+==============
+test_http2.py
+==============
+
+Throughput of the shared client over pooled HTTP/1.1 and over the
+--http2 transport, against a local stand-in for CMR.
+
+The stand-in answers association style POSTs after LATENCY seconds and
+charges HANDSHAKE seconds on the first request of every connection,
+standing in for the TLS setup a new CMR connection costs. WORKERS
+threads send REQUESTS requests through one CmrClient: HTTP/1.1 needs a
+connection per concurrent request, HTTP/2 multiplexes them over one.
+
+Against this stand-in HTTP/1.1 is free to open as many connections as
+there are workers and HTTP/2 reaches about 85% of its throughput (the
+HTTP/2 framing runs in Python on one event loop thread) with a single
+connection. HTTP/2 must use at most http2.MAX_CONNECTIONS connections
+and, with UMM_TIMING_TESTS=1, reach UMM_HTTP2_RATIO of the HTTP/1.1
+throughput (default 0.6).
+"""
+import asyncio
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from podaac.umm_common.client import CmrClient
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    from podaac.umm_common import http2
+    HTTP2 = http2.httpx is not None
+except ImportError:
+    HTTP2 = False
+
+LATENCY = 0.05
+HANDSHAKE = 0.05
+WORKERS = 32
+REQUESTS = 320
+TIMING = os.environ.get('UMM_TIMING_TESTS') == '1'
+RATIO = float(os.environ.get('UMM_HTTP2_RATIO', '0.6'))
+PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+BODY = b'[{"status": "ok"}]'
+
+
+class StandIn:
+    """HTTP/1.1 and cleartext HTTP/2 server on one port, in a thread"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = {'HTTP/1.1': 0, 'HTTP/2': 0}
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = None
+        self._server = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            start = await reader.readexactly(len(PREFACE))
+            await asyncio.sleep(HANDSHAKE)
+            if start == PREFACE:
+                await self._http2(reader, writer)
+            else:
+                await self._http1(reader, writer, start)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _http1(self, reader, writer, buffer):
+        while True:
+            while b'\r\n\r\n' not in buffer:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    return
+                buffer += chunk
+            head, buffer = buffer.split(b'\r\n\r\n', 1)
+            length = 0
+            for line in head.split(b'\r\n')[1:]:
+                name, _, value = line.partition(b':')
+                if name.strip().lower() == b'content-length':
+                    length = int(value)
+            while len(buffer) < length:
+                buffer += await reader.read(65536)
+            buffer = buffer[length:]
+            await asyncio.sleep(LATENCY)
+            self.requests['HTTP/1.1'] += 1
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s'
+                         % (len(BODY), BODY))
+            await writer.drain()
+
+    async def _http2(self, reader, writer):
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        conn.receive_data(PREFACE)
+        writer.write(conn.data_to_send())
+
+        async def respond(stream_id):
+            await asyncio.sleep(LATENCY)
+            self.requests['HTTP/2'] += 1
+            conn.send_headers(stream_id, [(':status', '200'), ('content-type', 'application/json'),
+                                          ('content-length', str(len(BODY)))])
+            conn.send_data(stream_id, BODY, end_stream=True)
+            writer.write(conn.data_to_send())
+
+        tasks = set()
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.DataReceived):
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    task = asyncio.ensure_future(respond(event.stream_id))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            writer.write(conn.data_to_send())
+            await writer.drain()
+
+
+def throughput(client, url):
+    def post(index):
+        return client.post(url, json=[{'concept_id': f'C{index}-POCLOUD'}], timeout=30).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        statuses = list(executor.map(post, range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    return statuses, REQUESTS / elapsed
+
+
+@unittest.skipUnless(HTTP2, 'httpx[http2] is not installed')
+class TestHttp2Transport(unittest.TestCase):
+
+    def run_client(self, use_http2):
+        with StandIn() as server:
+            client = CmrClient()
+            adapter = None
+            if use_http2:
+                adapter = http2.mount(client.session, prefixes=('http://',), prior_knowledge=True)
+            url = f'http://127.0.0.1:{server.port}/search/services/S1-POCLOUD/associations'
+            statuses, rate = throughput(client, url)
+            client.session.close()
+            return statuses, rate, server, adapter
+
+    def test_http2_multiplexes(self):
+        statuses, rate, server, adapter = self.run_client(True)
+        self.assertEqual(statuses, [200] * REQUESTS)
+        self.assertEqual(server.requests['HTTP/2'], REQUESTS)
+        self.assertEqual(adapter.protocols, {'HTTP/2': REQUESTS})
+        self.assertLessEqual(server.connections, http2.MAX_CONNECTIONS)
+        self.assertGreater(rate, 0)
+
+    def test_fewer_connections(self):
+        _, rate1, server1, _ = self.run_client(False)
+        _, rate2, server2, _ = self.run_client(True)
+        self.assertLessEqual(server2.connections, http2.MAX_CONNECTIONS)
+        self.assertLess(server2.connections, server1.connections)
+        if TIMING:
+            self.assertGreater(rate2, rate1 * RATIO,
+                               f'HTTP/1.1 pooled: {rate1:.0f} requests/s over {server1.connections} connections, '
+                               f'HTTP/2: {rate2:.0f} requests/s over {server2.connections} connections')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+==============
+test_journal.py
+==============
+
+Association journal: planned and completed operations, the pending
+remainder of an unfinished sync and resuming it against an in-memory
+CMR.
+"""
+import os
+import tempfile
+import unittest
+
+from fake_cmr import FakeCmr, fake_client
+
+from podaac.umm_common import associations
+from podaac.umm_common.journal import AssociationJournal
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = AssociationJournal(os.path.join(self.tmp.name, 'journal.jsonl'))
+        self.desired = ['C1-P', 'C2-P', 'C3-P']
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_no_plan(self):
+        self.assertIsNone(self.journal.pending('uat', 'S1-P', self.desired))
+
+    def test_pending(self):
+        self.journal.plan('uat', 'S1-P', self.desired, ['C3-P', 'C2-P'], ['C9-P'])
+        self.journal.record('uat', 'S1-P', 'add', 'C2-P')
+        self.journal.plan('uat', 'S2-P', self.desired, ['C1-P'], [])
+        self.assertEqual(self.journal.pending('uat', 'S1-P', self.desired), (['C3-P'], ['C9-P']))
+        self.assertEqual(self.journal.pending('uat', 'S2-P', self.desired), (['C1-P'], []))
+        # other environment, changed association file
+        self.assertIsNone(self.journal.pending('ops', 'S1-P', self.desired))
+        self.assertIsNone(self.journal.pending('uat', 'S1-P', ['C1-P']))
+
+    def test_complete_and_new_plan(self):
+        self.journal.plan('uat', 'S1-P', self.desired, ['C2-P'], [])
+        self.journal.record('uat', 'S1-P', 'add', 'C2-P')
+        self.journal.complete('uat', 'S1-P')
+        self.assertIsNone(self.journal.pending('uat', 'S1-P', self.desired))
+        # a new plan starts over, completed operations of the old one do not count
+        self.journal.plan('uat', 'S1-P', self.desired, ['C2-P', 'C3-P'], [])
+        self.assertEqual(self.journal.pending('uat', 'S1-P', self.desired), (['C2-P', 'C3-P'], []))
+
+    def test_truncated_line(self):
+        self.journal.plan('uat', 'S1-P', self.desired, ['C2-P', 'C3-P'], [])
+        with open(self.journal.path, 'a') as jfile:
+            jfile.write('{"env": "uat", "concept_id": "S1-P", "ev')
+        self.assertEqual(self.journal.pending('uat', 'S1-P', self.desired), (['C2-P', 'C3-P'], []))
+
+    def test_resume(self):
+        cmr = FakeCmr()
+        concept_id = cmr.add_record('services', 'POCLOUD_svc', {'Name': 'svc'}, associations={'C1-P', 'C9-P'})
+        assoc_file = os.path.join(self.tmp.name, 'uat_associations.txt')
+        with open(assoc_file, 'w') as afile:
+            afile.write('\n'.join(self.desired) + '\n')
+        # an earlier run planned the sync and completed the first add
+        self.journal.plan('uat', concept_id, self.desired, ['C2-P', 'C3-P'], ['C9-P'])
+        self.journal.record('uat', concept_id, 'add', 'C2-P')
+        cmr.associations[concept_id].add('C2-P')
+
+        associations.sync_association('uat', concept_id, 'TOKEN', assoc_file, 'services', client=fake_client(cmr),
+                                      journal=self.journal, resume=True)
+        self.assertEqual(cmr.associations[concept_id], {'C1-P', 'C2-P', 'C3-P'})
+        # the plan came from the journal: no association listing, only the remaining operations
+        self.assertEqual(cmr.requests('GET'), [])
+        self.assertEqual([method for method, _ in cmr.calls], ['POST', 'DELETE'])
+        self.assertIsNone(self.journal.pending('uat', concept_id, self.desired))
+
+
+if __name__ == '__main__':
+    unittest.main()
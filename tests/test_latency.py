@@ -0,0 +1,132 @@
+"""
+==============
+test_latency.py
+==============
+
+Per endpoint latency tracking: endpoint keys, percentiles, adaptive
+timeouts and hedged GETs of the shared client.
+"""
+import threading
+import unittest
+
+import requests
+from requests.adapters import BaseAdapter
+
+from fake_cmr import CMR_UAT
+
+from podaac.umm_common.client import CmrClient
+from podaac.umm_common.latency import LatencyTracker, endpoint_key, percentile
+
+SEARCH = CMR_UAT + '/search/services.json?native_id=POCLOUD_svc'
+
+
+class SlowFirstAdapter(BaseAdapter):
+    """Transport holding the first request until released, answering the others at once"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.timeouts = []
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        with self._lock:
+            self.timeouts.append(kwargs.get('timeout'))
+            first = len(self.timeouts) == 1
+        if first:
+            self.release.wait(5)
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = b'{"first": %s}' % (b'true' if first else b'false')  # pylint: disable=protected-access
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self):
+        self.release.set()
+
+
+class TestLatency(unittest.TestCase):
+
+    def test_endpoint_key(self):
+        self.assertEqual(endpoint_key('GET', SEARCH), 'GET cmr.uat.earthdata.nasa.gov/search/services.json')
+        self.assertEqual(endpoint_key('POST', CMR_UAT + '/search/services/S12-POCLOUD/associations'),
+                         'POST cmr.uat.earthdata.nasa.gov/search/services/{concept_id}/associations')
+        self.assertEqual(endpoint_key('PUT', CMR_UAT + '/ingest/providers/POCLOUD/services/POCLOUD_svc'),
+                         'PUT cmr.uat.earthdata.nasa.gov/ingest/providers/POCLOUD/services/{native_id}')
+
+    def test_percentile(self):
+        samples = [float(n) for n in range(100, 0, -1)]
+        self.assertEqual(percentile(samples, 50), 50.0)
+        self.assertEqual(percentile(samples, 99), 99.0)
+        self.assertEqual(percentile(samples, 100), 100.0)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+    def test_percentile_needs_min_samples(self):
+        tracker = LatencyTracker(min_samples=5)
+        for _ in range(4):
+            tracker.record('GET a', 0.5)
+        self.assertIsNone(tracker.percentile('GET a', 95))
+        self.assertEqual(tracker.timeout('GET a', 30), 30)
+        tracker.record('GET a', 0.5)
+        self.assertEqual(tracker.percentile('GET a', 95), 0.5)
+        self.assertIsNone(tracker.percentile('GET b', 95))
+
+    def test_timeout(self):
+        tracker = LatencyTracker(window=10, min_samples=10, multiplier=3.0, floor=2.0)
+        for _ in range(10):
+            tracker.record('GET a', 0.1)
+            tracker.record('GET b', 4.0)
+            tracker.record('GET c', 20.0)
+        self.assertEqual(tracker.timeout('GET a', 30), 2.0)
+        self.assertEqual(tracker.timeout('GET b', 30), 12.0)
+        self.assertEqual(tracker.timeout('GET c', 30), 30)
+        self.assertIsNone(tracker.timeout('GET a', None))
+        # the window only keeps the recent requests
+        for _ in range(10):
+            tracker.record('GET c', 1.0)
+        self.assertEqual(tracker.timeout('GET c', 30), 3.0)
+        self.assertEqual(LatencyTracker(min_samples=1, multiplier=None).timeout('GET a', 30), 30)
+
+    def test_client_sends_adaptive_timeout(self):
+        adapter = SlowFirstAdapter()
+        adapter.release.set()
+        tracker = LatencyTracker(min_samples=1, floor=2.0)
+        client = CmrClient(latency=tracker)
+        client.session.mount('https://', adapter)
+        client.get(SEARCH, timeout=30)
+        client.get(SEARCH, timeout=30)
+        self.assertEqual(adapter.timeouts, [30, 2.0])
+        self.assertEqual(client.metrics()['latency']['GET cmr.uat.earthdata.nasa.gov/search/services.json']['count'],
+                         2)
+
+    def test_writes_keep_configured_timeout(self):
+        adapter = SlowFirstAdapter()
+        adapter.release.set()
+        client = CmrClient(latency=LatencyTracker(min_samples=1, floor=2.0))
+        client.session.mount('https://', adapter)
+        ingest = CMR_UAT + '/ingest/providers/POCLOUD/services/POCLOUD_svc'
+        for _ in range(3):
+            client.put(ingest, data='{}', timeout=30)
+        self.assertEqual(adapter.timeouts, [30, 30, 30])
+
+    def test_hedged_get(self):
+        adapter = SlowFirstAdapter()
+        tracker = LatencyTracker(min_samples=1, multiplier=None)
+        tracker.record(endpoint_key('GET', SEARCH), 0.01)
+        client = CmrClient(latency=tracker, hedge=True)
+        client.session.mount('https://', adapter)
+        try:
+            resp = client.get(SEARCH)
+            self.assertEqual(resp.json(), {'first': False})
+            self.assertEqual((client.stats['hedges_sent'], client.stats['hedges_won']), (1, 1))
+            # writes are never hedged
+            self.assertEqual(client.post(CMR_UAT + '/search/services/S1-POCLOUD/associations').status_code, 200)
+            self.assertEqual(client.stats['hedges_sent'], 1)
+        finally:
+            adapter.release.set()
+            client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+==============
+test_overrides.py
+==============
+
+JSON pointer overrides: `--set` expressions, override files next to a
+record and their order, and the update publishing the overridden
+record.
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fake_cmr import FakeCmr, fake_client, no_backoff_waits
+
+from podaac.umm_common import cli, engine, overrides, pipeline
+from podaac.umm_common.concepts import SERVICE
+
+RECORD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes', 'umm-s.json')
+
+
+class TestOverrides(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.record = os.path.join(self.tmp.name, 'service.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as ofile:
+            json.dump(content, ofile)
+        return path
+
+    def test_parse_set(self):
+        self.assertEqual(overrides.parse_set('/Version=1.2.3'), ('/Version', '1.2.3'))
+        self.assertEqual(overrides.parse_set('/Version=a=b'), ('/Version', 'a=b'))
+        self.assertEqual(overrides.parse_set('/Flag:=true'), ('/Flag', True))
+        self.assertEqual(overrides.parse_set('/URL:={"URLValue": "https://x"}'), ('/URL', {'URLValue': 'https://x'}))
+        for expression in ('/Version', '=1.2.3', '/Flag:=not json'):
+            with self.subTest(expression=expression), self.assertRaises(ValueError):
+                overrides.parse_set(expression)
+
+    def test_set_pointer(self):
+        umm = {'URL': {'URLValue': 'a'}, 'Keywords': ['k0', 'k1'], 'a/b': 1}
+        overrides.set_pointer(umm, '/URL/URLValue', 'b')
+        overrides.set_pointer(umm, '/Keywords/1', 'K1')
+        overrides.set_pointer(umm, '/Keywords/-', 'k2')
+        overrides.set_pointer(umm, '/a~1b', 2)
+        overrides.set_pointer(umm, '/Contact/Email', 'ops@example.com')
+        self.assertEqual(umm, {'URL': {'URLValue': 'b'}, 'Keywords': ['k0', 'K1', 'k2'], 'a/b': 2,
+                               'Contact': {'Email': 'ops@example.com'}})
+        for pointer in ('', 'Version'):
+            with self.subTest(pointer=pointer), self.assertRaises(ValueError):
+                overrides.set_pointer(umm, pointer, 1)
+
+    def test_override_files(self):
+        umm = {'Version': '1', 'URL': {'URLValue': 'https://ops'}}
+        self.write('uat_overrides.json', {'/Version': 'shared', '/URL/URLValue': 'https://uat'})
+        # no record specific file: the directory wide one applies
+        self.assertEqual(overrides.apply_overrides(umm, self.record, 'uat'),
+                         {'Version': 'shared', 'URL': {'URLValue': 'https://uat'}})
+        self.write('service_uat_overrides.json', {'/Version': 'file'})
+        overridden = overrides.apply_overrides(umm, self.record, 'uat', ['/Version=cli'])
+        # the record file replaces the shared one, the command line wins over the file
+        self.assertEqual(overridden, {'Version': 'cli', 'URL': {'URLValue': 'https://ops'}})
+        self.assertEqual(umm, {'Version': '1', 'URL': {'URLValue': 'https://ops'}})
+        self.assertIs(overrides.apply_overrides(umm, self.record, 'ops'), umm)
+
+    def test_override_file_must_be_object(self):
+        path = self.write('bad_overrides.json', [['/Version', '1']])
+        with self.assertRaises(ValueError):
+            overrides.apply_overrides({}, None, 'uat', override_path=path)
+
+    def test_invalid_set_argument(self):
+        with mock.patch('sys.stderr'), self.assertRaises(SystemExit):
+            cli.parse_args(SERVICE, ['-f', RECORD, '-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN', '--set', 'Version'])
+
+    def test_update_publishes_overrides(self):
+        with open(RECORD) as record_file:
+            umm = json.load(record_file)
+        path = self.write('service.json', umm)
+        self.write('uat_overrides.json', {'/Version': 'uat'})
+        args = cli.parse_args(SERVICE, ['-f', path, '-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN',
+                                        '--set', '/Description=uat build'])
+        cmr = FakeCmr()
+        with mock.patch.object(pipeline, 'READINESS_WAIT', 0), no_backoff_waits():
+            engine.update_record(args, SERVICE, fake_client(cmr))
+        published = cmr.record(engine.create_native_id('POCLOUD', umm))[2]
+        self.assertEqual(published, dict(umm, Version='uat', Description='uat build'))
+        # the record file itself is not rewritten
+        with open(path) as record_file:
+            self.assertEqual(json.load(record_file), umm)
+
+
+if __name__ == '__main__':
+    unittest.main()
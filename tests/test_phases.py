@@ -0,0 +1,74 @@
+"""
+==============
+test_phases.py
+==============
+
+PhaseGraph: dependency order, concurrent independent phases, errors
+and the critical path.
+"""
+import threading
+import unittest
+
+from podaac.umm_common.phases import PhaseGraph
+
+
+class TestPhaseGraph(unittest.TestCase):
+
+    def test_dependency_order_and_results(self):
+        order = []
+        graph = PhaseGraph()
+
+        def phase(name, value):
+            def func(results):
+                order.append((name, dict(results)))
+                return value
+            return func
+
+        graph.add('token', phase('token', 'T'))
+        graph.add('lookup', phase('lookup', 'S1'), deps=('token',))
+        graph.add('ingest', phase('ingest', 2), deps=('token', 'lookup'))
+        self.assertEqual(graph.run(), {'token': 'T', 'lookup': 'S1', 'ingest': 2})
+        self.assertEqual(order, [('token', {}), ('lookup', {'token': 'T'}),
+                                 ('ingest', {'token': 'T', 'lookup': 'S1'})])
+
+    def test_independent_phases_overlap(self):
+        # each phase waits for the other, which only works when both run at the same time
+        barrier = threading.Barrier(2, timeout=5)
+        graph = PhaseGraph(max_workers=2)
+        graph.add('ingest', lambda results: barrier.wait())
+        graph.add('associations', lambda results: barrier.wait())
+        graph.run()
+        self.assertEqual(set(graph.durations()), {'ingest', 'associations'})
+
+    def test_unknown_dependency(self):
+        graph = PhaseGraph()
+        with self.assertRaises(Exception):
+            graph.add('ingest', lambda results: None, deps=('token',))
+
+    def test_error_stops_dependent_phases(self):
+        ran = []
+        graph = PhaseGraph()
+
+        def fail(_results):
+            raise SystemExit('token request failed')
+
+        graph.add('token', fail)
+        graph.add('ingest', lambda results: ran.append('ingest'), deps=('token',))
+        with self.assertRaises(SystemExit):
+            graph.run()
+        self.assertEqual(ran, [])
+
+    def test_critical_path(self):
+        graph = PhaseGraph()
+        self.assertEqual(graph.critical_path(), ([], 0.0))
+        for name, deps in (('token', ()), ('lookup', ('token',)), ('resolve', ('token',)),
+                           ('ingest', ('lookup',)), ('associations', ('lookup', 'resolve'))):
+            graph.add(name, lambda results: None, deps=deps)
+        graph.timings = {'token': (0.0, 1.0), 'lookup': (1.0, 2.0), 'resolve': (1.0, 4.0),
+                         'ingest': (2.0, 3.0), 'associations': (4.0, 6.0)}
+        self.assertEqual(graph.critical_path(), (['token', 'resolve', 'associations'], 6.0))
+        self.assertEqual(graph.durations()['resolve'], 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
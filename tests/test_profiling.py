@@ -0,0 +1,71 @@
+"""
+==============
+test_profiling.py
+==============
+
+--profile: time categories, sleeps attributed to their callers and
+the written .prof and .txt files.
+"""
+import cProfile
+import json
+import os
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+
+from podaac.umm_common import deadline, profiling
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_category(self):
+        category = profiling._category  # pylint: disable=protected-access
+        self.assertEqual(category('~', "<built-in method time.sleep>"), 'sleep')
+        self.assertEqual(category('/venv/lib/site-packages/urllib3/connectionpool.py', 'urlopen'), 'network')
+        self.assertEqual(category('~', "<method 'recv_into' of '_socket.socket' objects>"), 'network')
+        self.assertEqual(category('/usr/lib/python3.11/json/decoder.py', 'decode'), 'json')
+        self.assertEqual(category('~', "<method 'acquire' of '_thread.lock' objects>"), 'wait')
+        self.assertEqual(category('/src/podaac/umm_common/diff.py', 'changed_paths'), 'other')
+
+    def test_thread_without_calls_skipped(self):
+        profiler = profiling.Profiler(os.path.join(tempfile.gettempdir(), 'unused'))
+        profiler.profile.enable()
+        json.dumps({})
+        profiler.profile.disable()
+        profiler.thread_profiles.append(cProfile.Profile())
+        self.assertTrue(profiler.stats().stats)  # pylint: disable=no-member
+
+    def test_profile_run(self):
+        original_sleep = time.sleep
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, 'run')
+            with profiling.Profiler(prefix) as profiler:
+                time.sleep(0.01)
+                deadline.sleep(0.01)
+                json.loads(json.dumps({'items': list(range(1000))}))
+                worker = threading.Thread(target=time.sleep, args=(0.01,))
+                worker.start()
+                worker.join()
+            self.assertIs(time.sleep, original_sleep)
+            # sleeps through deadline.sleep are charged to its caller
+            self.assertEqual(profiler.sleeps[__name__][0], 2)
+            self.assertEqual(sum(count for count, _ in profiler.sleeps.values()), 3)
+            # one profiler per started thread, or a single process-wide one from 3.12
+            self.assertEqual(len(profiler.thread_profiles), 0 if profiling.PROCESS_WIDE else 1)
+            self.assertGreaterEqual(profiler.wall, 0.03)
+            self.assertEqual(set(profiler.categories()), {'network', 'json', 'sleep', 'wait', 'other'})
+            self.assertGreater(profiler.categories()['sleep'], 0)
+            stats = pstats.Stats(prefix + '.prof').stats  # pylint: disable=no-member
+            # the sleep of the started thread is in the profile too
+            self.assertEqual(sum(calls for (_, _, name), (calls, *_) in stats.items() if name == '_timed_sleep'), 3)
+            with open(prefix + '.txt') as rfile:
+                report = rfile.read()
+        threads = 'all threads' if profiling.PROCESS_WIDE else '2 threads'
+        for heading in ('Wall time', f'Time by category (own time in {threads})', 'Sleeps by caller', __name__):
+            self.assertIn(heading, report)
+
+
+if __name__ == '__main__':
+    unittest.main()
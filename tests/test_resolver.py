@@ -0,0 +1,123 @@
+"""
+==============
+test_resolver.py
+==============
+
+Association entries naming collections, resolved against an
+in-memory CMR with a cache file.
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fake_cmr import FakeCmr, fake_client
+
+from podaac.umm_common import cli, engine, pipeline, resolver
+from podaac.umm_common.concepts import SERVICE
+from podaac.umm_common.resolver import Resolver, parse_entry
+
+RECORD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes', 'umm-s.json')
+NATIVE_ID = 'POCLOUD_podaac_l2_cloud_subsetter'
+
+
+def fake_cmr():
+    cmr = FakeCmr()
+    cmr.add_collection('C1-POCLOUD', 'MUR-JPL-L4-GLOB-v4.1', '4.1',
+                       'GHRSST Level 4 MUR Global Foundation Sea Surface Temperature Analysis (v4.1)')
+    cmr.add_collection('C2-POCLOUD', 'MODIS_A-JPL-L2P-v2019.0', '2019.0')
+    cmr.add_collection('C3-POCLOUD', 'MODIS_A-JPL-L2P-v2019.0', '2020.0')
+    return cmr
+
+
+class TestResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = os.path.join(self.tmp.name, 'collections.json')
+        self.cmr = fake_cmr()
+        self.client = fake_client(self.cmr)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def resolver(self, ttl=resolver.DEFAULT_TTL):
+        return Resolver('uat', cache_path=self.cache, ttl=ttl, client=self.client)
+
+    def test_parse_entry(self):
+        self.assertEqual(parse_entry(' C1940473819-POCLOUD\n'), ('concept_id', 'C1940473819-POCLOUD'))
+        self.assertEqual(parse_entry('entry_title: A title'), ('entry_title', 'A title'))
+        self.assertEqual(parse_entry('MUR-JPL-L4-GLOB-v4.1/4.1'), ('short_name', ('MUR-JPL-L4-GLOB-v4.1', '4.1')))
+        self.assertEqual(parse_entry('MUR-JPL-L4-GLOB-v4.1'), ('short_name', ('MUR-JPL-L4-GLOB-v4.1', None)))
+        self.assertTrue(resolver.needs_resolution(['C1-POCLOUD', 'MUR-JPL-L4-GLOB-v4.1']))
+        self.assertFalse(resolver.needs_resolution(['C1-POCLOUD', 'C2-POCLOUD']))
+
+    def test_resolve(self):
+        resolved = self.resolver().resolve([
+            'MODIS_A-JPL-L2P-v2019.0', 'MODIS_A-JPL-L2P-v2019.0/2020.0', 'C9-POCLOUD',
+            'entry_title:GHRSST Level 4 MUR Global Foundation Sea Surface Temperature Analysis (v4.1)'])
+        self.assertEqual(resolved['MODIS_A-JPL-L2P-v2019.0'], ['C2-POCLOUD', 'C3-POCLOUD'])
+        self.assertEqual(resolved['MODIS_A-JPL-L2P-v2019.0/2020.0'], ['C3-POCLOUD'])
+        self.assertEqual(resolved['C9-POCLOUD'], ['C9-POCLOUD'])
+        self.assertEqual(resolved['entry_title:GHRSST Level 4 MUR Global Foundation Sea Surface Temperature '
+                                  'Analysis (v4.1)'], ['C1-POCLOUD'])
+        # one bulk search per entry kind
+        self.assertEqual(len(self.cmr.requests('GET', '/search/collections')), 2)
+
+    def test_short_name_case_insensitive(self):
+        self.assertEqual(self.resolver().resolve(['mur-jpl-l4-glob-v4.1/4.1']),
+                         {'mur-jpl-l4-glob-v4.1/4.1': ['C1-POCLOUD']})
+
+    def test_entry_title_case_insensitive(self):
+        entry = 'entry_title:ghrsst level 4 MUR global foundation sea surface temperature analysis (V4.1)'
+        self.assertEqual(self.resolver().resolve([entry]), {entry: ['C1-POCLOUD']})
+
+    def test_cache_and_ttl(self):
+        self.resolver().resolve(['MODIS_A-JPL-L2P-v2019.0'])
+        searches = len(self.cmr.calls)
+        cached = self.resolver()
+        self.assertEqual(cached.resolve(['MODIS_A-JPL-L2P-v2019.0']),
+                         {'MODIS_A-JPL-L2P-v2019.0': ['C2-POCLOUD', 'C3-POCLOUD']})
+        self.assertEqual(cached.stats['cached'], 1)
+        self.assertEqual(len(self.cmr.calls), searches)
+        now = resolver.time.time()
+        with mock.patch.object(resolver.time, 'time', return_value=now + 60):
+            self.resolver(ttl=30).resolve(['MODIS_A-JPL-L2P-v2019.0'])
+        self.assertEqual(len(self.cmr.calls), searches + 1)
+
+    def test_unresolved_entry_fails(self):
+        names = self.resolver()
+        self.assertEqual(names.resolve(['MODIS_A-typo']), {'MODIS_A-typo': []})
+        with self.assertRaises(Exception) as err:
+            names.expand(['C1-POCLOUD', 'MODIS_A-typo'])
+        self.assertIn('MODIS_A-typo', str(err.exception))
+        # unresolved entries are searched again
+        self.assertEqual(names.stats['unresolved'], 2)
+
+    def test_resolve_association(self):
+        self.assertEqual(resolver.resolve_association('C1-POCLOUD', 'uat', cache_path=self.cache,
+                                                      client=self.client), 'C1-POCLOUD')
+        assoc_file = os.path.join(self.tmp.name, 'uat_associations.txt')
+        with open(assoc_file, 'w') as afile:
+            afile.write('C9-POCLOUD\nMUR-JPL-L4-GLOB-v4.1\n\n')
+        self.assertEqual(resolver.resolve_association(assoc_file, 'uat', cache_path=self.cache, client=self.client),
+                         ['C1-POCLOUD', 'C9-POCLOUD'])
+
+    def test_unresolved_entry_keeps_associations(self):
+        with open(RECORD) as record_file:
+            concept_id = self.cmr.add_record('services', NATIVE_ID, json.load(record_file),
+                                             associations={'C1-POCLOUD', 'C2-POCLOUD'})
+        assoc_file = os.path.join(self.tmp.name, 'uat_associations.txt')
+        with open(assoc_file, 'w') as afile:
+            afile.write('C2-POCLOUD\nMUR-JPL-L4-GLOB-v4.1-typo\n')
+        args = cli.parse_args(SERVICE, ['-f', RECORD, '-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN',
+                                        '-a', assoc_file, '--resolver_cache', self.cache])
+        with mock.patch.object(pipeline, 'READINESS_WAIT', 0), self.assertRaises(Exception):
+            engine.update_record(args, SERVICE, self.client)
+        self.assertEqual(self.cmr.requests('DELETE', '/associations'), [])
+        self.assertEqual(self.cmr.associations[concept_id], {'C1-POCLOUD', 'C2-POCLOUD'})
+
+
+if __name__ == '__main__':
+    unittest.main()
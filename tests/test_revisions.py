@@ -0,0 +1,100 @@
+"""
+==============
+test_revisions.py
+==============
+
+Revision checked ingest: the Cmr-Revision-Id header, conflicts with
+a concurrent writer and the re-read / re-diff / retry of an update.
+"""
+import json
+import os
+import unittest
+from unittest import mock
+
+import requests
+
+from fake_cmr import FakeCmr, fake_client, no_backoff_waits
+
+from podaac.umm_common import cli, engine, pipeline, revisions
+from podaac.umm_common.concepts import SERVICE
+from podaac.umm_common.revisions import RevisionConflict
+
+RECORD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes', 'umm-s.json')
+
+
+class ConcurrentWriter(FakeCmr):
+    """FakeCmr where another writer ingests `writes` before the next `times` PUTs"""
+
+    def __init__(self, writes, times=1):
+        super().__init__()
+        self.writes = list(writes)
+        self.times = times
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        if request.method == 'PUT' and self.times:
+            self.times -= 1
+            for record in self.records.values():
+                record['revisions'].append(self.writes[0])
+        return super().send(request, **kwargs)
+
+
+class TestRevisions(unittest.TestCase):
+
+    def setUp(self):
+        with open(RECORD) as record_file:
+            self.local = json.load(record_file)
+        self.native_id = engine.create_native_id('POCLOUD', self.local)
+        self.remote = dict(self.local, Description='edited in MMT')
+
+    def update(self, cmr):
+        cmr.add_record('services', self.native_id, self.remote)
+        args = cli.parse_args(SERVICE, ['-f', RECORD, '-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN'])
+        with mock.patch.object(pipeline, 'READINESS_WAIT', 0), no_backoff_waits():
+            return engine.update_record(args, SERVICE, fake_client(cmr))
+
+    def test_helpers(self):
+        self.assertIsNone(revisions.next_revision(None))
+        self.assertEqual(revisions.next_revision('7'), 8)
+        header = {'Authorization': 'TOKEN'}
+        self.assertIs(revisions.revision_header(header, None), header)
+        self.assertEqual(revisions.revision_header(header, 8), {'Authorization': 'TOKEN', 'Cmr-Revision-Id': '8'})
+        resp = requests.Response()
+        resp.status_code = 409
+        revisions.check_conflict(resp, None)
+        with self.assertRaises(RevisionConflict):
+            revisions.check_conflict(resp, 8)
+
+    def test_update_sends_revision(self):
+        cmr = FakeCmr()
+        result = self.update(cmr)
+        self.assertTrue(result.updated)
+        self.assertEqual(cmr.record(self.native_id)[1:], (2, self.local))
+
+    def test_conflict_rediffed_and_retried(self):
+        cmr = ConcurrentWriter([dict(self.local, Description='edited again')])
+        result = self.update(cmr)
+        self.assertTrue(result.updated)
+        # the 409 answered PUT did not overwrite the concurrent revision 2
+        self.assertEqual(len(cmr.requests('PUT')), 2)
+        self.assertEqual(cmr.record(self.native_id)[1:], (3, self.local))
+        self.assertEqual(result.revision_id, 3)
+
+    def test_conflict_with_same_profile(self):
+        # the other writer already made the change, nothing left to ingest
+        cmr = ConcurrentWriter([self.local])
+        result = self.update(cmr)
+        self.assertFalse(result.updated)
+        self.assertEqual(len(cmr.requests('PUT')), 1)
+        self.assertEqual(cmr.record(self.native_id)[1:], (2, self.local))
+
+    def test_still_conflicting(self):
+        cmr = ConcurrentWriter([self.remote], times=revisions.MAX_CONFLICT_RETRIES)
+        with self.assertRaises(Exception) as err:
+            self.update(cmr)
+        self.assertIn('still conflicting', str(err.exception))
+        self.assertEqual(len(cmr.requests('PUT')), revisions.MAX_CONFLICT_RETRIES)
+        self.assertEqual(cmr.record(self.native_id)[2], self.remote)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+==============
+test_rollback.py
+==============
+
+Pre-update snapshots and rollback to an earlier revision, from a
+snapshot or from the CMR revisions, against an in-memory CMR.
+"""
+import argparse
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fake_cmr import FakeCmr, fake_client, no_backoff_waits
+
+from podaac.umm_common import engine, pipeline, rollback
+from podaac.umm_common.concepts import SERVICE
+from podaac.umm_common.updater import ServiceUpdater
+
+RECORD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes', 'umm-s.json')
+NATIVE_ID = 'POCLOUD_podaac_l2_cloud_subsetter'
+
+
+class TestRollback(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.snapshots = os.path.join(self.tmp.name, 'snapshots')
+        self.cmr = FakeCmr()
+        self.client = fake_client(self.cmr)
+        with open(RECORD) as record_file:
+            self.umm = json.load(record_file)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rollback(self, revision=None, snapshot_dir=None):
+        args = argparse.Namespace(env='uat', provider='POCLOUD', timeout=30, snapshot_dir=snapshot_dir)
+        return rollback.run_rollback(args, SERVICE, NATIVE_ID, engine.record_api(SERVICE), 'TOKEN',
+                                     revision=revision, client=self.client)
+
+    def test_rollback_target(self):
+        revisions = {1: {'deleted': False}, 2: {'deleted': True}, 3: {'deleted': False}}
+        self.assertEqual(rollback.rollback_target(revisions, 3), 1)
+        self.assertEqual(rollback.rollback_target(revisions, 3, revision=3), 3)
+        # CMR pruned revision 4, a snapshot still has it
+        self.assertEqual(rollback.rollback_target(revisions, 5, snapshots=[1, 4]), 4)
+        self.assertEqual(rollback.rollback_target({}, None, snapshots=[2]), 2)
+        with self.assertRaises(Exception):
+            rollback.rollback_target(revisions, 3, revision=7)
+        with self.assertRaises(Exception):
+            rollback.rollback_target({1: {'deleted': False}}, 1)
+        with self.assertRaisesRegex(Exception, 'deletion'):
+            rollback.rollback_target(revisions, 3, revision=2)
+
+    def test_snapshot_revisions(self):
+        for revision in (2, 10):
+            rollback.write_snapshot(self.snapshots, 'uat', 'POCLOUD', 'services', NATIVE_ID, 'S1-POCLOUD', revision,
+                                    self.umm)
+        rollback.write_snapshot(self.snapshots, 'uat', 'POCLOUD', 'services', NATIVE_ID + '_v2', 'S2-POCLOUD', 3,
+                                self.umm)
+        self.assertEqual(rollback.snapshot_revisions(self.snapshots, NATIVE_ID), [2, 10])
+
+    def test_rollback_from_cmr_revisions(self):
+        self.cmr.add_record('services', NATIVE_ID, self.umm)
+        self.cmr.records[NATIVE_ID]['revisions'].append(dict(self.umm, Version='broken'))
+        report = self.rollback()
+        self.assertEqual((report['from_revision'], report['to_revision'], report['new_revision']), (2, 1, 3))
+        self.assertEqual(report['source'], 'cmr')
+        self.assertEqual(self.cmr.record(NATIVE_ID)[2], self.umm)
+        self.assertEqual(self.cmr.requests('POST'), [])
+
+    def test_rollback_to_deletion_rejected(self):
+        self.cmr.add_record('services', NATIVE_ID, self.umm)
+        self.cmr.records[NATIVE_ID]['revisions'].extend([None, self.umm])
+        with self.assertRaisesRegex(Exception, 'Revision 2 is a deletion'):
+            self.rollback(revision=2)
+        self.assertEqual(self.cmr.requests('PUT'), [])
+
+    def test_rollback_from_snapshot(self):
+        concept_id = self.cmr.add_record('services', NATIVE_ID, self.umm, associations={'C1-POCLOUD', 'C2-POCLOUD'})
+        with mock.patch.object(pipeline, 'READINESS_WAIT', 0), no_backoff_waits(), \
+                ServiceUpdater('uat', 'POCLOUD', token='TOKEN', client=self.client) as updater:
+            updater.update(dict(self.umm, Version='broken'), associations=['C2-POCLOUD', 'C3-POCLOUD'],
+                           snapshot_dir=self.snapshots)
+        self.assertEqual(rollback.snapshot_revisions(self.snapshots, NATIVE_ID), [1])
+        self.assertEqual(self.cmr.associations[concept_id], {'C2-POCLOUD', 'C3-POCLOUD'})
+
+        report = self.rollback(snapshot_dir=self.snapshots)
+        self.assertEqual((report['to_revision'], report['source']), (1, 'snapshot'))
+        self.assertEqual(self.cmr.record(NATIVE_ID)[2], self.umm)
+        self.assertEqual(self.cmr.associations[concept_id], {'C1-POCLOUD', 'C2-POCLOUD'})
+        self.assertEqual((report['associations_added'], report['associations_removed']),
+                         (['C1-POCLOUD'], ['C3-POCLOUD']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+==============
+test_scheduler.py
+==============
+
+Admission order of the request scheduler: class budgets, the total
+budget and class priorities, with requests held by threads.
+"""
+import threading
+import time
+import unittest
+
+import requests
+from requests.adapters import BaseAdapter
+
+from podaac.umm_common import breaker, cli, deadline
+from podaac.umm_common import scheduler
+from podaac.umm_common.client import CmrClient
+from podaac.umm_common.concepts import SERVICE
+from podaac.umm_common.scheduler import RequestScheduler, request_class
+
+CMR = 'https://cmr.uat.earthdata.nasa.gov'
+
+
+class OkAdapter(BaseAdapter):
+    """Transport answering every request with 200"""
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = b'{}'  # pylint: disable=protected-access
+        resp.request = request
+        return resp
+
+    def close(self):
+        pass
+
+
+def wait_until(condition, timeout=5):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise AssertionError('condition not reached')
+        time.sleep(0.005)
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_request_class(self):
+        self.assertEqual(request_class('POST', f'{CMR}/legacy-services/rest/tokens'), scheduler.TOKEN)
+        self.assertEqual(request_class('PUT', f'{CMR}/ingest/providers/POCLOUD/services/svc'), scheduler.INGEST)
+        self.assertEqual(request_class('DELETE', f'{CMR}/ingest/providers/POCLOUD/tools/tl'), scheduler.INGEST)
+        self.assertEqual(request_class('POST', f'{CMR}/search/services/S1-POCLOUD/associations'),
+                         scheduler.ASSOCIATION)
+        self.assertEqual(request_class('DELETE', f'{CMR}/search/tools/T1-POCLOUD/associations'),
+                         scheduler.ASSOCIATION)
+        self.assertEqual(request_class('GET', f'{CMR}/search/services.umm_json?native_id=svc'), scheduler.SEARCH)
+
+    def test_parse_budgets(self):
+        budgets = scheduler.parse_budgets(['association=2'])
+        self.assertEqual(budgets[scheduler.ASSOCIATION], 2)
+        self.assertEqual(budgets[scheduler.INGEST], scheduler.DEFAULT_BUDGETS[scheduler.INGEST])
+        for value in ('association', 'granule=2', 'search=0'):
+            with self.assertRaises(ValueError):
+                scheduler.parse_budgets([value])
+
+    def test_budget_argument_validated(self):
+        base = ['-f', 'record.json', '-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN', '--schedule']
+        self.assertEqual(cli.parse_args(SERVICE, base + ['--budget', 'search=3']).budget, ['search=3'])
+        with self.assertRaises(SystemExit):
+            cli.parse_args(SERVICE, base + ['--budget', 'granule=3'])
+
+    def test_association_fan_out_leaves_room(self):
+        sched = RequestScheduler(budgets={**scheduler.DEFAULT_BUDGETS, scheduler.ASSOCIATION: 2}, total=4)
+        release = threading.Event()
+
+        def associate():
+            with sched.slot('POST', f'{CMR}/search/services/S1-POCLOUD/associations'):
+                release.wait()
+
+        threads = [threading.Thread(target=associate) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        wait_until(lambda: sched.metrics()['classes'][scheduler.ASSOCIATION]['queue_depth'] == 4)
+        # the association budget is spent, the ingest goes straight through
+        self.assertLess(sched.acquire(scheduler.INGEST), 0.5)
+        sched.release(scheduler.INGEST)
+        release.set()
+        for thread in threads:
+            thread.join()
+        metrics = sched.metrics()['classes'][scheduler.ASSOCIATION]
+        self.assertEqual(metrics['admitted'], 6)
+        self.assertEqual(metrics['queued'], 4)
+        self.assertEqual(metrics['max_queue_depth'], 4)
+        self.assertEqual(metrics['in_flight'], 0)
+
+    def test_priority_order(self):
+        sched = RequestScheduler(total=1)
+        sched.acquire(scheduler.SEARCH)
+        order = []
+
+        def request(name):
+            sched.acquire(name)
+            order.append(name)
+            sched.release(name)
+
+        threads = []
+        for name in (scheduler.ASSOCIATION, scheduler.SEARCH, scheduler.INGEST, scheduler.TOKEN):
+            threads.append(threading.Thread(target=request, args=(name,)))
+            threads[-1].start()
+            wait_until(lambda depth=len(threads): sum(
+                item['queue_depth'] for item in sched.metrics()['classes'].values()) == depth)
+        sched.release(scheduler.SEARCH)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, [scheduler.TOKEN, scheduler.INGEST, scheduler.SEARCH, scheduler.ASSOCIATION])
+
+    def test_deadline_stops_waiting(self):
+        sched = RequestScheduler(total=1)
+        sched.acquire(scheduler.SEARCH)
+        deadline.start(0.1)
+        try:
+            with self.assertRaises(deadline.DeadlineExceeded):
+                sched.acquire(scheduler.INGEST)
+        finally:
+            deadline.start(None)
+        self.assertEqual(sched.metrics()['classes'][scheduler.INGEST]['queue_depth'], 0)
+
+    def test_deadline_while_queued_releases_breaker_probe(self):
+        sched = RequestScheduler(total=1)
+        circuit = breaker.CircuitBreaker(cooldown=0)
+        circuit._open('test')  # pylint: disable=protected-access
+        client = CmrClient(breaker=circuit, scheduler=sched)
+        client.session.mount('https://', OkAdapter())
+        url = f'{CMR}/search/services.umm_json?native_id=svc'
+        sched.acquire(scheduler.SEARCH)
+        deadline.start(0.05)
+        try:
+            with self.assertRaises(deadline.DeadlineExceeded):
+                client.get(url)
+        finally:
+            deadline.start(None)
+            sched.release(scheduler.SEARCH)
+        self.assertEqual(client.metrics()['requests'], 0)
+        # the probe was not taken by the request given up in the queue
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(circuit.metrics()['state'], breaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+==============
+test_startup.py
+==============
+
+Import time budget of the command line entry points.
+
+Parsing the arguments must not import requests, backoff or the watch
+and sweep servers. With UMM_TIMING_TESTS=1, `--help` may only take
+UMM_STARTUP_BUDGET seconds (default 0.5) longer than starting the
+interpreter.
+"""
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMING = os.environ.get('UMM_TIMING_TESTS') == '1'
+BUDGET = float(os.environ.get('UMM_STARTUP_BUDGET', '0.5'))
+HEAVY = ('requests', 'backoff', 'http.server', 'concurrent.futures', 'podaac.umm_common.engine')
+ENTRY_POINTS = ('podaac.umms_updater.umms_updater', 'podaac.ummt_updater.ummt_updater')
+
+PARSE = '''
+import sys
+from {module} import parse_args
+sys.argv = ['updater', '-f', 'record.json', '-p', 'POCLOUD', '-e', 'uat', '-t', 'token']
+parse_args()
+print(','.join(name for name in {heavy!r} if name in sys.modules))
+'''
+
+
+def run_python(*args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True,
+                          check=True)
+
+
+def best_time(*args, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_python(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_parse_args_imports(self):
+        for module in ENTRY_POINTS:
+            with self.subTest(module=module):
+                loaded = run_python('-c', PARSE.format(module=module, heavy=HEAVY)).stdout.strip()
+                self.assertEqual(loaded, '', f'parse_args imported {loaded}')
+
+    @unittest.skipUnless(TIMING, 'set UMM_TIMING_TESTS=1 to check the startup budget')
+    def test_help_budget(self):
+        baseline = best_time('-c', 'pass')
+        for module in ENTRY_POINTS:
+            with self.subTest(module=module):
+                overhead = best_time('-m', module, '--help') - baseline
+                self.assertLess(overhead, BUDGET, f'{module} --help took {overhead:.3f}s over the interpreter')
@@ -0,0 +1,100 @@
+"""
+==============
+test_sweep.py
+==============
+
+Provider sweep against an in-memory CMR: drift between a directory
+of records and the provider, and applying it record by record.
+"""
+import functools
+import json
+import os
+import tempfile
+import unittest
+
+from fake_cmr import FakeCmr, fake_client
+
+from podaac.umm_common import associations, cli, engine, sweep
+from podaac.umm_common.concepts import SERVICE
+from podaac.umm_common.failures import FailureReport
+
+
+def write_record(directory, name, umm, assoc=None):
+    path = os.path.join(directory, f'{name}.json')
+    with open(path, 'w') as json_file:
+        json.dump(umm, json_file)
+    if assoc is not None:
+        with open(os.path.join(directory, f'{name}_uat_associations.txt'), 'w') as afile:
+            afile.write('\n'.join(assoc) + '\n')
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cmr = FakeCmr()
+        self.cmr.add_record('services', 'POCLOUD_in_sync', {'Name': 'in sync'}, associations={'C1-POCLOUD'})
+        self.cmr.add_record('services', 'POCLOUD_changed', {'Name': 'changed', 'Version': '1'},
+                            associations={'C1-POCLOUD', 'C2-POCLOUD'})
+        self.cmr.add_record('services', 'POCLOUD_remote_only', {'Name': 'remote only'})
+        write_record(self.tmp.name, 'in_sync', {'Name': 'in sync'}, ['C1-POCLOUD'])
+        write_record(self.tmp.name, 'changed', {'Name': 'changed', 'Version': '2'}, ['C1-POCLOUD', 'C3-POCLOUD'])
+        write_record(self.tmp.name, 'new', {'Name': 'new'}, ['C4-POCLOUD'])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sweep(self, *argv):
+        args = cli.parse_args(SERVICE, ['--sweep', self.tmp.name, '-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN',
+                                        '--resolver_cache', '', *argv])
+        return sweep.run_sweep(args, SERVICE.path, engine.create_native_id,
+                               functools.partial(engine.create_record, SERVICE), SERVICE.default_version,
+                               current_token='TOKEN', client=fake_client(self.cmr), failures=FailureReport())
+
+    def test_meta_collections(self):
+        meta_collections = associations.meta_collections
+        self.assertEqual(meta_collections({'associations': {'collections': ['C2-P', 'C1-P']}}), ['C1-P', 'C2-P'])
+        self.assertEqual(meta_collections({'association-details': {'collections': [{'concept-id': 'C1-P'}]}}),
+                         ['C1-P'])
+        self.assertEqual(meta_collections({'associations': {'collections': [{'concept-id': 'C1-P'}]}}), ['C1-P'])
+        self.assertEqual(meta_collections({'concept-id': 'S1-P'}), [])
+
+    def test_report(self):
+        report = self.sweep()
+        entries = {entry['native_id']: entry for entry in report['records']}
+        self.assertEqual(entries['POCLOUD_in_sync']['drift'], [])
+        self.assertEqual(entries['POCLOUD_changed']['drift'], ['profile', 'associations'])
+        self.assertEqual(entries['POCLOUD_changed']['add'], ['C3-POCLOUD'])
+        self.assertEqual(entries['POCLOUD_changed']['remove'], ['C2-POCLOUD'])
+        self.assertEqual(entries['POCLOUD_new']['drift'], ['missing', 'associations'])
+        self.assertEqual(report['remote_only'], ['POCLOUD_remote_only'])
+        self.assertEqual(report['summary'], {'local': 3, 'remote': 3, 'drifted': 2, 'remote_only': 1, 'failed': 0})
+        self.assertEqual(self.cmr.requests('PUT'), [])
+
+    def test_apply(self):
+        report = self.sweep('--apply')
+        self.assertEqual(self.cmr.record('POCLOUD_changed')[2], {'Name': 'changed', 'Version': '2'})
+        concept_id = self.cmr.record('POCLOUD_changed')[0]
+        self.assertEqual(self.cmr.associations[concept_id], {'C1-POCLOUD', 'C3-POCLOUD'})
+        new_id = self.cmr.record('POCLOUD_new')[0]
+        self.assertEqual(self.cmr.associations[new_id], {'C4-POCLOUD'})
+        self.assertTrue(all(entry['applied'] == bool(entry['drift']) for entry in report['records']))
+        self.assertIsNotNone(self.cmr.record('POCLOUD_remote_only'))
+
+    def test_failed_ingest_does_not_stop_sweep(self):
+        self.cmr.fail.append(['PUT', '/ingest/.*/POCLOUD_changed$', 500])
+        report = self.sweep('--apply')
+        entries = {entry['native_id']: entry for entry in report['records']}
+        self.assertFalse(entries['POCLOUD_changed']['applied'])
+        self.assertTrue(entries['POCLOUD_changed']['error'].startswith('ingest failed'))
+        # neither the profile nor the associations of the failed record changed
+        self.assertEqual(self.cmr.record('POCLOUD_changed')[2], {'Name': 'changed', 'Version': '1'})
+        self.assertEqual(self.cmr.associations[entries['POCLOUD_changed']['concept_id']],
+                         {'C1-POCLOUD', 'C2-POCLOUD'})
+        self.assertTrue(entries['POCLOUD_new']['applied'])
+        self.assertIsNotNone(self.cmr.record('POCLOUD_new'))
+        self.assertEqual(report['summary']['failed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+==============
+test_tracing.py
+==============
+
+Span tracing: the no-op path without a trace file and the Chrome
+trace export of spans, instants, threads and an update run.
+"""
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from fake_cmr import FakeCmr, fake_client, no_backoff_waits
+
+from podaac.umm_common import cli, engine, pipeline, tracing
+from podaac.umm_common.concepts import SERVICE
+
+RECORD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes', 'umm-s.json')
+
+
+@tracing.traced(category='test')
+def lookup(value):
+    return value * 2
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'traces', 'run.json')
+        self.addCleanup(tracing.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def events(self):
+        with open(self.path) as tfile:
+            trace = json.load(tfile)
+        self.assertEqual(trace['displayTimeUnit'], 'ms')
+        return trace['traceEvents']
+
+    def test_off(self):
+        self.assertIsNone(tracing.start(None))
+        with tracing.span('run') as span:
+            span.set(status=200)
+        tracing.instant('retry')
+        self.assertEqual(lookup(2), 4)
+        self.assertIsNone(tracing.stop())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_export(self):
+        tracing.start(self.path)
+        with tracing.span('run', mode='update') as outer:
+            with tracing.span('put', 'phase') as inner:
+                inner.set(status=201)
+            self.assertEqual(lookup(3), 6)
+            tracing.instant('revision_conflict', 'retry', attempt=1)
+            worker = threading.Thread(target=lookup, args=(1,), name='phase_0')
+            worker.start()
+            worker.join()
+            with self.assertRaises(ValueError), tracing.span('verify', 'phase'):
+                raise ValueError('discrepancy')
+            outer.set(status='ok')
+        self.assertEqual(tracing.stop(), 6)
+
+        events = self.events()
+        spans = {event['name']: event for event in events if event['ph'] == 'X' and event['name'] != 'lookup'}
+        self.assertEqual(spans['run']['args'], {'mode': 'update', 'status': 'ok'})
+        self.assertEqual(spans['put']['args'], {'status': 201})
+        self.assertEqual(spans['verify']['args'], {'error': 'ValueError: discrepancy'})
+        # nested spans lie inside their parent
+        run, put = spans['run'], spans['put']
+        self.assertLessEqual(run['ts'], put['ts'])
+        self.assertLessEqual(put['ts'] + put['dur'], run['ts'] + run['dur'])
+        instant = next(event for event in events if event['ph'] == 'i')
+        self.assertEqual((instant['name'], instant['s'], instant['args']), ('revision_conflict', 't', {'attempt': 1}))
+        lookups = [event for event in events if event['name'] == 'lookup']
+        self.assertEqual(len({event['tid'] for event in lookups}), 2)
+        self.assertEqual({event['cat'] for event in lookups}, {'test'})
+        threads = {event['args']['name'] for event in events if event['ph'] == 'M'}
+        self.assertIn('phase_0', threads)
+
+    def test_update_run(self):
+        tracing.start(self.path)
+        args = cli.parse_args(SERVICE, ['-f', RECORD, '-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN', '-a', 'C1-POCLOUD',
+                                        '--resolver_cache', ''])
+        with mock.patch.object(pipeline, 'READINESS_WAIT', 0), no_backoff_waits():
+            engine.update_record(args, SERVICE, fake_client(FakeCmr()))
+        tracing.stop()
+        events = self.events()
+        phases = {event['name'] for event in events if event.get('cat') == 'phase'}
+        self.assertTrue({'token', 'lookup', 'put', 'verify'} <= phases, phases)
+        requests = [event for event in events if event.get('cat') == 'http']
+        self.assertIn(('PUT cmr.uat.earthdata.nasa.gov/ingest/providers/POCLOUD/services/{native_id}', 201),
+                      [(event['name'], event['args']['status']) for event in requests])
+
+
+if __name__ == '__main__':
+    unittest.main()
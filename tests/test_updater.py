@@ -0,0 +1,82 @@
+"""
+==============
+test_updater.py
+==============
+
+Updater library API against an in-memory CMR: structured results,
+one shared client for many records and credential checks.
+"""
+import json
+import os
+import unittest
+from unittest import mock
+
+from fake_cmr import FakeCmr, fake_client, no_backoff_waits
+
+from podaac.umm_common import pipeline
+from podaac.umm_common.updater import ServiceUpdater
+
+RECORD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes', 'umm-s.json')
+
+
+class TestUpdater(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(pipeline, 'READINESS_WAIT', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        waits = no_backoff_waits()
+        waits.start()
+        self.addCleanup(waits.stop)
+        self.cmr = FakeCmr()
+        self.updater = ServiceUpdater('uat', 'POCLOUD', token='TOKEN', client=fake_client(self.cmr))
+        self.addCleanup(self.updater.close)
+
+    def test_credentials_required(self):
+        with self.assertRaises(ValueError):
+            ServiceUpdater('uat', 'POCLOUD')
+
+    def test_create_then_update(self):
+        created = self.updater.update(RECORD, associations=['C1-POCLOUD', 'C2-POCLOUD'])
+        self.assertTrue(created.created)
+        self.assertEqual(created.native_id, 'POCLOUD_podaac_l2_cloud_subsetter')
+        self.assertEqual(created.associations_added, ['C1-POCLOUD', 'C2-POCLOUD'])
+        self.assertTrue(created.ok)
+
+        with open(RECORD) as record_file:
+            umm = json.load(record_file)
+        updated = self.updater.update(dict(umm, Version='2.0'), associations=['C2-POCLOUD'])
+        self.assertFalse(updated.created)
+        self.assertTrue(updated.updated)
+        self.assertEqual(updated.concept_id, created.concept_id)
+        self.assertEqual(updated.revision_id, 2)
+        self.assertEqual(updated.changed_paths, ['/Version'])
+        self.assertEqual(updated.associations_removed, ['C1-POCLOUD'])
+        self.assertIn('put', updated.timings)
+        self.assertEqual(self.cmr.record(created.native_id)[2]['Version'], '2.0')
+
+    def test_failure_cleared_by_retry_pass(self):
+        self.cmr.fail.append(['POST', 'associations', 503, 1])
+        result = self.updater.update(RECORD, associations=['C1-POCLOUD', 'C2-POCLOUD'])
+        # verified after the retry pass, so the cleared operation is not a discrepancy
+        self.assertEqual((result.failures, result.discrepancies), ([], []))
+        self.assertEqual(sorted(result.associations_added), ['C1-POCLOUD', 'C2-POCLOUD'])
+        self.assertTrue(result.ok)
+        self.assertIn('assoc_retry', result.timings)
+
+    def test_update_many_and_options(self):
+        with open(RECORD) as record_file:
+            umm = json.load(record_file)
+        records = [dict(umm, Name=f'subsetter {n}') for n in range(3)]
+        results = self.updater.update_many(records, overrides=['/Version=9'])
+        self.assertEqual([result.native_id for result in results],
+                         [f'POCLOUD_subsetter_{n}' for n in range(3)])
+        self.assertTrue(all(result.created for result in results))
+        self.assertEqual({self.cmr.record(result.native_id)[2]['Version'] for result in results}, {'9'})
+        # associations left alone without the associations option
+        self.assertEqual(self.cmr.requests('POST', '/associations'), [])
+        self.assertEqual(self.cmr.requests(pattern='/legacy-services'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+==============
+test_verify.py
+==============
+
+Post-update verification against an in-memory CMR: the intended
+association set for association files and single concept ids.
+"""
+import json
+import os
+import unittest
+from unittest import mock
+
+from fake_cmr import FakeCmr, fake_client, no_backoff_waits
+
+from podaac.umm_common import cli, engine, pipeline, verify
+from podaac.umm_common.concepts import SERVICE
+
+CASSETTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes')
+RECORD = os.path.join(CASSETTES, 'umm-s.json')
+
+
+def update(cmr, assoc, *extra):
+    args = cli.parse_args(SERVICE, ['-f', RECORD, '-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN', '-a', assoc,
+                                    '--resolver_cache', '', *extra])
+    client = fake_client(cmr)
+    with mock.patch.object(pipeline, 'READINESS_WAIT', 0), no_backoff_waits():
+        return engine.update_record(args, SERVICE, client)
+
+
+class TestVerify(unittest.TestCase):
+
+    def test_association_discrepancies(self):
+        found = verify.association_discrepancies(['C1-P', 'C2-P\n'], {'C2-P', 'C3-P'})
+        self.assertEqual(found, [{'kind': 'missing_association', 'assoc_id': 'C1-P'},
+                                 {'kind': 'unexpected_association', 'assoc_id': 'C3-P'}])
+        self.assertEqual(verify.association_discrepancies(['C2-P'], {'C2-P', 'C3-P'}, remove_collection=False),
+                         [])
+
+    def test_single_concept_id_new_record(self):
+        cmr = FakeCmr()
+        result = update(cmr, 'C5-POCLOUD')
+        self.assertTrue(result.created)
+        self.assertEqual(result.associations_added, ['C5-POCLOUD'])
+        self.assertEqual(result.discrepancies, [])
+        self.assertTrue(result.ok)
+
+    def test_single_concept_id_existing_record(self):
+        cmr = FakeCmr()
+        with open(RECORD) as record_file:
+            umm = json.load(record_file)
+        update(cmr, 'C5-POCLOUD')
+        native_id = next(iter(cmr.records))
+        concept_id, _, _ = cmr.record(native_id)
+        cmr.associations[concept_id].add('C6-POCLOUD')
+        self.assertEqual(cmr.record(native_id)[2], umm)
+        result = update(cmr, 'C5-POCLOUD', '-r')
+        self.assertFalse(result.updated)
+        self.assertEqual(result.associations_removed, [])
+        self.assertEqual(result.discrepancies, [])
+        self.assertTrue(result.ok)
+        self.assertEqual(cmr.associations[concept_id], {'C5-POCLOUD', 'C6-POCLOUD'})
+
+    def test_association_file(self):
+        cmr = FakeCmr()
+        update(cmr, os.path.join(CASSETTES, 'uat_associations.txt'))
+        concept_id = cmr.record(next(iter(cmr.records)))[0]
+        cmr.associations[concept_id].add('C9-POCLOUD')
+        result = update(cmr, os.path.join(CASSETTES, 'uat_associations.txt'))
+        self.assertEqual(result.associations_removed, ['C9-POCLOUD'])
+        self.assertEqual(result.discrepancies, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
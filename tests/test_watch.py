@@ -0,0 +1,137 @@
+"""
+==============
+test_watch.py
+==============
+
+Watch mode: debounced change detection, mapping changed companion
+files onto records, and syncing with failures counted per record.
+"""
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+from unittest import mock
+
+from fake_cmr import FakeCmr, fake_client, no_backoff_waits
+
+from podaac.umm_common import cli, engine, pipeline, watch
+from podaac.umm_common.concepts import SERVICE
+
+RECORD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes', 'umm-s.json')
+
+
+def touch(path, content='{}'):
+    with open(path, 'w') as tfile:
+        tfile.write(content)
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        for name in ('a.json', 'b.json', 'uat_associations.txt', 'b_uat_associations.txt', 'notes.md'):
+            touch(os.path.join(self.dir, name))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def args(self, *argv):
+        return cli.parse_args(SERVICE, ['-w', self.dir, '-p', 'POCLOUD', '-e', 'uat', '-t', 'TOKEN', *argv])
+
+    def test_debounce(self):
+        watcher = watch.DirectoryWatcher(self.dir, debounce=2.0)
+        self.assertEqual(watcher.prime(), {self.path(name) for name in
+                                           ('a.json', 'b.json', 'uat_associations.txt', 'b_uat_associations.txt')})
+        self.assertEqual(watcher.poll(now=0), set())
+        touch(self.path('a.json'), '{"Name": "a"}')
+        os.remove(self.path('b_uat_associations.txt'))
+        self.assertEqual(watcher.poll(now=10), set())
+        self.assertEqual(watcher.pending, 2)
+        self.assertEqual(watcher.poll(now=11), set())
+        self.assertEqual(watcher.poll(now=12), {self.path('a.json'), self.path('b_uat_associations.txt')})
+        self.assertEqual(watcher.pending, 0)
+
+    def test_companion_files(self):
+        self.assertEqual(watch.association_file(self.path('a.json'), 'uat'), self.path('uat_associations.txt'))
+        self.assertEqual(watch.association_file(self.path('b.json'), 'uat'), self.path('b_uat_associations.txt'))
+        self.assertIsNone(watch.association_file(self.path('a.json'), 'ops'))
+        self.assertFalse(watch.is_record('a_uat_overrides.json'))
+
+    def test_affected_records(self):
+        affected = watch.affected_records
+        # the shared file only affects records without their own association file
+        self.assertEqual(affected([self.path('uat_associations.txt')], self.dir, 'uat'), [self.path('a.json')])
+        self.assertEqual(affected([self.path('b_uat_associations.txt')], self.dir, 'uat'), [self.path('b.json')])
+        self.assertEqual(affected([self.path('b.json'), self.path('gone.json'), self.path('ops_associations.txt')],
+                                  self.dir, 'uat'), [self.path('b.json')])
+
+    def test_sync_records(self):
+        synced = []
+
+        def sync_file(record_args):
+            synced.append((record_args.jfilename, record_args.assoc))
+            if record_args.jfilename.endswith('b.json'):
+                raise SystemExit('ingest failed')
+
+        metrics = watch.WatchMetrics(fake_client())
+        watch.sync_records([self.path('a.json'), self.path('b.json')], self.args(), sync_file, metrics)
+        self.assertEqual(synced, [(self.path('a.json'), self.path('uat_associations.txt')),
+                                  (self.path('b.json'), self.path('b_uat_associations.txt'))])
+        snapshot = metrics.snapshot()
+        self.assertEqual((snapshot['syncs'], snapshot['failures']), (2, 1))
+        self.assertEqual(snapshot['last_error'], 'ingest failed')
+        self.assertFalse(snapshot['last_sync']['ok'])
+
+    def test_run_watch(self):
+        stop = threading.Event()
+        synced = []
+
+        def sync_file(record_args):
+            synced.append(record_args.jfilename)
+            stop.set()
+
+        metrics = watch.run_watch(self.args('--watch_interval', '0.01'), sync_file, fake_client(), stop_event=stop)
+        self.assertEqual(synced, [self.path('a.json'), self.path('b.json')])
+        self.assertEqual(metrics.syncs, 2)
+
+    def test_expired_token_refreshed(self):
+        cmr = FakeCmr()
+        client = fake_client(cmr)
+        # token cached by an earlier sync, expired since
+        client.tokens['uat'] = 'EXPIRED'
+        cmr.fail.append(['PUT', '/ingest/', 401, 1])
+        args = cli.parse_args(SERVICE, ['-f', RECORD, '-p', 'POCLOUD', '-e', 'uat', '-cu', 'user', '-cp', 'pass'])
+        with mock.patch.object(pipeline, 'READINESS_WAIT', 0), no_backoff_waits():
+            result = engine.recorded_update(args, SERVICE, client)
+            self.assertTrue(result.ok)
+            self.assertEqual(client.tokens['uat'], 'TOKEN')
+            self.assertEqual(len(cmr.requests('PUT', '/ingest/')), 2)
+            # a token given with -t is not replaced
+            cmr.fail.append(['PUT', '/ingest/', 401, 1])
+            with self.assertRaises(SystemExit):
+                engine.recorded_update(cli.parse_args(SERVICE, ['-f', RECORD, '-p', 'POCLOUD', '-e', 'uat',
+                                                                '-t', 'GIVEN', '--set', '/Version=2']),
+                                       SERVICE, client)
+
+    def test_health_server(self):
+        metrics = watch.WatchMetrics(fake_client())
+        server = watch.start_health_server(metrics, 0, host='127.0.0.1')
+        try:
+            base = f'http://127.0.0.1:{server.server_address[1]}'
+            with urllib.request.urlopen(base + '/health') as resp:
+                self.assertEqual(json.load(resp), {'status': 'ok'})
+            with urllib.request.urlopen(base + '/metrics') as resp:
+                self.assertEqual(json.load(resp)['syncs'], 0)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()